@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 __author__ = 'Burtsev'
 
-import scipy as np
+import operator
+import numpy as np
+import FSKernels
+import FSFlags
+import FSLinks
 
 """ Some general functions."""
 
@@ -10,116 +14,145 @@ def sigmoid(x, k, x0):  # sigmoid activation function
     return 1 / (1 + np.exp(-k * (x - x0)))
 
 
-def weightedSum(inputs, weights, norm=False):  # calculation of weighted sum, arguments are lists
-    if len(inputs) > 0:
-        wsum = np.array([[inputs[i], weights[i]]
-                         for i in weights.iterkeys() if i in inputs]).prod(1).sum()
-        if norm and wsum != 0:
-            wsum = wsum / sum(abs(weights))
-        return wsum
-    else:
-        return 0
+selfWeight = 0.2  # weight of the oldActivity self input of an FS (see AtomFS.calcCore)
 
 
-def rbf(inputs, centroids, weights):
-    if len(inputs) > 0:
-        icw = np.array([[inputs[i], centroids[i], weights[i]]
-                        for i in inputs.keys()])
-        sw = np.absolute(np.subtract(icw[:, 0], icw[:, 1]))
-        return np.exp(-10 * np.multiply(sw, icw[:, 2]).sum())  # /len(inputs))
-    else:
-        return 0
+weightedSum = FSKernels.weightedSum  # weighted sum of inputs, arguments are dicts
 
+rbf = FSKernels.rbf  # radial basis function of inputs
 
-class AtomFS:
-    """Class for the elementary functional system (FS).
+# flags reported to the FlagIndex of the network, stored in the slots _<flag> (see flagProperty)
+flagSlots = dict((name, '_' + name) for name in FSFlags.flagNames)
 
-        This class implements basic FS functionality:
-        1) activation in the problem state;
-        2) deactivation in the goal state;
-        3) tracking time of transition from the problem to the goal
-    """
-    # FS attributes
-    # - metadata
-    ID = int  # FS id
-    goalID = []  # ids of goal FS's
-    # - structural parameters
-    problemWeights = {}  # weights for the problemState input
-    problemValues = {}  # centroids for the problemState input
-    goalWeights = {}  # weights for the goal input
-    goalValues = {}
-    lateralWeights = {}  # weights for the lateral inhibition
-    controlWeights = {}  # weights for the top-down control
-    plasticWeights = {}  # temporary weights for predictive features of env.
-    # - dynamical parameters
-    tau = float  # expected time for transition from the problem to the goal state
-    threshold = float  # for the activation
-    noise = float  # random value to be added to the FS activation
-    k = float
-    x0 = float
-    pr_threshold = float  # for the prediction
-    pr_k = float
-    pr_x0 = float
+# dicts of a FS created on the first write, until then they read as empty dicts
+containerNames = frozenset(FSLinks.linkFields.keys() + [
+    'plasticWeights', 'problemState', 'goalState', 'lateralState', 'controlState'])
+listNames = frozenset(['goalID'])  # lists created on the first append, empty lists until then
+
+networkNames = ('flagIndex', 'links')  # attributes not copied with a FS
+
+# state of a FS after FSNetwork.resetActivity, applied lazily by AtomFS.refresh
+resetState = (('failed', False), ('isActive', False), ('wasUsed', False), ('mismatch', 0),
+              ('onTime', 0), ('activity', 0), ('oldActivity', 0))
+
+
+class LazyContainer(object):
+    """Empty stand-in for an absent container of the FS: the first write creates the
+    container (AtomFS.newContainer) and goes to it"""
+
+    __slots__ = ()
+
+    def create(self):
+        """Returns the container of the FS, creates it if it is absent"""
+
+        try:
+            return object.__getattribute__(self.fs, self.name)
+        except AttributeError:
+            container = self.fs.newContainer(self.name)
+            setattr(self.fs, self.name, container)
+            return container
+
+
+class LazyDict(LazyContainer, dict):
+    """Stand-in for an absent dict of the FS (see LazyContainer)"""
+
+    __slots__ = ('fs', 'name')
+
+    def __init__(self, fs, name):
+        dict.__init__(self)
+        self.fs = fs
+        self.name = name
+
+    def __setitem__(self, key, value):
+        self.create()[key] = value
+
+    def update(self, *args, **kwargs):
+        self.create().update(*args, **kwargs)
+
+    def setdefault(self, key, value=None):
+        return self.create().setdefault(key, value)
+
+    def assign(self, items):
+        self.create().assign(items)
+
+    def __reduce__(self):
+        return dict, ()
+
+
+class LazyList(LazyContainer, list):
+    """Stand-in for an absent list of the FS (see LazyContainer)"""
+
+    __slots__ = ('fs', 'name')
+
+    def __init__(self, fs, name):
+        list.__init__(self)
+        self.fs = fs
+        self.name = name
+
+    def append(self, value):
+        self.create().append(value)
+
+    def extend(self, values):
+        self.create().extend(values)
+
+    def __reduce__(self):
+        return list, ()
+
+
+class BaseFS(object):
+    """Methods of the FS that do not depend on the storage of its attributes: AtomFS
+    keeps them in slots, FSEngine.EngineFS in the arrays of the engine"""
+
+    __slots__ = ()
     rateOfWeightLearning = 0.1
-    # - state variables
-    problemState = {}  # input for the features of the problem to be solved by FS
-    goalState = {}  # input for the features of the required solution
-    lateralState = {}  # input for the lateral inhibition (activation)
-    controlState = {}  # input for the top-down control
-    activity = float  # current value of FS activity
-    wasActive = []  # history of FS activity
-    onTime = float  # the period of current FS's activity
-    startTime = float  # time of the activation for the current FS's activity
-    mismatch = float  # current value of mismatch between goal and current state
-    # - flags
-    isActive = bool  # presence of FS activity
-    isLearning = bool  # learning state
-    failed = bool  # FS was unable to achieve the goal state
-    wasUsed = bool  # FS was already activated during current goal-directed behavior
-    isInput = bool  # is true if value is set externally
-    isOutput = bool  # is true if the value is not predicted
-    exactInputMatch = bool  # is true if the FS should be (de)activated only
-    # in the case when the input exactly matches the weights
 
-    def __init__(self):
-        """"Create and initialize FS."""
-        self.ID = 0
-        self.problemWeights = {}
-        self.problemValues = {}
-        self.goalWeights = {}
-        self.goalValues = {}
-        self.lateralWeights = {}
-        self.controlWeights = {}
-        self.plasticWeights = {}
-        self.tau = 1
-        self.threshold = 0.95
-        self.noise = 0.001
-        self.k = 10  # k and x0 are chosen to have output 0.5 for normalized weighted
-        self.x0 = 0.5  # input of 0.5 and high activation for input = 1
-        self.pr_threshold = self.threshold
-        self.pr_k = self.k
-        self.pr_x0 = self.x0
-        self.activity = 0.
-        self.oldActivity = 0.
-        self.wasActive = []
-        for i in range(2):  # depth of the activation memory is 2
-            self.wasActive.append(False)
-        self.onTime = 0.
-        self.startTime = 0.
-        self.mismatch = 0.
-        self.isActive = False
-        self.isLearning = False
-        self.failed = False
-        self.wasUsed = True
-        self.isInput = False
-        self.isOutput = False
-        self.exactInputMatch = False
+    def __getattr__(self, name):
+        """Called for unset slots only: an absent container reads as an empty dict (list)"""
+
+        if name in containerNames:
+            return LazyDict(self, name)
+        if name in listNames:
+            return LazyList(self, name)
+        raise AttributeError(name)
+
+    def newContainer(self, name):
+        """Returns a new empty container: a view of the link store for the links of a FS in
+        a network, a list for listNames, a dict otherwise"""
+
+        if self.links is not None and name in FSLinks.linkFields:
+            return self.links.view(self.ID, name)
+        if name in listNames:
+            return []
+        return {}
+
+    def drop(self, name):
+        """Deletes the attribute if it is set"""
+
+        try:
+            object.__delattr__(self, name)
+        except AttributeError:
+            pass
+
+    def fields(self, names=None):
+        """Returns {name: value} of the attributes (all slots by default) set on the FS"""
+
+        fields = {}
+        for name in names or self.__slots__:
+            try:
+                fields[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+
+        return fields
 
     def set_params(self, pw, gw, t, th, n, cw):
         """"set parameters of FS."""
-        self.problemWeights = pw
-        self.goalWeights = gw
-        self.controlWeights = cw
+        for name, weights in (('problemWeights', pw), ('goalWeights', gw),
+                              ('controlWeights', cw)):
+            if self.links is not None:  # FS is in a network (FSLinks view)
+                getattr(self, name).assign(weights)
+            else:
+                setattr(self, name, weights)
         self.threshold = th
         self.tau = t
         self.noise = n
@@ -165,8 +198,10 @@ class AtomFS:
 
         return weightedSum(self.controlState, self.controlWeights)
 
-    def calcCore(self, time):
-        """Returns a value of current activation of the FS."""
+    def calcCore(self, time, rnd=None):
+        """Returns a value of current activation of the FS.
+        :param rnd: uniform random value for the noise (drawn from the global RNG if None)
+        """
 
         if self.isActive:
             self.onTime = time - self.startTime
@@ -189,11 +224,13 @@ class AtomFS:
                 #     print ' wpr:', self.problemWeights
                 #     print ' pl w:', self.plasticWeights
         else:
-            wInSum = 0.2*self.oldActivity
+            wInSum = selfWeight*self.oldActivity
             wInSum += 0.8*self.calcProblemActivation()
             wInSum += self.calcLateralActivation()
             wInSum += 0.5*self.calcControlActivation()
-            wInSum += (1 - 2 * np.rand()) * self.noise
+            if rnd is None:
+                rnd = np.random.rand()
+            wInSum += (1 - 2 * rnd) * self.noise
 
             if not self.isOutput:
                 wInSum -= self.calcGoalMismatch()
@@ -215,14 +252,6 @@ class AtomFS:
 
         return self.activity, self.mismatch
 
-    def update(self, time):  # net is a dictionary {FSID: AtomFS}
-        """Updates current state of FS."""
-
-        self.wasActive.pop(0)
-        self.wasActive.append(self.isActive)
-
-        return self.calcCore(time)
-
     def weightsUpdate(self, fsnet):
         """Updates current weights of FS to exclude unimportant connections"""
 
@@ -233,16 +262,6 @@ class AtomFS:
                 else:
                     self.problemWeights[fs] = 0
 
-    def setFSActivation(self, outValue):
-
-        self.wasActive.pop(0)
-        self.wasActive.append(self.isActive)
-        self.oldActivity = outValue
-        self.activity = outValue
-        self.isActive = True
-
-        return self.activity
-
     def resetActivity(self):
         """Resets FS activity"""
 
@@ -255,4 +274,166 @@ class AtomFS:
         self.oldActivity = 0
 
 
+class AtomFS(BaseFS):
+    """Class for the elementary functional system (FS).
+
+        This class implements basic FS functionality:
+        1) activation in the problem state;
+        2) deactivation in the goal state;
+        3) tracking time of transition from the problem to the goal
+    """
+    # FS attributes are slots (no per-FS __dict__); dicts of links, inputs and
+    # plastic weights and the goalID list are created on the first write (see
+    # containerNames, listNames), the activation memory is packed into an int
+    __slots__ = (
+        # - metadata
+        'ID',  # FS id
+        'goalID',  # ids of goal FS's (created on the first append, see listNames)
+        'parentID',  # id of the duplicated FS (set by FSNetwork.duplicate)
+        # - structural parameters
+        'problemWeights',  # weights for the problemState input
+        'problemValues',  # centroids for the problemState input
+        'goalWeights',  # weights for the goal input
+        'goalValues',
+        'lateralWeights',  # weights for the lateral inhibition
+        'controlWeights',  # weights for the top-down control
+        'plasticWeights',  # temporary weights for predictive features of env.
+        # - dynamical parameters
+        'tau',  # expected time for transition from the problem to the goal state
+        'threshold',  # for the activation
+        'noise',  # random value to be added to the FS activation
+        'k',
+        'x0',
+        'pr_threshold',  # for the prediction
+        'pr_k',
+        'pr_x0',
+        # - state variables
+        'problemState',  # input for the features of the problem to be solved by FS
+        'goalState',  # input for the features of the required solution
+        'lateralState',  # input for the lateral inhibition (activation)
+        'controlState',  # input for the top-down control
+        'activity',  # current value of FS activity
+        'oldActivity',  # activity of the previous update (input of other FSs)
+        '_wasActive',  # history of FS activity, two bits (see wasActive)
+        'onTime',  # the period of current FS's activity
+        'startTime',  # time of the activation for the current FS's activity
+        'mismatch',  # current value of mismatch between goal and current state
+        'epoch',  # epoch of the network (FSFlags.FlagIndex) the state belongs to
+        # - flags (isActive, isLearning, failed and wasUsed are properties, see flagProperty)
+        '_isActive',  # presence of FS activity
+        '_isLearning',  # learning state
+        '_failed',  # FS was unable to achieve the goal state
+        '_wasUsed',  # FS was already activated during current goal-directed behavior
+        'isInput',  # is true if value is set externally
+        'isOutput',  # is true if the value is not predicted
+        'exactInputMatch',  # is true if the FS should be (de)activated only
+        # in the case when the input exactly matches the weights
+        # - network
+        'flagIndex',  # FlagIndex of the network (FSFlags), None for a stand alone FS
+        'links')  # LinkStore of the network (FSLinks), None for a stand alone FS
+
+    def __init__(self):
+        """"Create and initialize FS."""
+        self.flagIndex = None
+        self.links = None
+        self.ID = 0
+        self.tau = 1
+        self.threshold = 0.95
+        self.noise = 0.001
+        self.k = 10  # k and x0 are chosen to have output 0.5 for normalized weighted
+        self.x0 = 0.5  # input of 0.5 and high activation for input = 1
+        self.pr_threshold = self.threshold
+        self.pr_k = self.k
+        self.pr_x0 = self.x0
+        self.activity = 0.
+        self.oldActivity = 0.
+        self._wasActive = 0  # depth of the activation memory is 2
+        self.onTime = 0.
+        self.startTime = 0.
+        self.mismatch = 0.
+        self.epoch = 0
+        self.isActive = False
+        self.isLearning = False
+        self.failed = False
+        self.wasUsed = True
+        self.isInput = False
+        self.isOutput = False
+        self.exactInputMatch = False
+
+    def _getWasActive(self):
+        """[activity before the last update, activity at the last update]"""
+        return [bool(self._wasActive & 2), bool(self._wasActive & 1)]
+
+    def _setWasActive(self, value):
+        self._wasActive = 2 * bool(value[-2]) + bool(value[-1])
+
+    def _delWasActive(self):
+        object.__delattr__(self, '_wasActive')
+
+    wasActive = property(_getWasActive, _setWasActive, _delWasActive)
+
+    def __getstate__(self):
+        """State for copy and pickle: a copy of FS does not belong to a network"""
+
+        state = self.fields()
+        for name in networkNames:
+            state.pop(name, None)
+
+        return state
+
+    def __setstate__(self, state):
+        self.flagIndex = self.links = None
+        for name, value in state.iteritems():
+            object.__setattr__(self, name, value)
+
+    def refresh(self):
+        """Resets the state of the FS if it belongs to an epoch before the last reset of the
+        network (FSFlags.FlagIndex.newEpoch), the flags are already cleared in the index"""
+
+        if self.flagIndex is not None and self.epoch != self.flagIndex.epoch:
+            self.epoch = self.flagIndex.epoch
+            for name, value in resetState:  # the flags are set without reporting them
+                object.__setattr__(self, flagSlots.get(name, name), value)
+            self._wasActive = 0
+
+    def update(self, time, rnd=None):  # net is a dictionary {FSID: AtomFS}
+        """Updates current state of FS."""
+
+        self.refresh()
+        self._wasActive = (self._wasActive & 1) * 2 + bool(self._isActive)
+
+        return self.calcCore(time, rnd)
+
+    def setFSActivation(self, outValue):
+
+        self.refresh()
+        self._wasActive = (self._wasActive & 1) * 2 + bool(self._isActive)
+        self.oldActivity = outValue
+        self.activity = outValue
+        self.isActive = True
+
+        return self.activity
+
+
+def flagProperty(name):
+    """Returns a property of the flag stored in the slot _name: the FlagIndex of the network
+    is told about a change of the value only"""
+
+    slot = flagSlots[name]
+
+    def setter(self, value):
+        index = self.flagIndex
+        if index is not None and bool(value) != bool(getattr(self, slot, False)):
+            index.change(self.ID, name, value)
+        object.__setattr__(self, slot, value)
+
+    def deleter(self):
+        object.__delattr__(self, slot)
+
+    return property(operator.attrgetter(slot), setter, deleter)
+
+
+for _name in FSFlags.flagNames:
+    setattr(AtomFS, _name, flagProperty(_name))
+
 # end of AtomFS class
\ No newline at end of file
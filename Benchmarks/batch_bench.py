@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Throughput of FSNetworkBatch against K independent FSNetworks on the T-maze
+
+K agents learn the stochastic T-maze (FSEnv.HypercubeEnv) as one batch
+with a shared engine, as K networks with their own engines and as K
+networks updated FS by FS. Network k of every mode gets the same seed, so
+the agents follow the same trajectories and reach the same goals. For
+every K prints agent steps per second of every mode and the speedup of
+the batch over the independent networks of both kinds:
+
+    python batch_bench.py [--K 1,4,16,64] [--dim 4] [--period 300]
+
+Created on Sun Oct 18 19:34:19 2026
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import FSBatch
+import FSEnv
+import FSNpy as FSN
+
+
+def builder(dim):
+    """Returns function creating the control network of the T-maze in a network"""
+
+    def build(net):
+        net.initCtrlNet(dim, 2 * dim, 1)
+        goalID = net.goalFS.keys()[0]
+        net.addActionLinks([[l, goalID, FSEnv.ind2St(0, dim)[l]] for l in range(dim)])
+        net.addPredictionLinks([[l, goalID, FSEnv.ind2St((1 << dim) - 1, dim)[l]]
+                                for l in range(dim)])
+
+    return build
+
+
+def run(mode, K, dim, period, seed=0):
+    """Runs K agents in the mode ('batch', 'engine' or 'objects'),
+    returns (run time, goals reached by the agents)"""
+
+    build = builder(dim)
+    batch = FSBatch.FSNetworkBatch(K, build, seed=seed)
+    if mode == 'batch':
+        nets = batch.nets
+    else:
+        nets = []
+        for k in range(K):
+            net = FSN.FSNetwork(seed=batch.seeds[k])
+            build(net)
+            if mode == 'engine':
+                net.useEngine()
+            nets.append(net)
+    env = FSEnv.HypercubeEnv(dim, 'fork', True, K, rng=np.random.RandomState(seed))
+    outIDs = np.array(sorted(nets[0].outFS.keys()))
+
+    t0 = time.time()
+    for t in range(period):
+        if mode == 'batch':
+            batch.step(t, env.inputs())
+            actions = batch.activeOutputs()
+        else:
+            actions = []
+            for k, net in enumerate(nets):
+                net.step(t, env.inputs(k))
+                active = [fs.isActive for fs in sorted(net.outFS.values(), key=lambda fs: fs.ID)]
+                actions.append(outIDs[np.argmax(active)] if any(active) else -1)
+        for k in np.nonzero(env.act(np.maximum(actions, 0)))[0]:
+            nets[k].resetActivity()
+
+    return time.time() - t0, env.goalsReached.tolist()
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    dim = int(option('--dim', 4))
+    period = int(option('--period', 300))
+    stdout = sys.stdout
+    print '%4s %14s %14s %14s %10s %10s %6s' % ('K', 'batch st/s', 'engine st/s', 'objects st/s',
+                                                'vs engine', 'vs objects', 'same')
+    for K in [int(K) for K in option('--K', '1,4,16,64').split(',')]:
+        results = {}
+        sys.stdout = open(os.devnull, 'w')  # createFS reports new FSs
+        try:
+            for mode in ('batch', 'engine', 'objects'):
+                results[mode] = run(mode, K, dim, period)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        rate = dict((mode, K * period / seconds) for mode, (seconds, goals) in results.iteritems())
+        same = results['batch'][1] == results['engine'][1] == results['objects'][1]
+        print '%4d %14.1f %14.1f %14.1f %10.2f %10.2f %6s' % (
+            K, rate['batch'], rate['engine'], rate['objects'], rate['batch'] / rate['engine'],
+            rate['batch'] / rate['objects'], same)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""T-maze runs with the hidden layer unlimited and limited by every eviction policy
+
+Prints goals reached, the number of hidden FSs, evicted FSs and the step
+time of the first and the last quarter of the run (FSExperiment):
+
+    python eviction_bench.py [--dim 4] [--period 3000] [--capacity 8] [--engine]
+
+Created on Sun Oct 18 18:28:33 2026
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import FSExperiment
+import FSEviction
+import FSNpy as FSN
+
+
+def run(config):
+    """Runs the experiment of the config, returns (result, per-step times)"""
+
+    times = []
+    step = FSN.FSNetwork.step
+
+    def timedStep(net, time_, inputStates):
+        t0 = time.time()
+        result = step(net, time_, inputStates)
+        times.append(time.time() - t0)
+        return result
+
+    FSN.FSNetwork.step = timedStep
+    try:
+        result = FSExperiment.runExperiment(config)
+    finally:
+        FSN.FSNetwork.step = step
+
+    return result, times
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return int(args[args.index(name) + 1]) if name in args else default
+
+    base = {'dim': option('--dim', 4), 'period': option('--period', 3000), 'seed': 1,
+            'engine': '--engine' in args}
+    capacity = option('--capacity', 8)
+    quarter = base['period'] / 4
+    print '%-10s %8s %6s %6s %8s %16s %16s' % ('policy', 'capacity', 'goals', 'NFS', 'evicted',
+                                               'first 1/4 ms', 'last 1/4 ms')
+    for policy in [None] + sorted(FSEviction.policies):
+        config = dict(base, capacity=capacity if policy else None, eviction=policy or 'lru')
+        result, times = run(config)
+        print '%-10s %8s %6d %6d %8d %16.3f %16.3f' % (
+            policy or 'unlimited', config['capacity'], result['goals'], result['NFS'], result['evicted'],
+            1e3 * sum(times[:quarter]) / quarter, 1e3 * sum(times[-quarter:]) / quarter)
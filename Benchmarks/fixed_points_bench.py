@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Fixed points of the activity map: scan of sigmoid_map vs bracketing of FSDynamics
+
+The scan evaluates the map for res x res (x0, x) pairs with scalar calls and
+keeps x with |x - f(x)| < 1 / res, which also holds near a fold without a
+fixed point; FSDynamics.fixedPoints bisects the
+monotone brackets of all x0 at once. Both are run for the map
+x -> sigmoid(x, 10, x0) of sigmoid_map.py:
+
+    python fixed_points_bench.py [res]
+
+Created on Sun Oct 18 18:18:31 2026
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import FSDynamics as FSD
+
+
+def scan(res, k):
+    hits = []
+    for x0i in range(res):
+        x0 = (x0i + 0.) / res
+        for xi in range(res):
+            x = (xi + 0.) / res
+            if np.absolute(x - 1 / (1 + np.exp(-k * (x - x0)))) < (1. / res):
+                hits.append((x0, x))
+    return hits
+
+
+if __name__ == '__main__':
+    res = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    t0 = time.time()
+    hits = scan(res, 10)
+    tScan = time.time() - t0
+    t0 = time.time()
+    points, stable = FSD.fixedPoints(10, np.arange(res) / float(res), 0., a=1.)
+    tBracket = time.time() - t0
+    print 'res %d: scan %.3f s (%d hits), bracketing %.4f s (%d fixed points), speedup %.0f' % \
+          (res, tScan, len(hits), tBracket, (~np.isnan(points)).sum(), tScan / tBracket)
+    x0, x = np.array(hits).T
+    nearest = points[np.rint(x0 * res).astype(int)]
+    error = np.nanmin(np.abs(x[:, None] - nearest), axis=1)
+    print 'scan hits farther than 2 grid steps from a fixed point (near the folds): %d' % (error > 2. / res).sum()
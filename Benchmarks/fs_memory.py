@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Memory footprint of FSs: stand alone AtomFS, FSs of a network, FSs bound to the engine
+(handles of the columns of the engine arrays, see FSEngine.EngineFS)
+
+Every mode is measured in a separate process as the growth of the resident
+set size after creating n FSs without links (links are kept by the link
+store, see FSLinks):
+
+    python fs_memory.py [n]
+
+Links and the activity history are not counted; the peak RSS of whole
+networks with them is measured by scaling_bench.py.
+
+Created on Sun Oct 18 18:25:35 2026
+"""
+import os
+import sys
+import gc
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import AtomFS as FS
+import FSNpy as FSN
+
+modes = ('bare', 'net', 'engine')
+
+
+def rss():
+    """Returns the resident set size of the process in bytes"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def measure(mode, n):
+    """Returns bytes per FS of n FSs created in the mode"""
+
+    gc.collect()
+    before = rss()
+    if mode == 'bare':
+        fss = [FS.AtomFS() for i in range(n)]
+    else:
+        net = FSN.FSNetwork()
+        if mode == 'engine':
+            net.useEngine()
+        for i in range(n):
+            fs = net.add(FS.AtomFS())
+            net.hiddenFS[fs.ID] = fs
+    gc.collect()
+
+    return (rss() - before) / float(n)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--one' in args:
+        print measure(args[1], int(args[2]))
+    else:
+        n = int(args[0]) if args else 100000
+        for mode in modes:
+            out = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--one', mode, str(n)])
+            perFS = float(out.split()[-1])
+            print '%-7s %8d FSs %7.0f bytes per FS %8.1f MB per million FSs' % (mode, n, perFS, perFS)
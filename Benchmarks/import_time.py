@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Import time of the core modules and of the plotting libraries
+
+Every import is timed in a fresh interpreter (median of the repeats) and
+the heavy libraries loaded by it are listed, so the core (AtomFS, FSNpy,
+FSExperiment) can be checked to stay free of scipy, matplotlib and
+networkx:
+
+    python import_time.py [--repeat 5]
+
+Created on Sun Oct 18 18:09:10 2026
+"""
+import os
+import sys
+import json
+import subprocess
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+modules = ['numpy', 'AtomFS', 'FSNpy', 'FSExperiment', 'FSPlot',
+           'scipy', 'matplotlib.pyplot', 'networkx', 'VizFSN']
+heavy = ('scipy', 'matplotlib', 'networkx')
+
+probe = '''
+import sys, json, timeit
+t0 = timeit.default_timer()
+try:
+    __import__(%r)
+    error = None
+except ImportError as e:
+    error = str(e)
+seconds = timeit.default_timer() - t0
+print json.dumps({'seconds': seconds, 'error': error,
+                  'loaded': [m for m in %r if m in sys.modules]})
+'''
+
+
+def measure(module, repeat=5):
+    """Returns dict with median import time of the module in a fresh interpreter"""
+
+    runs = []
+    for i in range(repeat):
+        out = subprocess.check_output([sys.executable, '-c', probe % (module, heavy)], cwd=root)
+        runs.append(json.loads(out.splitlines()[-1]))
+    seconds = sorted(r['seconds'] for r in runs)
+
+    return {'module': module, 'seconds': seconds[len(seconds) // 2],
+            'error': runs[0]['error'], 'loaded': runs[0]['loaded']}
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    repeat = int(args[args.index('--repeat') + 1]) if '--repeat' in args else 5
+    print '%-20s %10s  %s' % ('module', 'ms', 'heavy libraries loaded')
+    for module in modules:
+        r = measure(module, repeat)
+        if r['error']:
+            print '%-20s %10s  (%s)' % (module, '-', r['error'])
+        else:
+            print '%-20s %10.1f  %s' % (module, 1e3 * r['seconds'], ', '.join(r['loaded']) or '-')
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Micro-benchmark of the input kernels of FS (FSKernels) against the
+former list-of-lists implementation of AtomFS.rbf and AtomFS.weightedSum
+
+Created on Sun Oct 18 17:44:22 2026
+"""
+import os
+import sys
+import random
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import FSKernels
+
+
+def rbfRef(inputs, centroids, weights):  # former AtomFS.rbf
+    if len(inputs) > 0:
+        icw = np.array([[inputs[i], centroids[i], weights[i]]
+                        for i in inputs.keys()])
+        sw = np.absolute(np.subtract(icw[:, 0], icw[:, 1]))
+        return np.exp(-10 * np.multiply(sw, icw[:, 2]).sum())
+    else:
+        return 0
+
+
+def weightedSumRef(inputs, weights):  # former AtomFS.weightedSum
+    if len(inputs) > 0:
+        return np.array([[inputs[i], weights[i]]
+                         for i in weights.iterkeys() if i in inputs]).prod(1).sum()
+    else:
+        return 0
+
+
+def links(fanIn):
+    keys = random.sample(range(1000), fanIn)
+    inputs = dict((k, random.random()) for k in keys)
+    centroids = dict((k, random.random()) for k in keys)
+    weights = dict((k, random.uniform(-1, 1)) for k in keys)
+    return inputs, centroids, weights
+
+
+repeat = 20000
+random.seed(0)
+print 'scalar kernels, us per call'
+print 'fan-in   rbf old   rbf new   wsum old  wsum new'
+for fanIn in (1, 2, 3, 5, 8, 20):
+    inputs, centroids, weights = links(fanIn)
+    assert rbfRef(inputs, centroids, weights) == FSKernels.rbf(inputs, centroids, weights)
+    assert weightedSumRef(inputs, weights) == FSKernels.weightedSum(inputs, weights)
+    t = [timeit.timeit(lambda: rbfRef(inputs, centroids, weights), number=repeat),
+         timeit.timeit(lambda: FSKernels.rbf(inputs, centroids, weights), number=repeat),
+         timeit.timeit(lambda: weightedSumRef(inputs, weights), number=repeat),
+         timeit.timeit(lambda: FSKernels.weightedSum(inputs, weights), number=repeat)]
+    print '%6d' % fanIn, ' '.join('%9.2f' % (1e6 * x / repeat) for x in t)
+
+print
+print 'batched rbf, us per FS'
+print '   FSs  fan-in   scalar old   batched'
+for nFS, fanIn in ((100, 3), (1000, 3), (10000, 3), (10000, 10)):
+    fss = [links(fanIn) for i in range(nFS)]
+    x = np.zeros(1000)
+    gate = np.ones(1000, dtype=bool)
+    dst, src, v, w = [], [], [], []
+    for i, (inputs, centroids, weights) in enumerate(fss):
+        for k in inputs:
+            x[k] = inputs[k]  # all FSs see the same activity of the source
+        for k in inputs:
+            dst.append(i)
+            src.append(k)
+            v.append(centroids[k])
+            w.append(weights[k])
+    dst, src, v, w = np.array(dst), np.array(src), np.array(v), np.array(w)
+    buffers = FSKernels.KernelBuffers()
+    match, count = FSKernels.rbfBatch(dst, src, v, w, x, gate, nFS, buffers)
+    for i, (inputs, centroids, weights) in enumerate(fss):
+        inputs = dict((k, x[k]) for k in inputs)
+        ref = rbfRef(inputs, centroids, weights)
+        assert abs(match[i] - ref) <= 1e-12 * max(1., abs(ref))
+    number = max(1, 100000 / nFS)
+    told = timeit.timeit(lambda: [rbfRef(dict((k, x[k]) for k in fs[0]), fs[1], fs[2])
+                                  for fs in fss], number=max(1, number / 10)) / max(1, number / 10)
+    tnew = timeit.timeit(lambda: FSKernels.rbfBatch(dst, src, v, w, x, gate, nFS, buffers),
+                         number=number) / number
+    print '%6d %7d %12.3f %9.3f' % (nFS, fanIn, 1e6 * told / nFS, 1e6 * tnew / nFS)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Rendering time of VizFSN.drawNet: annotated arrows vs collections
+
+Networks of scaling_bench.build are drawn into an off-screen (Agg) figure;
+the time includes rendering of the canvas. The arrow path is measured only
+up to --arrowsMax links, it takes minutes for larger networks:
+
+    python render_bench.py [--sizes 10,100,1000] [--arrowsMax 5000]
+
+Created on Sun Oct 18 18:12:21 2026
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import scaling_bench
+import FSPlot
+import VizFSN
+
+
+def render(net, fast):
+    """Returns seconds to draw the network and render the figure"""
+
+    plt = FSPlot.pyplot()
+    fig = plt.figure(figsize=(8, 8))
+    t0 = time.time()
+    VizFSN.drawNet(net.net, fast)
+    fig.canvas.draw()
+    seconds = time.time() - t0
+    plt.close(fig)
+
+    return seconds
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    sizes = [10, 100, 1000]
+    if '--sizes' in args:
+        sizes = [int(s) for s in args[args.index('--sizes') + 1].split(',')]
+    arrowsMax = int(args[args.index('--arrowsMax') + 1]) if '--arrowsMax' in args else 5000
+    for size in sizes:
+        net = scaling_bench.build(size)
+        nLinks = sum(len(m) for m in net.links.matrices.values())
+        first = render(net, True)
+        again = render(net, True)  # the layout is cached
+        arrows = render(net, False) if nLinks <= arrowsMax else float('nan')
+        print '%7d FSs %8d links  collections %7.3f s (cached layout %7.3f s)  arrows %8.3f s' % \
+            (len(net.net), nLinks, first, again, arrows)
+        sys.stdout.flush()
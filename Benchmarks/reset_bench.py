@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Cost of an episode boundary: FSNetwork.resetActivity (lazy, epoch of the
+flag index) against the eager reset of every FS, on the synthetic networks
+of scaling_bench
+
+For every size prints the time of the reset call and of the first step
+after it (which resets the slots with --engine), averaged over the
+episodes; FS objects are reset by the call itself (see resetActivity):
+
+    python reset_bench.py [--sizes 100,1000,10000] [--episodes 20] [--engine]
+
+Created on Sun Oct 18 18:37:00 2026
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import scaling_bench
+
+
+def eagerReset(net):
+    """resetActivity visiting every FS (the reset before the epochs)"""
+
+    for fs in net.net.keys():
+        net.net[fs].resetActivity()
+    net.failedFS = []
+    net.activatedFS = []
+    for fs in net.usedFS:
+        net.net[fs].wasUsed = False
+    net.usedFS = []
+    for fs in net.memoryTrace.values():
+        del net.memoryTrace[fs.ID]
+        net.removeFS(fs.ID)
+
+
+def measure(size, reset, episodes, engine):
+    """Returns (reset ms, first step ms) averaged over the episodes of two steps"""
+
+    net = scaling_bench.build(size)
+    if engine:
+        net.useEngine()
+    inputs = dict((ID, 1.) for ID in net.inFS)
+    resetTime = stepTime = 0.
+    devnull = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        t = 0
+        for episode in range(episodes):
+            net.step(t, inputs)
+            t0 = time.time()
+            reset(net)
+            t1 = time.time()
+            net.step(t + 1, inputs)
+            resetTime += t1 - t0
+            stepTime += time.time() - t1
+            t += 2
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+
+    return 1e3 * resetTime / episodes, 1e3 * stepTime / episodes
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+
+    sizes = [int(s) for s in option('--sizes', '100,1000,10000').split(',')]
+    episodes = int(option('--episodes', 20))
+    engine = '--engine' in args
+    print '%8s %14s %14s %14s %14s' % ('hidden', 'eager reset', 'eager step', 'lazy reset', 'lazy step')
+    for size in sizes:
+        eager = measure(size, eagerReset, episodes, engine)
+        lazy = measure(size, lambda net: net.resetActivity(), episodes, engine)
+        print '%8d %11.3f ms %11.3f ms %11.3f ms %11.3f ms' % ((size,) + eager + lazy)
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""Scaling benchmark of FSNetwork: step, learn, createFS, removeFS, duplicate
+and logActivity on synthetic networks of 10 to 100k hidden FSs
+
+Every size is measured in a separate process, so the peak RSS is the one of
+that size. Results are written as JSON (with the commit and versions) to
+compare them across commits, by default to results/scaling_<commit>.json in
+the working directory (results/ is ignored by git):
+
+The networks keep no history unless --hist sets its depth (see
+FSNetwork), so the peak RSS of the default run is that of a network
+without a HistoryRecorder:
+
+    python scaling_bench.py [--sizes 10,100,1000] [--engine] [--hist 100] [--out file.json]
+    python scaling_bench.py --compare old.json new.json
+
+Created on Sun Oct 18 17:54:17 2026
+"""
+import os
+import sys
+import json
+import time
+import random
+import platform
+import resource
+import subprocess
+import numpy as np
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+import AtomFS as FS
+import FSNpy as FSN
+
+defaultFanIn = {'problem': 4, 'goal': 2, 'lateral': 4, 'control': 1}
+defaultSizes = [10, 100, 1000, 10000, 100000]
+
+
+def build(nHidden, fanIn=None, activeFrac=0.1, nIn=16, nOut=4, seed=0, histDepth=None):
+    """Creates a control network with nHidden hidden FSs
+    :param fanIn: number of incoming links of a hidden FS per link type
+    :param activeFrac: fraction of hidden FSs which are active at every step
+    :param histDepth: depth of the activity history (None - no history)
+    """
+
+    fanIn = dict(defaultFanIn, **(fanIn or {}))
+    rs = random.Random(seed)
+    net = FSN.FSNetwork(histDepth=histDepth, seed=seed)
+    net.initCtrlNet(nIn, nOut, 1)
+    ins = net.inFS.keys()
+    outs = net.outFS.keys()
+    goal = net.goalFS.keys()[0]
+    hidden = []
+    for i in range(nHidden):
+        fs = net.add(FS.AtomFS())
+        fs.tau = 1e9  # hidden FSs do not fail during the benchmark
+        fs.wasUsed = False
+        fs.x0 = -1. if rs.random() < activeFrac else 5.
+        net.hiddenFS[fs.ID] = fs
+        hidden.append(fs.ID)
+    for ID in hidden:
+        net.addActionLinks([[s, ID, rs.random()] for s in rs.sample(ins, fanIn['problem'])])
+        net.addPredictionLinks([[s, ID, rs.random()] for s in rs.sample(ins, fanIn['goal'])])
+        net.addLateralLinks([[rs.choice(hidden), ID, rs.uniform(-0.01, 0.01)]
+                             for k in range(fanIn['lateral'])])
+        net.addControlLinks([[rs.choice(outs + [goal]), ID, 0.1]
+                             for k in range(fanIn['control'])])
+    for ID in outs:
+        net.addControlLinks([[rs.choice(hidden), ID, 2.] for k in range(4)])
+        net.addLateralLinks([[s, ID, -0.5] for s in outs if s != ID])
+    net.addActionLinks([[s, goal, 1.] for s in ins])
+    net.addPredictionLinks([[s, goal, 0.] for s in ins])
+
+    return net
+
+
+def timed(function, acc):
+    """Wraps function to accumulate its run time in acc[0] and number of calls in acc[1]"""
+
+    def wrapper(*args, **kwargs):
+        t0 = time.time()
+        result = function(*args, **kwargs)
+        acc[0] += time.time() - t0
+        acc[1] += 1
+        return result
+
+    return wrapper
+
+
+def measure(size, engine=False, steps=None, ops=None, histDepth=None):
+    """Runs the benchmark for one size, returns dict of results"""
+
+    steps = steps or max(3, min(100, 20000 / size))
+    ops = ops or max(5, min(200, 20000 / size))
+    rs = random.Random(1)
+    result = {'size': size, 'engine': engine, 'steps': steps, 'ops': ops, 'histDepth': histDepth}
+
+    t0 = time.time()
+    net = build(size, histDepth=histDepth)
+    if engine:
+        net.useEngine()
+    result['build_s'] = time.time() - t0
+    result['nFS'] = len(net.net)
+    result['nLinks'] = sum(len(m) for m in net.links.matrices.values())
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')  # learn prints new FSs
+    try:
+        learn = [0., 0]
+        net.learn = timed(net.learn, learn)
+        inputs = [dict((i, rs.random()) for i in net.inFS) for k in range(4)]
+        t0 = time.time()
+        for t in range(steps):
+            net.step(t, inputs[t % 4])
+        step = time.time() - t0
+        result['stepsPerSec'] = steps / step
+        result['step_s'] = step / steps
+        result['learn_s'] = learn[0] / max(learn[1], 1)
+        del net.learn
+
+        t0 = time.time()
+        for t in range(ops):
+            net.logActivity(steps, 0)
+        result['logActivity_s'] = (time.time() - t0) / ops
+
+        t0 = time.time()
+        created = [net.createFS(steps).ID for k in range(ops)]
+        result['createFS_s'] = (time.time() - t0) / ops
+        hidden = net.hiddenFS.keys()
+        t0 = time.time()
+        created += [net.duplicate(rs.choice(hidden), True).ID for k in range(ops)]
+        result['duplicate_s'] = (time.time() - t0) / ops
+        t0 = time.time()
+        for ID in created:
+            net.removeFS(ID)
+        result['removeFS_s'] = (time.time() - t0) / len(created)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    result['peakRSS_MB'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+    return result
+
+
+def commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=root).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def runAll(sizes, engine, out, histDepth=None):
+    results = []
+    for size in sizes:
+        line = subprocess.check_output([sys.executable, os.path.abspath(__file__),
+                                        '--one', str(size)] + (['--engine'] if engine else []) +
+                                       (['--hist', str(histDepth)] if histDepth else []))
+        result = json.loads(line.splitlines()[-1])
+        results.append(result)
+        print '%7d FSs %9d links  %9.2f steps/s  step %.2e s  learn %.2e s  createFS %.2e s  ' \
+              'duplicate %.2e s  removeFS %.2e s  logActivity %.2e s  %7.1f MB' % \
+              (result['nFS'], result['nLinks'], result['stepsPerSec'], result['step_s'],
+               result['learn_s'], result['createFS_s'], result['duplicate_s'],
+               result['removeFS_s'], result['logActivity_s'], result['peakRSS_MB'])
+        sys.stdout.flush()
+    report = {'commit': commit(), 'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'host': platform.node(), 'python': platform.python_version(),
+              'numpy': np.__version__, 'results': results}
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=1)
+    print 'results are written to', out
+
+
+def compare(old, new):
+    """Prints ratios new / old of the timings of two results files"""
+
+    reports = [json.load(open(path)) for path in (old, new)]
+    print 'commits:', reports[0]['commit'], '->', reports[1]['commit'], '(new / old)'
+    fields = ('step_s', 'learn_s', 'createFS_s', 'duplicate_s', 'removeFS_s',
+              'logActivity_s', 'peakRSS_MB')
+    print '   size engine ' + ' '.join('%12s' % f for f in fields)
+    oldResults = dict(((r['size'], r['engine']), r) for r in reports[0]['results'])
+    for r in reports[1]['results']:
+        o = oldResults.get((r['size'], r['engine']))
+        if o:
+            print '%7d %6s ' % (r['size'], r['engine']) + \
+                  ' '.join('%12.2f' % (r[f] / o[f] if o[f] else np.nan) for f in fields)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--compare' in args:
+        i = args.index('--compare')
+        compare(args[i + 1], args[i + 2])
+    elif '--one' in args:
+        histDepth = int(args[args.index('--hist') + 1]) if '--hist' in args else None
+        print json.dumps(measure(int(args[args.index('--one') + 1]), '--engine' in args,
+                                 histDepth=histDepth))
+    else:
+        sizes = defaultSizes
+        if '--sizes' in args:
+            sizes = [int(s) for s in args[args.index('--sizes') + 1].split(',')]
+        engine = '--engine' in args
+        histDepth = int(args[args.index('--hist') + 1]) if '--hist' in args else None
+        out = os.path.join('results', 'scaling_%s%s%s.json' % (commit() or 'results',
+                                                                '_engine' if engine else '',
+                                                                '_hist%d' % histDepth if histDepth else ''))
+        if '--out' in args:
+            out = args[args.index('--out') + 1]
+        elif not os.path.isdir('results'):
+            os.makedirs('results')
+        runAll(sizes, engine, out, histDepth)
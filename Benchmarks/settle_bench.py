@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Fixed reentry against the adaptive reentry (FSNetwork.settleTol) on the T-maze
+
+For every mode prints goals reached, updates per step (mean, median and the
+share of steps at the maxReentry bound) and the run time summed over the
+seeds (FSExperiment):
+
+    python settle_bench.py [--dim 3] [--period 500] [--seeds 6] [--max 10] [--engine]
+
+Created on Sun Oct 18 18:31:43 2026
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import FSExperiment
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+
+    def option(name, default):
+        return int(args[args.index(name) + 1]) if name in args else default
+
+    maxReentry = option('--max', 10)
+    base = {'dim': option('--dim', 3), 'period': option('--period', 500), 'maxReentry': maxReentry,
+            'engine': '--engine' in args}
+    modes = [('fixed 2', {'reentry': 2}), ('fixed %d' % maxReentry, {'reentry': maxReentry})] + \
+        [('settle %g' % tol, {'settleTol': tol}) for tol in (1e-2, 1e-3, 1e-4)]
+    print '%-12s %6s %10s %8s %8s %8s' % ('mode', 'goals', 'loops', 'median', 'at max', 'time s')
+    for name, mode in modes:
+        goals = []
+        loops = []
+        seconds = 0.
+        for seed in range(option('--seeds', 6)):
+            result = FSExperiment.runExperiment(dict(base, seed=seed, **mode))
+            goals.append(result['goals'])
+            loops.extend(result['loopsDyn'])
+            seconds += result['time']
+        loops = np.array(loops)
+        print '%-12s %6.1f %10.2f %8d %8.3f %8.2f' % (name, np.mean(goals), loops.mean(), np.median(loops),
+                                                     (loops == maxReentry).mean(), seconds)
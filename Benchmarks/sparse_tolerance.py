@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Tolerance check and timing of the event-driven update of hidden FSs
+
+Two copies of a synthetic network (scaling_bench.build) are updated with
+the same inputs and noise, one with the dense engine update and one with
+the event-driven update (FSEngine, updateLayer with tol). Inputs are bits
+held for several steps as in the hypercube tasks, structural learning is
+off, inactive FSs are moved to the sensitive part of the sigmoid. After
+every loop the activity of every FS of the event-driven copy is checked
+against the bound of the FSEngine docstring
+
+    (L tol + k / 4 (2 noise + G tol)) / (1 - L),  L = 0.05 k,
+
+and flags of FSs are compared. Time of the hidden layer and of the whole
+update is reported for both copies. The script exits with status 1 if the
+bound is violated:
+
+    python sparse_tolerance.py [--size 10000] [--tol 1e-4] [--steps 50]
+
+Created on Sun Oct 18 18:07:01 2026
+"""
+import os
+import sys
+import time
+import random
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import scaling_bench
+import FSLinks
+
+gains = {'problem': 8., 'goal': 10., 'lateral': 1., 'control': 0.5}  # input gain per link type
+
+
+def bound(net, ids, tol):
+    """Returns the bound of the deviation of activity of the FSs ids"""
+
+    pos = dict((ID, i) for i, ID in enumerate(ids))
+    G = np.zeros(len(ids))
+    for kind in FSLinks.linkTypes:
+        e, dst, src, w, v = net.links[kind].edges('dst')
+        for d, weight in zip(dst.tolist(), np.abs(w).tolist()):
+            if d in pos:
+                G[pos[d]] += gains[kind] * weight
+    k = np.array([net.net[ID].k for ID in ids])
+    noise = np.array([net.net[ID].noise for ID in ids])
+    L = 0.05 * k
+
+    return np.where(L < 1, (L * tol + k / 4 * (2 * noise + G * tol)) / (1 - L), np.inf)
+
+
+def run(size, tol, steps, hold=5, seed=0):
+    nets = [scaling_bench.build(size, seed=seed) for k in range(2)]
+    for net in nets:  # inactive FSs in the sensitive part of the sigmoid
+        rs = random.Random(seed)
+        for ID in sorted(net.hiddenFS):
+            if net.net[ID].x0 > 0:
+                net.net[ID].x0 = rs.uniform(0.2, 1.)
+    nets[0].useEngine()
+    nets[1].useEngine(sparseTol=tol)
+    profiles = [net.setProfiling() for net in nets]  # time of the hidden layer, evaluated FSs
+    ids = sorted(nets[0].net)
+    limit = bound(nets[1], ids, tol)
+    rs = random.Random(seed)
+    worst = flagErrors = evaluated = 0
+    spent = [0., 0.]  # time of the updates of the copies
+    for t in range(steps):
+        if t % hold == 0:
+            inputs = dict((i, float(rs.random() < 0.5)) for i in nets[0].inFS)
+        for r in range(nets[0].reentry):
+            profiles[1].evaluated = 0
+            for k, (net, profile) in enumerate(zip(nets, profiles)):
+                profile.last = None
+                t0 = time.time()
+                net.update(t, inputs, r)
+                spent[k] += time.time() - t0
+            evaluated += profiles[1].evaluated - len(nets[1].goalFS) - len(nets[1].outFS)
+            slots = [net.domain.slotsOf(ids) for net in nets]
+            dense, sparse = [net.engine for net in nets]
+            deviation = np.abs(dense.activity[slots[0]] - sparse.activity[slots[1]])
+            flags = (dense.isActive[slots[0]] != sparse.isActive[slots[1]]) | \
+                (dense.failed[slots[0]] != sparse.failed[slots[1]])
+            flagErrors += flags.sum()
+            worst = max(worst, (deviation / limit)[~flags].max())
+
+    loops = steps * nets[0].reentry
+    hidden = [profile.phases['hidden'][0] / loops for profile in profiles]
+    print '%d FSs, tol %g: max deviation / bound %.3f, flag mismatches %d, ' \
+          'evaluated %.1f%% of hidden FSs' % \
+          (len(ids), tol, worst, flagErrors, 100. * evaluated / loops / len(nets[0].hiddenFS))
+    print '  hidden layer %.2e s dense, %.2e s event-driven (x%.1f)' % \
+          (hidden[0], hidden[1], hidden[0] / hidden[1])
+    print '  update       %.2e s dense, %.2e s event-driven (x%.1f)' % \
+          (spent[0] / loops, spent[1] / loops, spent[0] / spent[1])
+
+    return worst <= 1
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    size = int(args[args.index('--size') + 1]) if '--size' in args else 10000
+    tol = float(args[args.index('--tol') + 1]) if '--tol' in args else 1e-4
+    steps = int(args[args.index('--steps') + 1]) if '--steps' in args else 50
+    sys.exit(0 if run(size, tol, steps) else 1)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Batch of Functional Systems Networks stepped in lockstep
+
+FSNetworkBatch holds K networks with identical input, output and goal
+layouts (e.g. agents of a parameter sweep) in one shared FSEngine. Every
+layer (goals, hidden FSs, outputs) of all agents is updated with a single
+vectorized call, as are the activation of the inputs, the selection of
+the outputs and the end of an update. Structural learning (createFS,
+memoryTrace) and the logging of activity stay per agent.
+Benchmarks/batch_bench.py compares the throughput with K networks.
+
+Created on Sun Oct 18 17:48:31 2026
+"""
+
+import numpy as np
+import FSEngine
+import FSNpy as FSN
+
+
+class FSNetworkBatch(object):
+    """K networks built by the same function and updated together
+
+    :param K: number of networks (agents)
+    :param build: function build(net) which creates FSs and links of a network
+    :param seed: seed of the batch; network k gets its own seed self.seeds[k], so it
+        runs as FSNpy.FSNetwork(seed=self.seeds[k]) would run alone
+    :param sparseTol: tolerance of the event-driven update of hidden FSs (see FSEngine),
+        None - all FSs are evaluated
+    :param netArgs: keyword arguments of FSNpy.FSNetwork
+    """
+
+    def __init__(self, K, build, seed=None, sparseTol=None, **netArgs):
+        self.engine = FSEngine.FSEngine()
+        self.seeds = np.random.RandomState(seed).randint(2 ** 31 - 1, size=K)
+        self.sparseTol = sparseTol
+        self.nets = []
+        for k in range(K):
+            net = FSN.FSNetwork(seed=self.seeds[k], **netArgs)
+            build(net)
+            net.useEngine(engine=self.engine)
+            self.nets.append(net)
+        self.inIDs = sorted(self.nets[0].inFS.keys())
+        self.outIDs = sorted(self.nets[0].outFS.keys())
+        self.goalIDs = sorted(self.nets[0].goalFS.keys())
+        for net in self.nets:
+            if sorted(net.inFS.keys()) != self.inIDs or \
+                    sorted(net.outFS.keys()) != self.outIDs or \
+                    sorted(net.goalFS.keys()) != self.goalIDs:
+                raise ValueError('networks of the batch should have the same layout')
+            if net.settleTol is not None:
+                raise ValueError('networks of the batch are updated in lockstep, adaptive reentry '
+                                 '(settleTol) is not supported')
+        self.reentry = self.nets[0].reentry
+        # K x n slots of the fixed layers: inputs and outputs in the order of FS ids,
+        # goals and outputs also in the order of the dicts of every network
+        self.inSlots = self.layerSlots(lambda net: self.inIDs)
+        self.outSlots = self.layerSlots(lambda net: self.outIDs)
+        self.goals = [net.goalFS.keys() for net in self.nets]
+        self.goalSlots = self.layerSlots(lambda net: net.goalFS.keys())
+        self.outputs = [net.outFS.keys() for net in self.nets]
+        self.selectSlots = self.layerSlots(lambda net: net.outFS.keys())
+
+    def layerSlots(self, layer):
+        """Returns K x n array of slots of the FSs listed by layer(net) for every network"""
+
+        return np.array([net.domain.slotsOf(layer(net)) for net in self.nets], dtype=int)
+
+    def __len__(self):
+        return len(self.nets)
+
+    def __getitem__(self, k):
+        return self.nets[k]
+
+    def step(self, time, inputStates):
+        """Makes a step of all networks
+        :param time: current time
+        :param inputStates: K x nIn array of input values (inputs in the order of FS ids)
+        :return: K x nOut array of activities of the output FSs
+        """
+
+        inputStates = np.asarray(inputStates, dtype=float)
+        for net in self.nets:
+            net.updateWorkingMemory(time)
+            net.matchedFS = []
+
+        for t in range(self.reentry):
+            self.update(time, inputStates, t)
+
+        for net in self.nets:
+            net.loops = self.reentry
+            net.learn(time)
+
+        return self.outActivity()
+
+    def update(self, time, inputStates, t):
+        """Update of all networks given K x nIn values of the input FSs"""
+
+        engine = self.engine
+        engine.syncLinks()
+        engine.refresh()
+        engine.activate(self.inSlots.ravel(), inputStates.ravel())
+
+        hidden = [net.hiddenSlots() for net in self.nets]
+        hiddenSlots = [slots for ids, slots in hidden]
+        # noise of the goal, hidden and output layers of a network is drawn at once (the
+        # values are those of the draws per layer of FSNetwork.update)
+        nGoal, nOut = self.goalSlots.shape[1], self.selectSlots.shape[1]
+        rnd = [net.noise(nGoal + len(slots) + nOut) for net, slots in zip(self.nets, hiddenSlots)]
+        engine.updateLayer(self.goalSlots.ravel(), time, True,
+                           np.concatenate([r[:nGoal] for r in rnd]))
+        engine.updateLayer(np.concatenate(hiddenSlots), time, False,
+                           np.concatenate([r[nGoal:len(r) - nOut] for r in rnd]), self.sparseTol)
+        engine.updateLayer(self.selectSlots.ravel(), time, True,
+                           np.concatenate([r[len(r) - nOut:] for r in rnd]))
+        self.selectOut()
+        self.record(inputStates, [ids for ids, slots in hidden], hiddenSlots)
+        self.endUpdate(time, t, hiddenSlots)
+
+    def record(self, inputStates, hiddenIDs, hiddenSlots):
+        """Sets activation and mismatch dicts of every network after the update of the layers
+        (activities and mismatches of all networks are read with one gather)"""
+
+        slots = np.concatenate([part for k in range(len(self)) for part in
+                                (self.goalSlots[k], hiddenSlots[k], self.selectSlots[k])])
+        activation = self.engine.activity[slots].tolist()
+        mismatch = self.engine.mismatch[slots].tolist()
+        start = 0
+        for k, (net, values) in enumerate(zip(self.nets, inputStates.tolist())):
+            ids = self.goals[k] + hiddenIDs[k] + self.outputs[k]
+            end = start + len(ids)
+            net.activation = dict(zip(self.inIDs, values))
+            net.activation.update(zip(ids, activation[start:end]))
+            net.mismatch = dict(zip(ids, mismatch[start:end]))
+            start = end
+
+    def selectOut(self):
+        """FSNetwork.selectOut of all networks: leaves the most active output FS
+        active, networks without one activate an output FS at random"""
+
+        activity = self.engine.activity[self.selectSlots]
+        active = self.engine.isActive[self.selectSlots]
+        running = np.maximum.accumulate(np.hstack((np.zeros((len(self), 1)), activity)), 1)
+        record = activity > running[:, :-1]  # outputs that raise the running maximum
+        noActiveOut = ~(record & active).any(1)
+        best = record.shape[1] - 1 - record[:, ::-1].argmax(1)  # the first most active output
+        active[np.arange(len(self)), best] = False
+        for k, j in zip(*np.nonzero(active & ~noActiveOut[:, None])):
+            self.nets[k].outFS[self.outputs[k][j]].isActive = False
+        for k in np.nonzero(noActiveOut)[0]:  # random draws stay per network
+            net = self.nets[k]
+            if running[k, -1] == 0:
+                fs = self.outputs[k][net.rng.randint(len(self.outputs[k]))]
+            else:
+                fs = FSN.probSelValues(self.outputs[k], activity[k].tolist(), net.rng)
+            net.outFS[fs].isActive = True
+
+    def endUpdate(self, time, t, hiddenSlots):
+        """FSNetwork.endUpdate of all networks: re-checks goals, keeps activities
+        for the next loop and logs activity of every network"""
+
+        reached = self.engine.mismatch[self.goalSlots] >= self.engine.pr_threshold[self.goalSlots]
+        for k, g in zip(*np.nonzero(reached)):
+            self.nets[k].resetUsedFS(self.nets[k].goalFS[self.goals[k][g]])
+        slots = np.concatenate([self.goalSlots.ravel()] + hiddenSlots)
+        self.engine.oldActivity[slots] = self.engine.activity[slots]
+        for net in self.nets:
+            net.logActivity(time, t)
+
+    def outActivity(self):
+        """Returns K x nOut array of activities of the output FSs"""
+
+        return self.engine.activity[self.outSlots]
+
+    def activeOutputs(self):
+        """Returns array with id of the active output FS of every network (-1 if none)"""
+
+        active = self.engine.isActive[self.outSlots]
+        winner = np.array(self.outIDs)[active.argmax(1)]
+
+        return np.where(active.any(1), winner, -1)
+
+# end of FSBatch
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""Binary checkpoints of a Functional Systems Network
+
+snapshot(net) packs the complete state of FSNetwork (parameters and flags
+of all FSs, the four link types, layers and memoryTrace, idCounter, lists
+of the last update and the state of the random generator) into typed
+arrays; restore builds an independent network from them, so a network can
+be branched for what-if rollouts without deepcopy. save/load keep the
+arrays as .npy files next to meta.json. restore converts every array into
+FS objects, dicts and link views, so the whole checkpoint is read (a load
+with mmap=True only defers the reads to restore).
+
+A snapshot does not reset the network: FSs not updated since the last
+resetActivity are stored with their epoch and are reset lazily by the
+restored network as well (AtomFS.refresh). Transient inputs of FSs
+(problemState etc.) are recomputed by every update and are not stored;
+history and recorders of a restored network are new (with the depth of
+the history of the network).
+
+Layout of the checkpoint directory:
+    meta.json              - scalars and lists of the network
+    <array name>.npy       - arrays, see snapshot
+
+Created on Sun Oct 18 17:57:20 2026
+"""
+
+import os
+import gc
+import json
+import numpy as np
+import AtomFS as FS
+import FSEngine
+import FSLinks
+import FSNpy as FSN
+
+formatVersion = 1
+floatFields = FSEngine.floatFields
+boolFields = FSEngine.boolFields
+layers = ('inFS', 'goalFS', 'hiddenFS', 'outFS', 'memoryTrace')  # bit i of the layer mask
+idLists = ('failedFS', 'activatedFS', 'matchedFS', 'usedFS', 'learningFS')
+
+
+def ragged(lists, dtype):
+    """Packs a list of lists into (pointers, values) arrays"""
+
+    ptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(l) for l in lists])
+    values = np.fromiter((x for l in lists for x in l), dtype=dtype, count=int(ptr[-1]))
+
+    return ptr, values
+
+
+def unragged(ptr, values):
+    """Unpacks (pointers, values) arrays into a list of lists"""
+
+    ptr, values = ptr.tolist(), values.tolist()
+
+    return [values[a:b] for a, b in zip(ptr[:-1], ptr[1:])]
+
+
+def snapshot(net):
+    """Returns (meta, arrays) - scalars and {name: array} with the state of the network"""
+
+    ids = sorted(net.net)
+    fss = [net.net[ID] for ID in ids]
+    arrays = {'ids': np.array(ids, dtype=np.int64)}
+
+    if net.engine:  # state is taken from the engine arrays at once
+        slots = net.domain.slotsOf(ids)
+        for name in floatFields + boolFields + ('wasActive', 'epoch'):
+            arrays['fs.' + name] = getattr(net.engine, name)[slots]
+    else:
+        for name in floatFields:
+            arrays['fs.' + name] = np.array([getattr(fs, name) for fs in fss], dtype=float)
+        for name in boolFields:
+            arrays['fs.' + name] = np.array([getattr(fs, name) for fs in fss], dtype=bool)
+        arrays['fs.wasActive'] = np.array([fs.wasActive[-2:] for fs in fss], dtype=bool).reshape(-1, 2)
+        arrays['fs.epoch'] = np.array([fs.epoch for fs in fss], dtype=np.int64)
+
+    mask = np.zeros(len(ids), dtype=np.int8)
+    for bit, layer in enumerate(layers):
+        members = getattr(net, layer)
+        mask |= np.array([ID in members for ID in ids], dtype=bool) << bit
+    arrays['fs.layers'] = mask
+    arrays['fs.parentID'] = np.array([getattr(fs, 'parentID', -1) for fs in fss], dtype=np.int64)
+    arrays['goalID.ptr'], arrays['goalID.ids'] = ragged([fs.goalID for fs in fss], np.int64)
+    plastic = [fs.plasticWeights.items() for fs in fss]
+    arrays['plastic.ptr'], arrays['plastic.src'] = ragged([[s for s, w in p] for p in plastic], np.int64)
+    arrays['plastic.w'] = np.array([w for p in plastic for s, w in p], dtype=float)
+
+    for kind, (wName, vName) in FSLinks.linkTypes.iteritems():
+        matrix = net.links[kind]
+        for name, array in matrix.export().iteritems():
+            arrays['links.%s.%s' % (kind, name)] = array
+        # order of links in the weights (values) dicts of FSs
+        for name, order in (('wOrder', wName), ('vOrder', vName)):
+            if order:
+                index = matrix.index
+                arrays['links.%s.%s' % (kind, name)] = np.fromiter(
+                    (index[(fs.ID, src)] for fs in fss for src in getattr(fs, order)), dtype=np.int64)
+
+    arrays['activation.ids'] = np.array(net.activation.keys(), dtype=np.int64)
+    arrays['activation.values'] = np.array(net.activation.values(), dtype=float)
+    arrays['mismatch.ids'] = np.array(net.mismatch.keys(), dtype=np.int64)
+    arrays['mismatch.values'] = np.array(net.mismatch.values(), dtype=float)
+    rng = net.rng.get_state()
+    arrays['rng.key'] = rng[1]
+    usage = net.usage
+    if usage:
+        usageIDs = sorted(usage.promoted)
+        arrays['usage.ids'] = np.array(usageIDs, dtype=np.int64)
+        for name in ('promoted', 'lastActive', 'contributions'):
+            arrays['usage.' + name] = np.array([getattr(usage, name)[ID] for ID in usageIDs], dtype=float)
+        arrays['usage.matched'] = np.array([ID in usage.matched for ID in usageIDs], dtype=bool)
+
+    meta = {'formatVersion': formatVersion, 'idCounter': net.idCounter, 'reentry': net.reentry,
+            'settleTol': net.settleTol, 'maxReentry': net.maxReentry,
+            'prnLg': net.prnLg, 'engine': net.engine is not None, 'sparseTol': net.sparseTol,
+            'epoch': net.flags.epoch,  # FSs with an earlier epoch are reset by their next update
+            'mergeTentative': net.mergeTentative, 'quantum': net.signatures.quantum,
+            'histDepth': net.history.depth if net.history is not None else None,
+            'histEvery': net.history.every if net.history is not None else 1,
+            'rng': [rng[0], rng[2], rng[3], rng[4]],
+            'linkVersions': dict((kind, net.links[kind].version) for kind in FSLinks.linkTypes),
+            # a policy given as a function is not stored, the restored network uses lru
+            'hiddenCapacity': usage.capacity if usage else None,
+            'eviction': usage.policy if usage and isinstance(usage.policy, basestring) else 'lru',
+            'evicted': usage.evicted if usage else 0}
+    for name in idLists:
+        meta[name] = list(getattr(net, name, []))
+
+    return meta, arrays
+
+
+def restore(meta, arrays, engine=None, **netArgs):
+    """Creates a network from the snapshot
+    :param engine: engine shared with other networks if the snapshot was taken with the engine on
+    :param netArgs: keyword arguments of FSNpy.FSNetwork (histDepth, histEvery), by default
+        those of the snapshot network
+    :return: FSNpy.FSNetwork
+    """
+
+    if meta['formatVersion'] != formatVersion:
+        raise ValueError('unsupported checkpoint format %s' % meta['formatVersion'])
+    collect = gc.isenabled()
+    gc.disable()  # many small objects are created, none of them is garbage
+    try:
+        return build(meta, arrays, engine, netArgs)
+    finally:
+        if collect:
+            gc.enable()
+
+
+def build(meta, arrays, engine, netArgs):
+    """Creates the network of the snapshot (see restore)"""
+
+    args = {'histDepth': meta.get('histDepth'), 'histEvery': meta.get('histEvery', 1)}
+    args.update(netArgs)
+    net = FSN.FSNetwork(**args)
+    net.idCounter = meta['idCounter']
+    net.flags.epoch = meta.get('epoch', 0)
+    net.mergeTentative = meta.get('mergeTentative', net.mergeTentative)
+    if meta.get('quantum') is not None:
+        net.signatures.quantum = meta['quantum']
+    net.reentry = meta['reentry']
+    net.settleTol = meta.get('settleTol')
+    net.maxReentry = meta.get('maxReentry', net.maxReentry)
+    net.prnLg = meta['prnLg']
+    for name in idLists:
+        setattr(net, name, list(meta[name]))
+    name, pos, hasGauss, gauss = meta['rng']
+    net.rng.set_state((str(name), np.array(arrays['rng.key']), pos, hasGauss, gauss))
+
+    ids = arrays['ids'].tolist()
+    names = floatFields + boolFields
+    columns = [arrays['fs.' + name].tolist() for name in names]
+    wasActive = arrays['fs.wasActive'].tolist()
+    epoch = arrays['fs.epoch'].tolist() if 'fs.epoch' in arrays else [net.flags.epoch] * len(ids)
+    parentID = arrays['fs.parentID'].tolist()
+    goalID = unragged(arrays['goalID.ptr'], arrays['goalID.ids'])
+    plastic = unragged(arrays['plastic.ptr'], arrays['plastic.src'])
+    plasticW = arrays['plastic.w'].tolist()
+    fss = []
+    k = 0
+    setField = object.__setattr__  # flags are registered at once by net.flags.add
+    for i, row in enumerate(zip(*columns)):
+        fs = FS.AtomFS.__new__(FS.AtomFS)
+        fs.flagIndex = None
+        for name, value in zip(names, row):
+            setField(fs, name, value)
+        fs.ID = ids[i]
+        fs.epoch = epoch[i]
+        fs.wasActive = wasActive[i]
+        if parentID[i] >= 0:
+            fs.parentID = parentID[i]
+        if goalID[i]:  # an empty goalID is created by the FS on the first append
+            fs.goalID = goalID[i]
+        if plastic[i]:
+            fs.plasticWeights = dict(zip(plastic[i], plasticW[k:k + len(plastic[i])]))
+        k += len(plastic[i])
+        fs.links = net.links
+        fs.flagIndex = net.flags
+        net.flags.add(fs)
+        net.net[fs.ID] = fs
+        fss.append(fs)
+
+    for kind, (wName, vName) in FSLinks.linkTypes.iteritems():
+        prefix = 'links.%s.' % kind
+        matrix = FSLinks.LinkMatrix.fromArrays(
+            dict((name, arrays[prefix + name]) for name in FSLinks.LinkMatrix.fields + ('free',)),
+            meta['linkVersions'][kind])
+        net.links.matrices[kind] = matrix
+        src, dst = matrix.src.tolist(), matrix.dst.tolist()
+        for name, order, field, data in (('wOrder', wName, 'weight', matrix.w),
+                                         ('vOrder', vName, 'value', matrix.v)):
+            if not order:
+                continue
+            data = data.tolist()
+            items = dict((ID, []) for ID in ids)
+            for e in arrays[prefix + name].tolist():
+                items[dst[e]].append((src[e], data[e]))
+            for fs in fss:
+                if items[fs.ID]:  # empty views are created by FSs on the first write
+                    setattr(fs, order, FSLinks.LinkView.fromItems(matrix, fs.ID, field, items[fs.ID]))
+
+    mask = arrays['fs.layers'].tolist()
+    for bit, layer in enumerate(layers):
+        members = getattr(net, layer)
+        for fs, m in zip(fss, mask):
+            if m >> bit & 1:
+                members[fs.ID] = fs
+
+    net.activation = dict(zip(arrays['activation.ids'].tolist(), arrays['activation.values'].tolist()))
+    net.mismatch = dict(zip(arrays['mismatch.ids'].tolist(), arrays['mismatch.values'].tolist()))
+    net.indexSignatures()
+    if meta.get('hiddenCapacity') is not None:
+        usage = net.limitHidden(meta['hiddenCapacity'], meta['eviction'])
+        usageIDs = arrays['usage.ids'].tolist()
+        for name in ('promoted', 'lastActive'):
+            setattr(usage, name, dict(zip(usageIDs, arrays['usage.' + name].tolist())))
+        usage.contributions = dict(zip(usageIDs, arrays['usage.contributions'].astype(int).tolist()))
+        usage.matched = set(ID for ID, m in zip(usageIDs, arrays['usage.matched'].tolist()) if m)
+        usage.evicted = meta['evicted']
+    if meta['engine']:
+        net.useEngine(engine=engine, sparseTol=meta.get('sparseTol'))
+
+    return net
+
+
+def branch(net, **netArgs):
+    """Returns an independent copy of the network (snapshot and restore)"""
+
+    meta, arrays = snapshot(net)
+
+    return restore(meta, arrays, **netArgs)
+
+
+def save(net, path):
+    """Writes checkpoint of the network to the directory path"""
+
+    meta, arrays = snapshot(net)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    for name, array in arrays.iteritems():
+        np.save(os.path.join(path, name + '.npy'), np.ascontiguousarray(array))
+    meta['arrays'] = sorted(arrays)
+    tmp = os.path.join(path, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.rename(tmp, os.path.join(path, 'meta.json'))  # the checkpoint is complete
+
+
+def load(path, mmap=False, engine=None, **netArgs):
+    """Reads checkpoint from the directory path and returns the network
+    :param mmap: open arrays as memory maps (they are read by restore all the same)
+    """
+
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    arrays = dict((name, np.load(os.path.join(path, name + '.npy'), mmap_mode='r' if mmap else None))
+                  for name in meta['arrays'])
+
+    return restore(meta, arrays, engine, **netArgs)
+
+# end of FSCheckpoint
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Fixed points and bifurcations of the activity map of AtomFS
+
+Outside of the timeout branch AtomFS.calcCore maps the activity x of an FS
+to
+    x' = sigmoid(a x + d + noise, k, x0)
+where a = 0.2 is the self-feedback (oldActivity) and the drive d is
+0.8 problem + lateral + 0.5 control - goal mismatch (see drive). The
+residual g(x) = x' - x has g(0) > 0, g(1) < 0 and
+g'(x) = k a s (1 - s) - 1 with s = x', so for k a <= 4 it decreases and the
+map has a single fixed point; for k a > 4 it changes monotonicity where
+s(1 - s) = 1 / (k a), which splits [0, 1] into three brackets with at most one
+root each. fixedPoints bisects all brackets of a grid of parameters at
+once, instead of scanning x. A fixed point is stable when k a s (1 - s) < 1.
+Two stable fixed points (bistability) exist for drives between the
+saddle-node bifurcations, which are found in closed form (bifurcation).
+analyze evaluates a (k, x0, drive) grid in chunks spread over a process
+pool.
+
+Created on Sun Oct 18 18:18:31 2026
+"""
+
+import multiprocessing
+import numpy as np
+import AtomFS as FS
+
+selfWeight = FS.selfWeight  # weight of oldActivity in AtomFS.calcCore
+
+
+def drive(problem=0., lateral=0., control=0., goal=0., isOutput=False):
+    """Returns the input sum of AtomFS.calcCore without the self-feedback and the noise
+    :param problem: problem activation (rbf of the problem input)
+    :param lateral: weighted lateral input
+    :param control: weighted control input
+    :param goal: goal mismatch (not used by output FSs)
+    """
+
+    d = 0.8 * np.asarray(problem, dtype=float) + lateral + 0.5 * np.asarray(control, dtype=float)
+
+    return np.where(isOutput, d, d - goal)
+
+
+def updateMap(x, k, x0, d, a=selfWeight):
+    """Returns the activity after one update of an FS with activity x and drive d"""
+
+    with np.errstate(over='ignore'):
+        return FS.sigmoid(a * x + d, k, x0)
+
+
+def logit(s):
+    return np.log(s) - np.log1p(-s)
+
+
+def foldLevels(k, a=selfWeight):
+    """Returns (sLow, sHigh) - activities where the slope of the map is 1, NaN if k a <= 4"""
+
+    ka = np.asarray(k * a, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = np.where(ka > 4, np.sqrt(1 - 4 / ka), np.nan)
+
+    return (1 - root) / 2, (1 + root) / 2
+
+
+def bifurcation(k, x0, a=selfWeight):
+    """Returns (dLow, dHigh) - drives of the saddle-node bifurcations, the map has two
+    stable fixed points for dLow < d < dHigh (NaN if k a <= 4)"""
+
+    sLow, sHigh = foldLevels(k, a)
+
+    # at the fold x = s and k (a s + d - x0) = logit(s)
+    return logit(sHigh) / k - a * sHigh + x0, logit(sLow) / k - a * sLow + x0
+
+
+def fixedPoints(k, x0, d, a=selfWeight, tol=1e-12):
+    """Returns fixed points of the map for broadcast arrays of parameters
+    :param tol: width of the brackets at the end of the bisection
+    :return: (points, stable) - arrays of the shape of the parameters + (3,),
+        points in ascending order (NaN for absent ones) and their stability
+    """
+
+    k, x0, d = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (k, x0, d)])
+    c = (d - x0)[..., None]
+    k = k[..., None]
+    sLow, sHigh = foldLevels(k, a)
+    folded = ~np.isnan(sLow)
+    with np.errstate(invalid='ignore'):
+        xLow = np.where(folded, np.clip((logit(sLow) / k - c) / a, 0, 1), 1.)
+        xHigh = np.where(folded, np.clip((logit(sHigh) / k - c) / a, 0, 1), 1.)
+    edges = np.concatenate([np.zeros_like(xLow), xLow, xHigh, np.ones_like(xLow)], axis=-1)
+    low, high = edges[..., :-1], edges[..., 1:]
+
+    def above(x):  # g(x) > 0, compared as logits to stay exact at x = 0 and 1
+        with np.errstate(divide='ignore'):
+            return k * (a * x + c) > logit(x)
+
+    aboveLow = above(low)
+    found = (aboveLow != above(high)) & (high > low)
+    for i in range(int(np.ceil(np.log2(1 / tol)))):
+        mid = (low + high) / 2
+        move = above(mid) == aboveLow
+        low = np.where(move, mid, low)
+        high = np.where(move, high, mid)
+
+    points = np.where(found, (low + high) / 2, np.nan)
+    s = updateMap(points, k, x0[..., None], d[..., None], a)
+    with np.errstate(invalid='ignore'):
+        stable = found & (k * a * s * (1 - s) < 1)
+
+    return points, stable
+
+
+def analyzeChunk(args):
+    """Analyzes flat arrays of parameters (see analyze)"""
+
+    k, x0, d, threshold, noise, a, tol = args
+    points, stable = fixedPoints(k, x0, d, a, tol)
+    dLow, dHigh = bifurcation(k, x0, a)
+    with np.errstate(invalid='ignore'):
+        result = {'points': points, 'stable': stable,
+                  'count': (~np.isnan(points)).sum(axis=-1),
+                  'bistable': (dLow < d - noise) & (d + noise < dHigh),
+                  'active': (stable & (points >= threshold)).any(axis=-1),
+                  'inactive': (stable & (points < threshold)).any(axis=-1)}
+
+    return result
+
+
+def analyze(k, x0, d, threshold=0.95, noise=0., a=selfWeight, tol=1e-12, processes=None,
+            chunkSize=1 << 16):
+    """Analyzes the map over the grid of parameters
+    :param k, x0, d: 1d arrays of the grid axes (slope, offset and drive)
+    :param threshold: activation threshold of the FS
+    :param noise: amplitude of the noise; bistable - for all drives within d +- noise
+    :param processes: number of worker processes (number of cores by default, 1 - no pool)
+    :param chunkSize: number of grid points per task of the pool
+    :return: dict of arrays of the grid shape (len(k), len(x0), len(d)):
+        points, stable - fixed points and their stability (an extra axis of 3),
+        count - number of fixed points, bistable - two stable fixed points,
+        active / inactive - a stable fixed point at or above / below the threshold
+    """
+
+    grid = np.meshgrid(np.asarray(k, dtype=float), np.asarray(x0, dtype=float),
+                       np.asarray(d, dtype=float), indexing='ij')
+    shape = grid[0].shape
+    flat = [g.ravel() for g in grid]
+    size = flat[0].size
+    tasks = [[f[i:i + chunkSize] for f in flat] + [threshold, noise, a, tol]
+             for i in range(0, size, chunkSize)]
+
+    if processes != 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            chunks = pool.map(analyzeChunk, tasks)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    else:
+        chunks = [analyzeChunk(task) for task in tasks]
+
+    result = {}
+    for name, value in chunks[0].iteritems():
+        merged = np.concatenate([chunk[name] for chunk in chunks])
+        result[name] = merged.reshape(shape + value.shape[1:])
+
+    return result
+
+
+def trajectory(x, k, x0, d, steps, noise=0., a=selfWeight, rng=None):
+    """Iterates the map with the noise of calcCore for broadcast arrays of parameters
+    :param rng: numpy RandomState of the noise (the global generator if None)
+    :return: array (steps + 1) x shape of the parameters
+    """
+
+    rand = (rng or np.random).random_sample
+    x = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (x, k, x0, d)])[0]
+    path = [x]
+    for t in range(steps):
+        x = updateMap(x, k, x0, d + (1 - 2 * rand(x.shape)) * noise, a)
+        path.append(x)
+
+    return np.array(path)
+
+# end of FSDynamics
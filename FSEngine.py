@@ -0,0 +1,822 @@
+# -*- coding: utf-8 -*-
+"""Array-backed engine for the Functional Systems Networks (FSN)
+
+The engine keeps dynamical parameters and state variables of all FSs of a
+network in contiguous numpy arrays indexed by a dense FS slot and updates
+a whole layer of FSs with vectorized operations. A FS bound to the engine
+is replaced by a lightweight handle (EngineFS) that reads and writes its
+state through the arrays, so the object model of FSNpy keeps working on
+top of it and a FS without links costs its columns and a few slots.
+
+Memory: a bound FS without links takes about 450 bytes (Benchmarks/fs_memory.py,
+445 MB per million FSs), but a running network is dominated by its links.
+The peak RSS of Benchmarks/scaling_bench.py --engine with 100k hidden FSs
+and 1.1M links is 952 MB without history (the default of FSNetwork) and
+1036 MB with --hist 100 (the float32 HistoryRecorder adds 400 bytes per FS).
+
+Event-driven update (updateLayer with tol): an FS is evaluated only if its
+inputs changed - a source changed its gate (isActive and not wasUsed) or
+its oldActivity by more than tol, a link to it changed or its state was
+set from outside - or if it is active. Other FSs reuse the input sums of
+their last evaluation (the same arithmetic as the dense update, so the
+result equals it as long as the inputs did not change), and FSs whose
+activity settled (inactive and changed by at most tol) are skipped. The
+FSs to visit are kept in persistent slot indices (SlotIndex) filled when
+an event happens, so the work of an update follows the number of changed
+sources and awake FSs, not the size of the layer. For
+an inactive FS with L = 0.05 k < 1 (slope of the 0.2 oldActivity self
+input) the activity differs from the dense update by at most
+
+    (L tol + k / 4 (2 noise + G tol)) / (1 - L),
+
+where G = 8 |w_problem| + |w_lateral| + 0.5 |w_control| + 10 |w_goal| is
+the input gain (sums of the absolute weights of its links); active FSs
+are evaluated exactly. Flags can differ only for FSs within the bound of
+their threshold. Benchmarks/sparse_tolerance.py checks it.
+
+A reset of a network only advances the epoch of its domain (newEpoch);
+slots stamped with an earlier epoch are reset at once by the next
+refresh, before the arrays are read by an update or through a handle.
+
+Created on Sun Oct 18 17:41:00 2026
+"""
+
+import numpy as np
+import AtomFS as FS
+import FSFlags
+import FSKernels
+
+# dynamical parameters and state variables stored in the engine arrays
+floatFields = ('activity', 'oldActivity', 'threshold', 'noise', 'k', 'x0',
+               'tau', 'pr_threshold', 'pr_k', 'pr_x0', 'onTime', 'startTime', 'mismatch')
+boolFields = ('isActive', 'isLearning', 'failed', 'wasUsed',
+              'isInput', 'isOutput', 'exactInputMatch')
+intFields = ('epoch',)  # epoch of the network the state belongs to (AtomFS.refresh)
+stateFields = floatFields + boolFields + intFields  # engine fields of the state of an FS
+# input sums of the last evaluation of an FS (reused by the event-driven update)
+inputFields = ('inProblem', 'inLateral', 'inControl', 'inGoal', 'nGoal')
+# bookkeeping of the event-driven update: FS has to be evaluated, FS did not settle
+# at its last evaluation, gate and oldActivity of the source last propagated to its
+# targets, shifts of the activation memory owed by a skipped FS
+eventFields = ('stale', 'awake', 'sentGate', 'sentActivity', 'owedShifts')
+# arrays of the event-driven update allocated by its first call (see track)
+trackedFields = inputFields + eventFields[1:]
+# link types by their code in the links of a layer (see targetLinks), rbf inputs first
+rbfKinds = ('problem', 'goal')
+linkKinds = rbfKinds + ('lateral', 'control')
+
+
+def _field(name):
+    """Returns a property mapping FS attribute to the engine array"""
+
+    def getter(self):
+        engine = self._engine
+        if engine.pending:  # slots of a reset network are reset before they are read
+            engine.refresh()
+        return getattr(engine, name).item(self._slot)
+
+    def setter(self, value):
+        if self._engine.pending:
+            self._engine.refresh()
+        array = getattr(self._engine, name)
+        if name in FS.flagSlots and self.flagIndex is not None and bool(value) != array[self._slot]:
+            self.flagIndex.change(self.ID, name, value)  # flags are reported on a change only
+        array[self._slot] = value
+        self._engine.markStale(self._slot)
+
+    return property(getter, setter)
+
+
+def _extra(name):
+    """Returns a property of the attribute of a bound FS kept in its dict _extra (created on
+    the first write); an absent attribute reads as an empty container (BaseFS.__getattr__)"""
+
+    def getter(self):
+        try:
+            return self._extra[name]
+        except (KeyError, TypeError):
+            raise AttributeError(name)
+
+    def setter(self, value):
+        if self._extra is None:
+            self._extra = {}
+        self._extra[name] = value
+
+    def deleter(self):
+        try:
+            del self._extra[name]
+        except (KeyError, TypeError):
+            raise AttributeError(name)
+
+    return property(getter, setter, deleter)
+
+
+class EngineFS(FS.BaseFS):
+    """Handle of a FS bound to the engine: state variables and parameters live in the engine
+    arrays, the ids of goals, the parent id and the containers (link views) in the dict
+    _extra, so a handle of a FS without links holds five slots."""
+
+    __slots__ = ('ID', '_engine', '_slot', '_domain', '_extra')
+
+    flagIndex = property(lambda self: self._domain.flags)
+    links = property(lambda self: self._domain.store)
+
+    def _getWasActive(self):
+        self.refresh()
+        return [bool(a) for a in self._engine.wasActive[self._slot]]
+
+    def _setWasActive(self, value):
+        self.refresh()
+        self._engine.wasActive[self._slot] = value
+        self._engine.markStale(self._slot)
+
+    wasActive = property(_getWasActive, _setWasActive)
+
+    def update(self, time, rnd=None):
+        """Updates current state of FS."""
+
+        self.refresh()
+        self._engine.shiftWasActive(self._slot)
+
+        return self.calcCore(time, rnd)
+
+    def setFSActivation(self, outValue):
+
+        self.refresh()
+        self._engine.shiftWasActive(self._slot)
+        self.oldActivity = outValue
+        self.activity = outValue
+        self.isActive = True
+
+        return self.activity
+
+    def refresh(self):
+        self._engine.refresh()
+
+    def __deepcopy__(self, memo):
+        """Copies FS as a stand alone AtomFS (not bound to the engine)"""
+        from copy import deepcopy
+
+        fs = FS.AtomFS.__new__(FS.AtomFS)
+        memo[id(self)] = fs
+        fs.__setstate__(deepcopy(self.fields(copiedFields), memo))
+        self._engine.export(self._slot, fs)
+
+        return fs
+
+
+for _name in stateFields:
+    setattr(EngineFS, _name, _field(_name))
+
+# attributes of AtomFS kept by the handle of a bound FS (the rest is in the engine arrays)
+extraNames = tuple(name for name in FS.AtomFS.__slots__
+                   if name not in stateFields + ('ID', '_wasActive') + FS.networkNames and
+                   name not in FS.flagSlots.values())
+
+for _name in extraNames:
+    setattr(EngineFS, _name, _extra(_name))
+
+copiedFields = ('ID',) + extraNames  # attributes of a bound FS copied by deepcopy
+
+
+class SlotIndex(object):
+    """Persistent index of the slots marked by events since it was last taken
+
+    Marks are appended, so taking the index costs the number of marks, not the
+    number of slots; when more marks than slots were collected, a scan of the
+    flag array takes over.
+    """
+
+    def __init__(self):
+        self.parts = []  # arrays of marked slots
+        self.singles = []  # single marked slots
+        self.count = 0
+        self.limit = 0  # number of marks beyond which they are dropped for a scan
+
+    def add(self, slots):
+        if isinstance(slots, np.ndarray):
+            self.parts.append(slots)
+            self.count += len(slots)
+        else:
+            self.singles.append(slots)
+            self.count += 1
+        if self.count > self.limit:
+            self.overflow()
+
+    def overflow(self):
+        """Drops the marks: the next take scans the flag array"""
+
+        self.parts, self.singles = [], []
+        self.count = self.limit + 1
+
+    def take(self, size, flag=None):
+        """Returns sorted unique marked slots below size with flag set (all slots if
+        flag is None and the index overflowed) and clears the index"""
+
+        if self.count > self.limit:
+            slots = np.nonzero(flag[:size])[0] if flag is not None else np.arange(size)
+        else:
+            slots = np.unique(np.concatenate(self.parts + [np.array(self.singles, dtype=int)]))
+            slots = slots[slots < size]
+            if flag is not None:
+                slots = slots[flag[slots].astype(bool)]
+        self.parts, self.singles, self.count = [], [], 0
+
+        return slots
+
+
+class Domain(object):
+    """FSs of one network bound to the engine (FS ids are unique within a network)"""
+
+    def __init__(self, store, flags=None):
+        self.store = store  # links of the network (FSLinks.LinkStore)
+        self.flags = flags  # flags of the network (FSFlags.FlagIndex)
+        self.slotOf = np.zeros(0, dtype=int)  # FSID -> slot (-1 for unbound ids)
+        self.epoch = 0  # epoch of the network (slots with an earlier one count as reset)
+        self.version = 0  # number of changes of the bound FSs
+        self.links = None  # ((link store version, version), (type code, src, dst, w, v)) in slots
+
+    def add(self, ID, slot):
+        self.version += 1
+        if ID >= len(self.slotOf):
+            slotOf = np.empty(max(ID + 1, 2 * len(self.slotOf)), dtype=int)
+            slotOf.fill(-1)
+            slotOf[:len(self.slotOf)] = self.slotOf
+            self.slotOf = slotOf
+        self.slotOf[ID] = slot
+
+    def remove(self, ID):
+        self.version += 1
+        slot = int(self.slotOf[ID])
+        self.slotOf[ID] = -1
+        return slot
+
+    def slotsOf(self, ids):
+        """Returns array of slots of the FSs listed in ids"""
+        return self.slotOf[np.fromiter(ids, dtype=int, count=len(ids))]
+
+    def allSlots(self):
+        """Returns array of slots of all bound FSs"""
+        return self.slotOf[self.slotOf >= 0]
+
+
+class FSEngine(object):
+    """Keeps the state of FSs in arrays and updates layers of FSs at once
+
+    The engine can hold several networks (domains), e.g. agents of a batch,
+    and update the same layer of all of them with one vectorized call.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = 0
+        self.size = 0  # number of allocated slots (high water mark)
+        self.domains = []
+        self.fsOf = []  # slot -> FS object (None for free slots)
+        self.freeSlots = []
+        # links between bound FSs: (type code (see linkKinds), src slots, dst slots, w, v)
+        self.links = (np.zeros(0, dtype=int),) * 3 + (np.zeros(0),) * 2
+        self.linkVersion = None  # versions of the link stores the links are taken from
+        self.dirty = True  # links have to be rebuilt (slots were changed)
+        self.fanout = None  # (pointers, target slots) of the links sorted by the source slot
+        self.fanin = None  # (pointers, type code, src, w, v) of the links sorted by the target slot
+        self.evaluated = 0  # number of FSs evaluated by the last updateLayer
+        self.pending = set()  # domains with a new epoch not applied to their slots yet
+        self.staleSlots = SlotIndex()  # slots marked stale
+        self.awakeSlots = SlotIndex()  # slots left awake by the event-driven update
+        self.owingSlots = SlotIndex()  # skipped slots owing shifts of the activation memory
+        self.sources = SlotIndex()  # slots whose gate or oldActivity may have changed
+        self.events = False  # the slot indices and trackedFields are kept (see track)
+        self.buffers = FSKernels.KernelBuffers()
+        for name in floatFields + inputFields + ('sentActivity',):
+            setattr(self, name, np.zeros(0))
+        for name in boolFields + ('stale', 'awake', 'sentGate'):
+            setattr(self, name, np.zeros(0, dtype=bool))
+        for name in intFields:
+            setattr(self, name, np.zeros(0, dtype=np.int64))
+        self.owedShifts = np.zeros(0, dtype=np.int8)
+        self.wasActive = np.zeros((0, 2), dtype=bool)
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        """Extends arrays to store at least capacity FSs"""
+
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, 2 * self.capacity)
+        for name in stateFields + ('stale', 'wasActive') + (trackedFields if self.events else ()):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self.fsOf.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+        for index in (self.staleSlots, self.awakeSlots, self.owingSlots, self.sources):
+            index.limit = capacity
+
+    def addDomain(self, store, flags=None):
+        """Registers a network with the link store and the flag index; returns its Domain"""
+
+        domain = Domain(store, flags)
+        self.domains.append(domain)
+        self.dirty = True
+
+        return domain
+
+    def bind(self, fs, domain):
+        """Moves state of the FS into the engine arrays, returns the handle (EngineFS)
+        that takes the place of the FS in the network"""
+
+        if self.freeSlots:
+            slot = self.freeSlots.pop()
+        else:
+            slot = self.size
+            self.size += 1
+            self.grow(self.size)
+        for name in stateFields:
+            getattr(self, name)[slot] = getattr(fs, name)
+        self.wasActive[slot] = fs.wasActive[-2:]
+        self.markStale(slot)
+        if self.events:
+            self.awake[slot] = self.sentGate[slot] = False
+            self.owedShifts[slot] = 0
+        handle = EngineFS.__new__(EngineFS)
+        handle.ID = fs.ID
+        handle._engine = self
+        handle._slot = slot
+        handle._domain = domain
+        handle._extra = fs.fields(extraNames) or None
+        domain.add(fs.ID, slot)
+        self.fsOf[slot] = handle
+        self.dirty = True
+
+        return handle
+
+    def export(self, slot, fs):
+        """Copies state of the FS in the slot to the attributes of (unbound) fs"""
+
+        for name in stateFields:
+            object.__setattr__(fs, name, getattr(self, name)[slot].item())
+        object.__setattr__(fs, 'wasActive', [bool(a) for a in self.wasActive[slot]])
+
+    def release(self, ID, domain, keepState=True):
+        """Moves state of the FS to a new AtomFS that takes the place of its handle in the
+        network, frees the slot (the handle is not usable any more); returns the AtomFS
+        :param keepState: if False only the ids and containers are moved (the FS is removed)
+        """
+
+        if keepState and self.pending:  # the exported state is the one after a reset
+            self.refresh()
+        slot = domain.remove(ID)
+        handle = self.fsOf[slot]
+        fs = FS.AtomFS.__new__(FS.AtomFS)
+        fs.__setstate__(handle.fields(copiedFields))
+        if keepState:
+            self.export(slot, fs)
+        fs.flagIndex = domain.flags
+        fs.links = domain.store
+        del handle._engine, handle._domain
+        self.fsOf[slot] = None
+        self.freeSlots.append(slot)
+        self.dirty = True
+
+        return fs
+
+    def newEpoch(self, domain, epoch):
+        """Starts the epoch of the domain: its slots stamped with an earlier epoch are reset
+        by the next refresh (flags of the network are cleared by FlagIndex.newEpoch)"""
+
+        domain.epoch = epoch
+        self.pending.add(domain)
+
+    def refresh(self):
+        """Resets the state of the slots of the pending domains (see AtomFS.refresh)"""
+
+        for domain in self.pending:
+            slots = domain.allSlots()
+            slots = slots[self.epoch[slots] != domain.epoch]
+            for name, value in FS.resetState:
+                getattr(self, name)[slots] = value
+            self.wasActive[slots] = False
+            self.epoch[slots] = domain.epoch
+            self.markStale(slots)
+        self.pending.clear()
+
+    def markStale(self, slots):
+        """Marks FSs in slots (an array or a slot) for the evaluation by the
+        event-driven update; their gate and oldActivity are checked as sources"""
+
+        self.stale[slots] = True
+        if self.events:
+            self.staleSlots.add(slots)
+            self.sources.add(slots)
+
+    def activate(self, slots, values):
+        """Vectorized setFSActivation of the FSs in slots followed by the reset of
+        their wasUsed flag (input FSs, FSNetwork.activateFS)"""
+
+        flags = {'isActive': self.isActive[slots], 'wasUsed': self.wasUsed[slots]}
+        self.shiftWasActive(slots)
+        self.oldActivity[slots] = values
+        self.activity[slots] = values
+        self.isActive[slots] = True
+        self.wasUsed[slots] = False
+        self.markStale(slots)
+        self.reportFlags(slots, flags)
+
+    def shiftWasActive(self, slots):
+        """Pushes current activity flags into the activation memory"""
+
+        self.wasActive[slots, 0] = self.wasActive[slots, 1]
+        self.wasActive[slots, 1] = self.isActive[slots]
+
+    def domainLinks(self, domain):
+        """Returns (type code, src, dst, w, v) of the links between bound FSs of the domain
+        in slots, in the order of the edge pools; targets of the links changed since the
+        last call are marked stale"""
+
+        n = len(domain.slotOf)
+        slotOf = np.append(domain.slotOf, -1)  # ids out of range map to -1
+        touched = set()  # targets of the changed links
+        parts = []
+        for kind in linkKinds:
+            matrix = domain.store[kind]
+            touched.update(matrix.touched)
+            matrix.touched.clear()
+            parts.append(matrix.edges(None)[1:])
+        if touched:
+            slots = slotOf[np.minimum(np.fromiter(touched, dtype=int, count=len(touched)), n)]
+            self.markStale(slots[slots >= 0])
+        code = np.repeat(np.arange(len(linkKinds)), [len(part[0]) for part in parts])
+        dst, src, w, v = (np.concatenate(a) for a in zip(*parts))
+        dst = slotOf[np.minimum(dst, n)]
+        src = slotOf[np.minimum(src, n)]
+        keep = (dst >= 0) & (src >= 0)
+
+        return code[keep], src[keep], dst[keep], w[keep], v[keep]
+
+    def syncLinks(self):
+        """Takes links between bound FSs from the link stores of the domains"""
+
+        version = [(domain.store.version, domain.version) for domain in self.domains]
+        if not self.dirty and self.linkVersion == version:
+            return
+        parts = [tuple(a[:0] for a in self.links)]  # types of the arrays without links
+        for domain, key in zip(self.domains, version):
+            if domain.links is None or domain.links[0] != key:  # kept while unchanged
+                domain.links = (key, self.domainLinks(domain))
+            parts.append(domain.links[1])
+        self.links = tuple(np.concatenate(a) for a in zip(*parts))
+        self.linkVersion = version
+        self.dirty = False
+        self.fanout = self.fanin = None
+
+    def inputSums(self, links, n, gate, x=None):
+        """Returns {link type: (input, count)} for n targets: rbf match for problem
+        and goal links, weighted sum for lateral and control links (x - activity of
+        the sources, oldActivity by default); links of all types are summed at once"""
+
+        x = self.oldActivity if x is None else x
+        ldst, code, src, w, v = links
+        s, count = FSKernels.inputBatch(code * n + ldst, src, v, w, code < len(rbfKinds), x, gate,
+                                        len(linkKinds) * n, self.buffers)
+        sums = {}
+        for k, kind in enumerate(linkKinds):
+            sums[kind] = (s[k * n:(k + 1) * n], count[k * n:(k + 1) * n])
+        with np.errstate(over='ignore'):
+            for kind in rbfKinds:
+                s, count = sums[kind]
+                sums[kind] = (np.where(count > 0, np.exp(-10 * s), 0.), count)
+
+        return sums
+
+    @staticmethod
+    def linksOf(links, kind, i):
+        """Returns mask of the links of the type targeting the FS i of the layer"""
+        return (links[0] == i) & (links[1] == linkKinds.index(kind))
+
+    def exactMatch(self, links, kind, i, gate, x):
+        """Checks if gated inputs of the target i exactly match its weights"""
+
+        ldst, code, src, w, v = links
+        sel = self.linksOf(links, kind, i)
+        state = dict((s, x[s]) for s in src[sel] if gate[s])
+        weights = dict(zip(src[sel], w[sel]))
+
+        return state == weights
+
+    def timedOut(self, slots, time):
+        """Returns mask of FSs for which expected time of activation is over"""
+
+        isActive = self.isActive[slots]
+        onTime = np.where(isActive, time - self.startTime[slots], self.onTime[slots])
+
+        return isActive & (onTime >= self.tau[slots]) & \
+            ~self.wasUsed[slots] & ~self.isOutput[slots]
+
+    def drive(self, slots, links, gate, x=None):
+        """Returns input sums of the FSs in slots: {input field: values}"""
+
+        x = self.oldActivity if x is None else x
+        sums = self.inputSums(links, len(slots), gate, x)
+        problem, nP = sums['problem']
+        goal, nG = sums['goal']
+        with np.errstate(over='ignore'):
+            for i in np.nonzero(self.exactInputMatch[slots])[0]:
+                hasWeights = self.linksOf(links, 'problem', i).any()
+                problem[i] = int(hasWeights and self.exactMatch(links, 'problem', i, gate, x))
+                goal[i] = float(self.exactMatch(links, 'goal', i, gate, x))
+
+        return {'inProblem': 0.8 * problem, 'inLateral': sums['lateral'][0],
+                'inControl': 0.5 * sums['control'][0], 'inGoal': goal, 'nGoal': nG}
+
+    def react(self, slots, inputs, time, rnd):
+        """Vectorized AtomFS.calcCore for the FSs in slots given their input sums,
+        returns new state"""
+
+        isActive = self.isActive[slots]
+        isOutput = self.isOutput[slots]
+        onTime = np.where(isActive, time - self.startTime[slots], self.onTime[slots])
+        timeout = self.timedOut(slots, time)
+        goal, nG = inputs['inGoal'], inputs['nGoal']
+
+        with np.errstate(over='ignore'):
+            wInSum = FS.selfWeight * self.oldActivity[slots]
+            wInSum += inputs['inProblem']
+            wInSum += inputs['inLateral']
+            wInSum += inputs['inControl']
+            wInSum += (1 - 2 * rnd) * self.noise[slots]
+            wInSum = np.where(isOutput, wInSum, wInSum - np.where(nG > 0, goal, 0))
+            activity = FS.sigmoid(wInSum, self.k[slots], self.x0[slots])
+
+        hasGoal = (nG > 0) & (timeout | ~isOutput)
+        mismatch = np.where(hasGoal, goal, self.mismatch[slots])
+        active = activity >= self.threshold[slots]
+        startTime = np.where(active & (onTime == 0), time, self.startTime[slots])
+        matched = np.where(timeout, np.where(nG > 0, goal, 0), mismatch) >= \
+            self.pr_threshold[slots]
+
+        state = {'activity': np.where(timeout, 0., activity),
+                 'isActive': ~timeout & active,
+                 'startTime': np.where(timeout, self.startTime[slots], startTime),
+                 'mismatch': mismatch,
+                 'failed': (timeout | self.failed[slots]) & ~matched,
+                 'wasUsed': timeout | self.wasUsed[slots],
+                 'onTime': np.where(matched, 0., onTime)}
+
+        return state
+
+    def evaluate(self, slots, links, gate, time, rnd, x=None):
+        """Vectorized AtomFS.calcCore for the FSs in slots, returns new state
+        (with the input sums)"""
+
+        inputs = self.drive(slots, links, gate, x)
+        state = self.react(slots, inputs, time, rnd)
+        state.update(inputs)
+
+        return state
+
+    def updateLayer(self, slots, time, clearUsed=False, rnd=None, tol=None):
+        """Updates FSs in slots (in that order) as AtomFS.update does
+
+        Results are the same as for sequential updates of FS objects: FSs
+        whose in-layer inputs changed during the update are re-evaluated
+        (see reevaluate).
+        :param slots: array of slots of FSs of the layer in the order of update
+        :param time: current time
+        :param clearUsed: reset wasUsed flag after the update (goal and output FSs)
+        :param rnd: uniform random values for the noise, one per FS (drawn from
+            the global RNG if None)
+        :param tol: if not None, event-driven update with the tolerance tol
+            (see updateSparse)
+        :return: arrays of activity and mismatch of the FSs
+        """
+
+        n = len(slots)
+        if n == 0:
+            self.evaluated = 0
+            return np.zeros(0), np.zeros(0)
+        if rnd is None:
+            rnd = np.random.random_sample(n)
+        if tol is not None:
+            return self.updateSparse(slots, time, clearUsed, rnd, tol)
+        links = self.targetLinks(slots)
+        gate = self.isActive & ~self.wasUsed
+        flags = dict((name, getattr(self, name)[slots]) for name in FSFlags.flagNames)
+
+        state = self.evaluate(slots, links, gate, time, rnd)
+        gates = np.concatenate((gate, gate))  # gates before the update and new gates
+        gates[self.capacity + slots] = state['isActive'] & (~state['wasUsed'] | clearUsed)
+        flipped = np.nonzero(gates[self.capacity + slots] != gate[slots])[0]
+        for i, st in self.reevaluate(slots, self.positions(slots), flipped, gates, time, rnd,
+                                     clearUsed):
+            for name, value in st.iteritems():
+                state[name][i] = value
+
+        self.shiftWasActive(slots)
+        for name, value in state.iteritems():
+            if self.events or name not in inputFields:
+                getattr(self, name)[slots] = value
+        if clearUsed:
+            self.wasUsed[slots] = False
+        self.markStale(slots)  # events are not tracked by the dense update
+        self.evaluated = n
+        self.reportFlags(slots, flags)
+
+        return state['activity'], state['mismatch']
+
+    def fanoutLinks(self):
+        """Returns (pointers, target slots) of the links of all types sorted by the source slot"""
+
+        if self.fanout is None:
+            code, src, dst, w, v = self.links
+            order = np.argsort(src, kind='mergesort')
+            self.fanout = (np.searchsorted(src[order], np.arange(self.capacity + 1)), dst[order])
+
+        return self.fanout
+
+    def targetLinks(self, slots):
+        """Returns links of all types targeting the FSs in slots: (local index of target,
+        type code (see linkKinds), src, w, v) sorted by the target and the type, gathered
+        from the links sorted by the target slot (kept until syncLinks takes changed links)"""
+
+        if self.fanin is None:
+            code, src, dst, w, v = self.links
+            order = np.argsort(dst, kind='mergesort')
+            indptr = np.searchsorted(dst[order], np.arange(self.capacity + 1))
+            self.fanin = (indptr, code[order], src[order], w[order], v[order])
+        indptr, code, src, w, v = self.fanin
+        start = indptr[slots]
+        count = indptr[slots + 1] - start
+        e = np.repeat(start - (np.cumsum(count) - count), count) + np.arange(count.sum())
+
+        return np.repeat(np.arange(len(slots)), count), code[e], src[e], w[e], v[e]
+
+    def positions(self, slots):
+        """Returns array mapping slots to their position in slots (-1 for other slots)"""
+
+        position = np.empty(self.capacity, dtype=int)
+        position.fill(-1)
+        position[slots] = np.arange(len(slots))
+
+        return position
+
+    def reevaluate(self, slots, position, flipped, gates, time, rnd, clearUsed):
+        """Re-evaluates FSs of the layer whose in-layer inputs changed earlier in the layer
+
+        Re-evaluation is done in waves: all FSs with an earlier source that
+        changed its gate (flipped - positions in the layer) are evaluated at
+        once with the new gates of the sources before them in the layer, until
+        no gate changes. The last evaluation of an FS sees the final gates of
+        its earlier sources, so the result is that of the sequential update.
+        :param position: slot -> position in the layer (see positions)
+        :param gates: gates before the update followed by the new gates (shifted by the
+            capacity), the new gates are updated in place
+        :return: [(positions, new state)] in the order of evaluation
+        """
+
+        cap = self.capacity
+        newGate = gates[cap:]
+        results = []
+        x = None
+        while len(flipped):
+            targets, origin = self.successors(slots[flipped])
+            p = position[targets]
+            i = np.unique(p[p > flipped[origin]])
+            if not len(i):
+                break
+            if x is None:
+                x = np.concatenate((self.oldActivity, self.oldActivity))
+            ldst, code, src, w, v = self.targetLinks(slots[i])
+            ps = position[src]  # earlier sources pass their new gate (index shifted by cap)
+            links = (ldst, code, np.where((ps >= 0) & (ps < i[ldst]), src + cap, src), w, v)
+            st = self.evaluate(slots[i], links, gates, time, rnd[i], x)
+            results.append((i, st))
+            g = st['isActive'] & (~st['wasUsed'] | clearUsed)
+            flipped = i[g != newGate[slots[i]]]
+            newGate[slots[i]] = g
+
+        return results
+
+    def propagate(self, tol):
+        """Marks targets of the sources whose gate or oldActivity (by more than tol)
+        changed since the last propagation as stale (only marked sources are checked)"""
+
+        changed = self.sources.take(self.size)
+        gate = self.isActive[changed] & ~self.wasUsed[changed]
+        moved = np.abs(self.oldActivity[changed] - self.sentActivity[changed]) > tol
+        changed = changed[(gate != self.sentGate[changed]) | (gate & moved)]
+        if not len(changed):
+            return
+        self.sentGate[changed] = self.isActive[changed] & ~self.wasUsed[changed]
+        self.sentActivity[changed] = self.oldActivity[changed]
+        self.markStale(self.successors(changed)[0])
+
+    def successors(self, sources):
+        """Returns (targets, origin) - target slots of the links of all types from
+        the sources and the index of the source in sources of every target"""
+
+        indptr, targets = self.fanoutLinks()
+        start = indptr[sources]
+        count = indptr[sources + 1] - start
+        offset = np.repeat(start - (np.cumsum(count) - count), count)
+
+        return targets[offset + np.arange(count.sum())], np.repeat(np.arange(len(sources)), count)
+
+    def track(self):
+        """Starts the bookkeeping of the event-driven update: its arrays are allocated
+        and all FSs count as changed (nothing was tracked before)"""
+
+        self.events = True
+        for name in trackedFields:
+            old = getattr(self, name)
+            setattr(self, name, np.zeros((self.capacity,) + old.shape[1:], dtype=old.dtype))
+        self.stale[:self.size] = True
+        self.staleSlots.overflow()
+        self.sources.overflow()
+
+    def updateSparse(self, slots, time, clearUsed, rnd, tol):
+        """Event-driven updateLayer: evaluates only stale and active FSs, reuses
+        input sums of the awake FSs with unchanged inputs and skips settled FSs
+        (see the module docstring for the tolerance)
+
+        FSs to visit are taken from the slot indices; skipped FSs cost nothing
+        but the shifts of their activation memory owed after their last
+        evaluation (two at most).
+        """
+
+        if not self.events:
+            self.track()
+        self.propagate(tol)
+        position = self.positions(slots)
+        gate = self.isActive & ~self.wasUsed
+
+        # FSs to visit: stale and awake FSs of the layer (marks of other slots are kept)
+        marked = [self.staleSlots.take(self.size, self.stale),
+                  self.awakeSlots.take(self.size, self.awake)]
+        for index, found in zip((self.staleSlots, self.awakeSlots), marked):
+            index.add(found[position[found] < 0])
+        visit = np.unique(np.concatenate([position[found[position[found] >= 0]]
+                                          for found in marked]))
+        full = self.stale[slots[visit]] | self.isActive[slots[visit]]
+        results = []  # (layer positions, new state) in the order of evaluation
+        if full.any():
+            i = visit[full]
+            links = self.targetLinks(slots[i])
+            results.append((i, self.evaluate(slots[i], links, gate, time, rnd[i])))
+        if not full.all():
+            i = visit[~full]
+            inputs = dict((name, getattr(self, name)[slots[i]]) for name in inputFields)
+            results.append((i, self.react(slots[i], inputs, time, rnd[i])))
+        fresh = [visit[full]]  # evaluated with the current inputs
+        gates = np.concatenate((gate, gate))  # gates before the update and new gates
+        for i, st in results:
+            gates[self.capacity + slots[i]] = st['isActive'] & (~st['wasUsed'] | clearUsed)
+        flipped = visit[gates[self.capacity + slots[visit]] != gate[slots[visit]]]
+        for i, st in self.reevaluate(slots, position, flipped, gates, time, rnd, clearUsed):
+            results.append((i, st))
+            fresh.append(i)
+
+        evaluated = np.unique(np.concatenate([i for i, st in results] + [np.zeros(0, dtype=int)]))
+        fresh = slots[np.unique(np.concatenate(fresh))]
+        e = slots[evaluated]
+        flags = dict((name, getattr(self, name)[e]) for name in FSFlags.flagNames)
+
+        # skipped FSs owing shifts of the activation memory
+        owing = self.owingSlots.take(self.size, self.owedShifts)
+        self.owingSlots.add(owing[position[owing] < 0])
+        owing = owing[position[owing] >= 0]
+        owing = owing[~np.in1d(owing, e)]
+        self.shiftWasActive(np.concatenate((e, owing)))
+        self.owedShifts[owing] -= 1
+        self.owedShifts[e] = 2
+        self.owingSlots.add(owing[self.owedShifts[owing] > 0])
+        self.owingSlots.add(e)
+
+        for i, st in results:  # later evaluations override earlier ones
+            for name, value in st.iteritems():
+                getattr(self, name)[slots[i]] = value
+        awake = self.isActive[e] | (np.abs(self.activity[e] - self.oldActivity[e]) > tol)
+        self.stale[fresh] = False
+        self.awake[e] = awake
+        self.awakeSlots.add(e[awake])
+        self.sources.add(e)
+        self.evaluated = len(e)
+        self.reportFlags(e, flags)
+        if clearUsed:
+            used = self.wasUsed[slots]
+            self.wasUsed[slots] = False
+            self.reportFlags(slots, {'wasUsed': used})
+
+        return self.activity[slots], self.mismatch[slots]
+
+    def reportFlags(self, slots, old):
+        """Reports flags changed since old ({flag: values in slots}) to the FlagIndex of FSs"""
+
+        for name, values in old.iteritems():
+            new = getattr(self, name)[slots]
+            for slot, value in zip(slots[new != values].tolist(), new[new != values].tolist()):
+                fs = self.fsOf[slot]
+                if fs.flagIndex is not None:
+                    fs.flagIndex.change(fs.ID, name, value)
+
+# end of FSEngine
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""Hypercube environments for the Functional Systems Network experiments
+
+The agent moves between nodes of a hypercube (binary states) along the
+allowed transitions from the start 000...000 to the goal 111...111. Output
+FS with id o flips bit o % dim to int(o / dim) - 1 (outputs of initCtrlNet).
+The code follows ManipulatorHack/StochasticTMazel_test.py.
+
+States are ints: bit i of the state list (as printed, i = 0 is the leftmost
+one) is bit dim - 1 - i of the int, so st2Ind(st) is the state. Transitions
+are kept sparse as a sorted array of directed edges (src << dim | dst),
+which takes O(dim) memory instead of a dense 2^dim x 2^dim matrix, and
+HypercubeEnv steps K agents (each with its own stochastic edges) at once.
+
+Created on Sun Oct 18 17:49:48 2026
+"""
+
+import numpy as np
+
+
+def st2Ind(st):
+    """Converts list of bits to the decimal index"""
+
+    ind = 0
+    for bit in st:
+        ind = (ind << 1) | int(bit)
+
+    return ind
+
+
+def ind2St(ind, dimension):
+    """Converts the decimal index to the list of bits"""
+    return [(ind >> (dimension - 1 - i)) & 1 for i in range(dimension)]
+
+
+def flip(state, i, dimension):
+    """Returns the state with bit i (of the state list) inverted"""
+    return state ^ (1 << (dimension - 1 - i))
+
+
+def path(state, order, dimension):
+    """Returns edges of the path setting bits of the order one by one starting at state"""
+
+    edges = []
+    for i in order:
+        nextState = state | (1 << (dimension - 1 - i))
+        edges.append((state, nextState))
+        state = nextState
+
+    return edges
+
+
+def transitionsRing(dimension):
+    """ two paths 000 -> 100 -> 110 -> 111 and 000 -> 001 -> 011 -> 111 """
+
+    return path(0, range(dimension), dimension) + \
+        path(0, range(dimension - 1, -1, -1), dimension)
+
+
+def transitionsFork(dimension):
+    """ T-maze: 000 -> 100, then two branches 100 -> 110 -> 111 and 100 -> 101 -> 111 """
+
+    fork = flip(0, 0, dimension)
+
+    return [(0, fork)] + path(fork, range(1, dimension), dimension) + \
+        path(fork, range(dimension - 1, 0, -1), dimension)
+
+
+def transitionsLine(dimension):
+    """ single path 000 -> 100 -> 110 -> 111 """
+    return path(0, range(dimension), dimension)
+
+
+transitions = {'ring': transitionsRing, 'fork': transitionsFork, 'line': transitionsLine}
+
+
+class Transitions(object):
+    """Sparse set of directed transitions between states of a hypercube
+
+    :param dimension: dimension of the hypercube
+    :param edges: list of (state, state) pairs, both directions are allowed
+    :param extra: directed edges that are absent now but may be opened later
+    """
+
+    def __init__(self, dimension, edges, extra=()):
+        if 2 * dimension > 62:
+            raise ValueError('dimension of the hypercube should be at most 31')
+        self.dim = dimension
+        present = set()
+        for a, b in edges:
+            present.add((a, b))
+            present.add((b, a))
+        pairs = sorted(present | set(extra))
+        self.keys = np.array([(a << dimension) | b for a, b in pairs], dtype=np.int64)
+        self.initial = np.array([pair in present for pair in pairs], dtype=bool)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def edge(self, src, dst):
+        """Returns indices of the edges src -> dst (-1 for the absent ones)"""
+
+        keys = (np.asarray(src, dtype=np.int64) << self.dim) | np.asarray(dst, dtype=np.int64)
+        e = np.minimum(np.searchsorted(self.keys, keys), max(len(self.keys) - 1, 0))
+        found = self.keys[e] == keys if len(self.keys) else np.zeros(keys.shape, dtype=bool)
+
+        return np.where(found, e, -1)
+
+    def neighbours(self, state):
+        """Returns states reachable from the state (among all edges)"""
+
+        first = np.searchsorted(self.keys, np.int64(state) << self.dim)
+        last = np.searchsorted(self.keys, np.int64(state + 1) << self.dim)
+
+        return (self.keys[first:last] & ((1 << self.dim) - 1)).tolist()
+
+
+class HypercubeEnv(object):
+    """K hypercubes with a goal state; an agent is returned to the start after the goal
+
+    :param dim: dimension of the hypercube
+    :param task: shape of the allowed transitions ('ring', 'fork' or 'line')
+    :param stochastic: if True one of the two pre-goal transitions is closed at random
+        after every visit of the goal (stochastic T-maze)
+    :param K: number of agents
+    :param rng: random generator (numpy RandomState) of the stochastic transitions
+    """
+
+    def __init__(self, dim=3, task='fork', stochastic=True, K=1, rng=None):
+        self.dim = dim
+        self.task = task
+        self.stochastic = stochastic
+        self.K = K
+        self.rng = rng if rng is not None else np.random.RandomState()
+        self.start = 0
+        self.goal = (1 << dim) - 1
+        self.preGoal = [flip(self.goal, 1, dim), flip(self.goal, dim - 1, dim)]
+        extra = [(s, self.goal) for s in self.preGoal] if stochastic else []
+        self.trans = Transitions(dim, transitions[task](dim), extra)
+        self.preGoalEdges = self.trans.edge(self.preGoal, [self.goal] * 2)
+        self.allowed = np.tile(self.trans.initial, (K, 1))  # agent x edge
+        self.states = np.zeros(K, dtype=np.int64)
+        self.states.fill(self.start)
+        self.goalsReached = np.zeros(K, dtype=int)
+        self.shifts = np.arange(dim - 1, -1, -1)
+
+    def inputs(self, k=None):
+        """Returns K x dim array of bits of the states or {bit: value} of the agent k"""
+
+        if k is not None:
+            return dict(enumerate(ind2St(int(self.states[k]), self.dim)))
+        return (self.states[:, None] >> self.shifts) & 1
+
+    def step(self, states, actions):
+        """Returns states after the actions (ids of output FSs, -1 for no action) of the
+        agents in the states"""
+
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=int)
+        mask = np.left_shift(1, self.dim - 1 - actions % self.dim).astype(np.int64)
+        newStates = np.where(actions // self.dim - 1 > 0, states | mask, states & ~mask)
+        e = self.trans.edge(states, newStates)
+        ok = (actions >= 0) & (e >= 0) & self.allowed[np.arange(len(states)), np.maximum(e, 0)]
+
+        return np.where(ok, newStates, states)
+
+    def act(self, actions):
+        """Applies the actions of all agents (ids of the winning output FSs, -1 for no action)
+        :return: bool array - agents returned to the start (network activity should be reset)
+        """
+
+        oldStates = self.states
+        atGoal = oldStates == self.goal
+        self.states = np.where(atGoal, self.goal, self.step(oldStates, actions))
+        self.goalsReached += (self.states == self.goal) & ~atGoal
+
+        if self.stochastic:
+            for k in np.nonzero(atGoal)[0]:
+                first = bool(np.around(self.rng.random_sample()))
+                self.allowed[k, self.preGoalEdges] = (first, not first)
+        self.states[atGoal] = self.start
+
+        return atGoal
+
+# end of FSEnv
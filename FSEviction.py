@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Capacity limit of the hidden layer of a Functional Systems Network
+
+HiddenUsage keeps per-FS statistics of the hidden layer: time of the
+promotion from the memory trace (FSNetwork.learn), time of the last
+activation (logActivity), number of reached goals the FS was used for
+(resetUsedFS) and whether its prediction was ever matched (matchedFS).
+When FSNetwork.limitHidden is set and learn promotes FSs beyond the
+capacity, the FSs with the smallest key of the eviction policy are
+removed with FSNetwork.removeFS. Active FSs are evicted only if there is
+no inactive one.
+
+Policies are functions key(usage, ID) (the smallest key is evicted first):
+    lru        - time of the last activation
+    goal       - number of goals reached with the FS, then lru
+    unmatched  - FSs never matched first, the oldest promotion first
+
+Created on Sun Oct 18 18:28:33 2026
+"""
+
+import heapq
+
+
+def lru(usage, ID):
+    return usage.lastActive[ID]
+
+
+def goalContribution(usage, ID):
+    return usage.contributions[ID], usage.lastActive[ID]
+
+
+def oldestUnmatched(usage, ID):
+    return ID in usage.matched, usage.promoted[ID]
+
+
+policies = {'lru': lru, 'goal': goalContribution, 'unmatched': oldestUnmatched}
+
+
+class HiddenUsage(object):
+    """Usage statistics of the hidden FSs and their eviction
+
+    :param capacity: maximal number of hidden FSs
+    :param policy: name of the policy (see policies) or a function key(usage, ID)
+    """
+
+    def __init__(self, capacity, policy='lru'):
+        self.capacity = capacity
+        self.policy = policy
+        self.key = policies[policy] if isinstance(policy, basestring) else policy
+        self.promoted = {}  # {FSID: time of the promotion}
+        self.lastActive = {}  # {FSID: time of the last activation}
+        self.contributions = {}  # {FSID: number of goals reached with the FS}
+        self.matched = set()  # FSs with the prediction matched at least once
+        self.evicted = 0  # number of evicted FSs
+
+    def add(self, ID, time):
+        """Registers the FS promoted to the hidden layer at the time"""
+
+        self.promoted[ID] = time
+        self.lastActive[ID] = time
+        self.contributions[ID] = 0
+
+    def discard(self, ID):
+        """Forgets the FS"""
+
+        if ID in self.promoted:
+            del self.promoted[ID], self.lastActive[ID], self.contributions[ID]
+            self.matched.discard(ID)
+
+    def record(self, net, stamp):
+        """Stamps active hidden FSs and marks matched ones (called by logActivity)"""
+
+        for ID in net.flags.active:
+            if ID in self.lastActive:
+                self.lastActive[ID] = stamp
+        for ID in net.matchedFS:
+            if ID in self.promoted:
+                self.matched.add(ID)
+
+    def contributed(self, ID):
+        """Counts a goal reached with the FS"""
+
+        if ID in self.contributions:
+            self.contributions[ID] += 1
+
+    def victims(self, active):
+        """Returns ids of FSs to evict to keep the capacity
+        :param active: set of ids of active FSs (evicted after the inactive ones)
+        """
+
+        excess = len(self.promoted) - self.capacity
+        if excess <= 0:
+            return []
+        key = self.key
+
+        return heapq.nsmallest(excess, self.promoted, key=lambda ID: (ID in active, key(self, ID), ID))
+
+# end of FSEviction
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""Programmatic experiments with Functional Systems Networks and a process-pool
+runner for seed and parameter sweeps
+
+An experiment is described by a config dict (see defaults); runExperiment
+builds the environment and the network, runs it and returns metrics
+(goalsDyn, NFSDyn). runSweep shards a list of configs (e.g. made by grid)
+across a multiprocessing pool and appends every finished result as a line
+of JSON to the results file, so a partly finished sweep is resumed by
+running it again with the same file.
+
+Created on Sun Oct 18 17:49:48 2026
+"""
+
+import os
+import sys
+import json
+import time
+import itertools
+import traceback
+import multiprocessing
+import numpy as np
+import FSNpy as FSN
+import FSEnv
+
+defaults = {'task': 'fork',  # transitions of the hypercube (FSEnv.transitions)
+            'dim': 3,  # dimension of the hypercube
+            'period': 500,  # number of steps of the environment
+            'reentry': 2,  # number of network updates per step
+            'settleTol': None,  # tolerance of the adaptive reentry (None - reentry updates per step)
+            'maxReentry': 10,  # maximal number of updates per step of the adaptive reentry
+            'stochEnv': True,  # stochastic T-maze
+            'engine': False,  # array-backed update (FSEngine)
+            'capacity': None,  # maximal number of hidden FSs (None - unlimited)
+            'eviction': 'lru',  # eviction policy of the hidden FSs beyond the capacity (FSEviction)
+            'seed': 0}
+
+
+def buildNet(config):
+    """Creates the control network for the hypercube task of the config"""
+
+    dim = config['dim']
+    netSeed, envSeed = np.random.RandomState(config['seed']).randint(2 ** 31 - 1, size=2)
+    env = FSEnv.HypercubeEnv(dim, config['task'], config['stochEnv'],
+                             rng=np.random.RandomState(envSeed))
+    net = FSN.FSNetwork(seed=netSeed)
+    net.reentry = config['reentry']
+    net.settleTol = config['settleTol']
+    net.maxReentry = config['maxReentry']
+    net.initCtrlNet(dim, 2 * dim, 1)
+    goalID = net.goalFS.keys()[0]
+    net.addActionLinks([[l, goalID, FSEnv.ind2St(env.start, dim)[l]] for l in range(dim)])
+    net.addPredictionLinks([[l, goalID, FSEnv.ind2St(env.goal, dim)[l]] for l in range(dim)])
+    if config['capacity'] is not None:
+        net.limitHidden(config['capacity'], config['eviction'])
+    if config['engine']:
+        net.useEngine()
+
+    return env, net
+
+
+def runExperiment(config, quiet=True):
+    """Runs an experiment
+    :param config: dict of parameters, missing ones are taken from defaults
+    :param quiet: suppress printing of the network
+    :return: dict with the config and metrics goalsDyn, NFSDyn, loopsDyn, goals, NFS, evicted, time
+    """
+
+    config = dict(defaults, **config)
+    stdout = sys.stdout
+    if quiet:
+        sys.stdout = open(os.devnull, 'w')
+    try:
+        t0 = time.time()
+        env, net = buildNet(config)
+        goalsDyn = []
+        NFSDyn = []
+        loopsDyn = []
+        for t in range(config['period']):
+            net.step(t, env.inputs(0))
+            winFS = 0
+            for fs in net.outFS.values():
+                if fs.isActive:
+                    winFS = fs.ID
+            if env.act([winFS])[0]:
+                net.resetActivity()
+            goalsDyn.append(int(env.goalsReached[0]))
+            NFSDyn.append(len(net.hiddenFS))
+            loopsDyn.append(net.loops)
+    finally:
+        if quiet:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    return {'config': config, 'goalsDyn': goalsDyn, 'NFSDyn': NFSDyn, 'loopsDyn': loopsDyn,
+            'goals': int(env.goalsReached[0]), 'NFS': len(net.hiddenFS),
+            'evicted': net.usage.evicted if net.usage else 0, 'time': time.time() - t0}
+
+
+def grid(base=None, **axes):
+    """Returns configs for all combinations of the values of the axes
+    e.g. grid({'period': 300}, dim=[3, 4], seed=range(10))
+    """
+
+    names = sorted(axes)
+    configs = []
+    for values in itertools.product(*[axes[name] for name in names]):
+        config = dict(base or {})
+        config.update(zip(names, values))
+        configs.append(config)
+
+    return configs
+
+
+def configKey(config):
+    """Returns a string identifying the experiment of the config"""
+    return json.dumps(dict(defaults, **config), sort_keys=True)
+
+
+def loadResults(path):
+    """Returns successful results stored in the results file (a line of JSON per result)"""
+
+    results = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:  # a line cut by an interrupted run
+                    continue
+                if 'error' not in result:
+                    results.append(result)
+
+    return results
+
+
+def runConfig(config):
+    """Runs an experiment in a worker process, errors are returned as results"""
+
+    try:
+        return runExperiment(config)
+    except Exception:
+        return {'config': dict(defaults, **config), 'error': traceback.format_exc()}
+
+
+def runSweep(configs, path, processes=None, callback=None):
+    """Runs experiments of the configs in a process pool
+    :param configs: list of config dicts
+    :param path: results file; configs with results in it are not run again
+    :param processes: number of worker processes (number of cores by default)
+    :param callback: function called with every new result
+    :return: list of results of the configs (failed experiments are skipped)
+    """
+
+    done = dict((configKey(r['config']), r) for r in loadResults(path))
+    todo = []
+    keys = set(done)
+    for config in configs:
+        key = configKey(config)
+        if key not in keys:
+            keys.add(key)
+            todo.append(config)
+
+    if todo:
+        pool = multiprocessing.Pool(processes)
+        try:
+            with open(path, 'a+') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    cut = f.read(1) != '\n'  # the last line was cut by an interrupted run
+                    f.seek(0, os.SEEK_END)
+                    if cut:
+                        f.write('\n')
+                for result in pool.imap_unordered(runConfig, todo):
+                    f.write(json.dumps(result) + '\n')
+                    f.flush()
+                    if 'error' in result:
+                        print >> sys.stderr, 'experiment failed:', result['config'], '\n', result['error']
+                    else:
+                        done[configKey(result['config'])] = result
+                    if callback:
+                        callback(result)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    return [done[configKey(c)] for c in configs if configKey(c) in done]
+
+# end of FSExperiment
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Incremental index of the flags of FSs of a network
+
+FlagIndex keeps sets of ids of FSs with isActive, failed, isLearning and
+wasUsed set. FSs of a network report every change of these flags (flag
+properties of AtomFS, bulk updates of FSEngine report changed slots only),
+so lists of active, failed or used FSs are read from the sets instead of
+rescanning the whole network.
+
+The index also keeps the epoch of the network: newEpoch (called by
+FSNetwork.resetActivity) clears the flags reset by AtomFS.resetActivity and
+advances the epoch, and an FS stamped with an earlier epoch resets its
+state by AtomFS.refresh (slots of the engine by FSEngine.refresh, so a
+reset of a network in the engine does not visit every FS).
+
+Created on Sun Oct 18 17:59:22 2026
+"""
+
+flagNames = ('isActive', 'failed', 'isLearning', 'wasUsed')
+resetFlags = ('isActive', 'failed', 'wasUsed')  # flags cleared by a reset of the network
+
+
+class FlagIndex(object):
+    """Sets of FS ids for every tracked flag"""
+
+    def __init__(self):
+        self.sets = dict((name, set()) for name in flagNames)
+        self.active = self.sets['isActive']
+        self.failed = self.sets['failed']
+        self.learning = self.sets['isLearning']
+        self.used = self.sets['wasUsed']
+        self.epoch = 0  # FSs with an earlier epoch count as reset (see newEpoch)
+
+    def change(self, ID, name, value):
+        """Registers the value of the flag of the FS"""
+
+        if value:
+            self.sets[name].add(ID)
+        else:
+            self.sets[name].discard(ID)
+
+    def add(self, fs):
+        """Registers all flags of the FS (an FS of an earlier epoch has its resetFlags cleared)"""
+
+        stale = fs.epoch != self.epoch
+        for name in flagNames:
+            self.change(fs.ID, name, getattr(fs, name) and not (stale and name in resetFlags))
+
+    def newEpoch(self):
+        """Starts a new epoch: FSs stamped with an earlier one count as inactive, not failed
+        and not used until they refresh their state"""
+
+        self.epoch += 1
+        for name in resetFlags:
+            self.sets[name].clear()
+
+    def discard(self, ID):
+        """Forgets the FS"""
+        for s in self.sets.itervalues():
+            s.discard(ID)
+
+# end of FSFlags
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Bounded history of the activity of a Functional Systems Network
+
+HistoryRecorder keeps the last records of activation and mismatch of FSs
+in preallocated 2-D ring buffers (time x FS column). A column is assigned
+to a FS when it is recorded for the first time and is reused when the FS
+is no longer present in the window, so memory stays bounded in long runs.
+Columns of FSs are looked up in an array indexed by the FS id, so a record
+is stored with a few array operations whatever the number of FSs.
+
+Created on Sun Oct 18 17:45:29 2026
+"""
+
+import numpy as np
+
+
+class HistoryRecorder(object):
+    """Ring buffers with the last depth records of FS activity
+
+    :param depth: number of records kept
+    :param every: downsampling - one record is stored per every calls of record
+    :param mode: how the calls are reduced to a record: 'last', 'mean' or 'max'
+    :param fields: names of {FSID: value} dicts of the network to record
+    :param dtype: type of the stored values (activation and mismatch lie in [0, 1])
+    """
+
+    def __init__(self, depth=1000, every=1, mode='last', fields=('activation', 'mismatch'),
+                 dtype=np.float32):
+        if mode not in ('last', 'mean', 'max'):
+            raise ValueError("mode should be 'last', 'mean' or 'max'")
+        self.depth = depth
+        self.every = every
+        self.mode = mode
+        self.fields = fields
+        self.width = 0  # number of columns
+        self.times = np.zeros(depth)
+        self.buffers = dict((field, np.zeros((depth, 0), dtype=dtype)) for field in fields)
+        self.columnOf = np.zeros(0, dtype=int)  # FSID -> column (-1 for FSs without a column)
+        self.ids = np.zeros(0, dtype=int)  # column -> FSID (-1 for a free column)
+        self.freeColumns = []
+        self.lastSeen = np.zeros(0, dtype=int)  # number of the last record of the column
+        self.count = 0  # number of stored records
+        self.calls = 0  # number of calls of record
+        self.pending = None  # accumulated values of the downsampling window
+        self.grow(16)
+
+    def __len__(self):
+        return min(self.count, self.depth)
+
+    def grow(self, width):
+        """Extends buffers to width columns"""
+
+        for field in self.fields:
+            old = self.buffers[field]
+            buf = np.empty((self.depth, width), dtype=old.dtype)
+            buf.fill(np.nan)
+            buf[:, :self.width] = old
+            self.buffers[field] = buf
+        self.lastSeen = self.extend(self.lastSeen, width, -self.depth - 1)
+        self.ids = self.extend(self.ids, width, -1)
+        self.freeColumns.extend(range(width - 1, self.width - 1, -1))
+        self.width = width
+
+    @staticmethod
+    def extend(array, size, fill):
+        """Returns copy of array extended to size with fill"""
+
+        new = np.empty(size, dtype=array.dtype)
+        new.fill(fill)
+        new[:len(array)] = array
+
+        return new
+
+    def columns(self, ids):
+        """Returns columns of the FSs (array of ids), assigns new ones if needed"""
+
+        if len(ids) and ids.max() >= len(self.columnOf):
+            self.columnOf = self.extend(self.columnOf, max(ids.max() + 1, 2 * len(self.columnOf)), -1)
+        cols = self.columnOf[ids]
+        new = np.nonzero(cols < 0)[0]
+        self.lastSeen[cols[cols >= 0]] = self.count  # the columns are in use by the current record
+        if len(new):
+            if len(new) > len(self.freeColumns):
+                # columns of FSs which are out of the window are reused
+                old = np.nonzero((self.lastSeen < self.count - self.depth) & (self.ids >= 0))[0]
+                self.columnOf[self.ids[old]] = -1
+                self.ids[old] = -1
+                self.freeColumns.extend(old[::-1].tolist())
+            if len(new) > len(self.freeColumns):
+                self.grow(max(2 * self.width, self.width + len(new) - len(self.freeColumns)))
+            free = self.freeColumns[-len(new):][::-1]
+            del self.freeColumns[-len(new):]
+            cols[new] = free
+            self.columnOf[ids[new]] = free
+            self.ids[free] = ids[new]
+            self.lastSeen[free] = self.count
+
+        return cols
+
+    def column(self, ID):
+        """Returns the column of the FS, assigns a new one if needed"""
+        return self.columns(np.array([ID]))[0]
+
+    def record(self, net, stamp):
+        """Appends activation and mismatch of FSs of the network at the time stamp"""
+
+        self.calls += 1
+        values = {}
+        for field in self.fields:
+            data = getattr(net, field)
+            cols = self.columns(np.fromiter(data.iterkeys(), dtype=int, count=len(data)))
+            values[field] = (cols, np.fromiter(data.itervalues(), dtype=float, count=len(data)))
+
+        if self.every > 1:
+            values = self.reduce(values)
+            if values is None:
+                return
+
+        row = self.count % self.depth
+        self.times[row] = stamp
+        for field, (cols, vals) in values.iteritems():
+            buf = self.buffers[field]
+            buf[row].fill(np.nan)
+            buf[row, cols] = vals
+            self.lastSeen[cols] = self.count
+        self.count += 1
+
+    def reduce(self, values):
+        """Accumulates values over the downsampling window, returns them at its end"""
+
+        if self.pending is None:
+            self.pending = {}
+        for field, (cols, vals) in values.iteritems():
+            # accumulated values and numbers of calls per column
+            acc, n = self.pending.get(field, (np.zeros(0), np.zeros(0, dtype=int)))
+            if len(acc) < self.width:
+                acc, n = self.extend(acc, self.width, 0), self.extend(n, self.width, 0)
+            if self.mode == 'last':
+                acc[cols] = vals
+                n[cols] = 1
+            elif self.mode == 'mean':
+                acc[cols] += vals
+                n[cols] += 1
+            else:
+                acc[cols] = np.where(n[cols] > 0, np.maximum(acc[cols], vals), vals)
+                n[cols] += 1
+            self.pending[field] = (acc, n)
+        if self.calls % self.every:
+            return None
+
+        reduced = {}
+        for field, (acc, n) in self.pending.iteritems():
+            cols = np.nonzero(n)[0]
+            reduced[field] = (cols, acc[cols] / n[cols] if self.mode == 'mean' else acc[cols])
+        self.pending = None
+
+        return reduced
+
+    def rows(self):
+        """Returns indices of stored rows in chronological order"""
+
+        n = len(self)
+        return (np.arange(self.count - n, self.count)) % self.depth
+
+    def matrix(self, field='activation', fill=0.):
+        """Returns dense history of the field ready for plotting
+        :param field: recorded field ('activation' or 'mismatch')
+        :param fill: value for FSs absent at the time (None keeps NaN)
+        :return: (times, ids, matrix) - time stamps, FS ids sorted, matrix time x FS
+        """
+
+        rows = self.rows()
+        data = self.buffers[field][rows]
+        cols = np.nonzero((self.ids >= 0) & (self.lastSeen >= self.count - len(rows)))[0]
+        cols = cols[np.argsort(self.ids[cols])]
+        data = data[:, cols]
+        if fill is not None:
+            data[np.isnan(data)] = fill
+
+        return self.times[rows], self.ids[cols].tolist(), data
+
+    def at(self, stamp, field='activation'):
+        """Returns {FSID: value} recorded at the time stamp closest to the given one"""
+
+        rows = self.rows()
+        if len(rows) == 0:
+            return {}
+        row = rows[np.argmin(np.absolute(self.times[rows] - stamp))]
+        data = self.buffers[field][row]
+
+        cols = np.nonzero(~np.isnan(data) & (self.ids >= 0))[0]
+
+        return dict(zip(self.ids[cols].tolist(), data[cols].tolist()))
+
+# end of FSHistory
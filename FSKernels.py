@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Kernels for the input functions of functional systems (FS)
+
+Scalar kernels (rbf, weightedSum) are used by AtomFS for a single FS and
+take a plain Python path for a small fan-in, where the overhead of numpy
+calls dominates. Batched kernels evaluate inputs of many FSs at once from
+link arrays (target index, source index, weight, value) and keep their
+temporary arrays in preallocated buffers.
+
+Created on Sun Oct 18 17:44:22 2026
+"""
+
+import math
+import numpy as np
+
+smallFanIn = 8  # fan-in below which scalar kernels do not use numpy
+
+
+def rbf(inputs, centroids, weights):
+    """Returns exp(-10 * sum(|input - centroid| * weight)) over the inputs, 0 if no inputs"""
+
+    n = len(inputs)
+    if n == 0:
+        return 0
+    if n < smallFanIn:  # numpy sums short arrays sequentially, so does the loop
+        s = 0.
+        for i, x in inputs.iteritems():
+            s += abs(x - centroids[i]) * weights[i]
+        return math.exp(-10 * s)
+    keys = inputs.keys()
+    x = np.fromiter((inputs[i] for i in keys), dtype=float, count=n)
+    c = np.fromiter((centroids[i] for i in keys), dtype=float, count=n)
+    w = np.fromiter((weights[i] for i in keys), dtype=float, count=n)
+
+    return np.exp(-10 * np.multiply(np.absolute(np.subtract(x, c)), w).sum())
+
+
+def weightedSum(inputs, weights, norm=False):
+    """Returns sum of inputs multiplied by weights (over the weights present in inputs)"""
+
+    if len(inputs) == 0:
+        return 0
+    if len(weights) < smallFanIn:
+        wsum = 0.
+        for i, w in weights.iteritems():
+            if i in inputs:
+                wsum += inputs[i] * w
+    else:
+        keys = [i for i in weights.iterkeys() if i in inputs]
+        x = np.fromiter((inputs[i] for i in keys), dtype=float, count=len(keys))
+        w = np.fromiter((weights[i] for i in keys), dtype=float, count=len(keys))
+        wsum = np.multiply(x, w).sum()
+    if norm and wsum != 0:
+        wsum = wsum / sum(abs(w) for w in weights.itervalues())
+
+    return wsum
+
+
+class KernelBuffers(object):
+    """Preallocated work arrays of the batched kernels"""
+
+    def __init__(self, size=1024):
+        self.arrays = {}
+        self.size = size
+
+    def get(self, name, m, dtype=float):
+        """Returns a work array of length m (a view of the preallocated buffer)"""
+
+        buf = self.arrays.get(name)
+        if buf is None or len(buf) < m:
+            self.size = max(self.size, 2 * m)
+            buf = np.empty(self.size, dtype=dtype)
+            self.arrays[name] = buf
+
+        return buf[:m]
+
+
+_buffers = KernelBuffers()
+
+
+def rbfBatch(dst, src, values, weights, x, gate, n, buffers=None):
+    """Batched rbf for n targets
+    :param dst: target index of every link (0..n-1)
+    :param src: source index of every link (index of x and gate)
+    :param values: centroids of the links
+    :param weights: weights of the links
+    :param x: activity of sources
+    :param gate: bool mask of sources that pass their activity
+    :return: (match, count) - rbf of every target and a number of its gated inputs
+    """
+
+    buffers = buffers or _buffers
+    m = len(src)
+    on = np.take(gate, src, out=buffers.get('on', m, bool))
+    c = np.take(x, src, out=buffers.get('c', m))
+    np.subtract(c, values, out=c)
+    np.absolute(c, out=c)
+    np.multiply(c, weights, out=c)
+    c[~on] = 0.
+    s = np.bincount(dst, weights=c, minlength=n)
+    count = np.bincount(dst, weights=on, minlength=n)
+    with np.errstate(over='ignore'):
+        match = np.where(count > 0, np.exp(-10 * s), 0.)
+
+    return match, count
+
+
+def weightedSumBatch(dst, src, weights, x, gate, n, buffers=None):
+    """Batched weightedSum for n targets (arguments as for rbfBatch)
+    :return: (sum, count) - weighted sum of gated inputs and a number of them
+    """
+
+    buffers = buffers or _buffers
+    m = len(src)
+    on = np.take(gate, src, out=buffers.get('on', m, bool))
+    c = np.take(x, src, out=buffers.get('c', m))
+    np.multiply(c, weights, out=c)
+    c[~on] = 0.
+
+    return np.bincount(dst, weights=c, minlength=n), np.bincount(dst, weights=on, minlength=n)
+
+
+def inputBatch(dst, src, values, weights, rbf, x, gate, n, buffers=None):
+    """Batched input sums of links of several types at once: terms |x - value| * weight
+    (as rbfBatch sums them before the exp) for the links in rbf, x * weight for the others
+    :param dst: index of the sum of every link (0..n-1), e.g. target and link type
+    :param rbf: bool mask of the links with rbf terms
+    :return: (sum, count) - sum of gated terms and a number of them for every index
+    (other arguments as for rbfBatch)
+    """
+
+    buffers = buffers or _buffers
+    m = len(src)
+    on = np.take(gate, src, out=buffers.get('on', m, bool))
+    c = np.take(x, src, out=buffers.get('c', m))
+    d = np.subtract(c, values, out=buffers.get('d', m))
+    np.absolute(d, out=d)
+    np.copyto(c, d, where=rbf)
+    np.multiply(c, weights, out=c)
+    c[~on] = 0.
+
+    return np.bincount(dst, weights=c, minlength=n), np.bincount(dst, weights=on, minlength=n)
+
+# end of FSKernels
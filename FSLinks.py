@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""Network-level sparse storage of links between functional systems (FS)
+
+Every link type (problem, goal, lateral, control) is kept in one sparse
+matrix (target FS x source FS) with incremental insertion and deletion.
+Weights dicts of FSs added to a network become views of the store: they
+behave as ordinary dicts and every modification goes to the matrices, so
+the engine (FSEngine) reads the links of all FSs of a type as edge arrays.
+An FS without links of a type has no view (AtomFS.LazyDict reads as an
+empty dict), its view is created by the first write.
+
+Created on Sun Oct 18 17:42:31 2026
+"""
+
+import numpy as np
+
+# link types: (weights dict, values dict) of AtomFS
+linkTypes = {'problem': ('problemWeights', 'problemValues'),
+             'goal': ('goalWeights', 'goalValues'),
+             'lateral': ('lateralWeights', None),
+             'control': ('controlWeights', None)}
+
+# {dict of AtomFS: (link type, field)}
+linkFields = dict((name, (kind, field)) for kind, names in linkTypes.iteritems()
+                  for name, field in zip(names, ('weight', 'value')) if name)
+
+
+class LinkMatrix(object):
+    """Sparse matrix of links of one type with O(1) insertion and deletion
+
+    Links are kept in a pool of edges (coordinate format) with a free list;
+    the edges sorted by target or by source are built on demand and cached
+    until the next modification.
+    """
+
+    def __init__(self, capacity=64):
+        self.src = np.zeros(capacity, dtype=int)  # source FS id
+        self.dst = np.zeros(capacity, dtype=int)  # target FS id
+        self.w = np.zeros(capacity)  # weight of the link
+        self.v = np.zeros(capacity)  # value (centroid) of the link
+        self.on = np.zeros(capacity, dtype=bool)  # link is present in the weights dict
+        self.hasValue = np.zeros(capacity, dtype=bool)  # link is present in the values dict
+        self.used = np.zeros(capacity, dtype=bool)
+        self.index = {}  # {(dst, src): edge}
+        self.targetsOf = {}  # reverse index {src: set of dst}
+        self.free = []
+        self.size = 0  # number of allocated edges (high water mark)
+        self.version = 0
+        self.touched = set()  # targets of the links changed since the engine took them
+        self.watchers = []  # sets of targets of the changed links of other readers (see watch)
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    fields = ('src', 'dst', 'w', 'v', 'on', 'hasValue', 'used')  # arrays of the edge pool
+
+    def export(self):
+        """Returns {field: array} of the edge pool with the free list"""
+
+        arrays = dict((name, getattr(self, name)[:self.size]) for name in self.fields)
+        arrays['free'] = np.array(self.free, dtype=int)
+
+        return arrays
+
+    @classmethod
+    def fromArrays(cls, arrays, version=0):
+        """Creates matrix from the arrays made by export"""
+
+        matrix = cls(max(64, len(arrays['src'])))
+        matrix.size = len(arrays['src'])
+        for name in cls.fields:
+            getattr(matrix, name)[:matrix.size] = arrays[name]
+        matrix.free = arrays['free'].tolist()
+        used = np.nonzero(matrix.used[:matrix.size])[0]
+        dst, src = matrix.dst[used].tolist(), matrix.src[used].tolist()
+        matrix.index = dict(zip(zip(dst, src), used.tolist()))
+        for d, s in zip(dst, src):
+            matrix.targetsOf.setdefault(s, set()).add(d)
+        matrix.version = version
+
+        return matrix
+
+    def grow(self):
+        """Doubles capacity of the edge pool"""
+
+        for name in self.fields:
+            old = getattr(self, name)
+            new = np.zeros(2 * len(old), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def edge(self, dst, src):
+        """Returns edge for the link src -> dst, allocates it if needed"""
+
+        e = self.index.get((dst, src))
+        if e is None:
+            if self.free:
+                e = self.free.pop()
+            else:
+                if self.size == len(self.src):
+                    self.grow()
+                e = self.size
+                self.size += 1
+            self.src[e] = src
+            self.dst[e] = dst
+            self.w[e] = self.v[e] = 0.
+            self.on[e] = self.hasValue[e] = False
+            self.used[e] = True
+            self.index[(dst, src)] = e
+            self.targetsOf.setdefault(src, set()).add(dst)
+
+        return e
+
+    def set(self, dst, src, weight=None, value=None):
+        """Sets weight and/or value of the link src -> dst"""
+
+        e = self.edge(dst, src)
+        if weight is not None:
+            self.w[e] = weight
+            self.on[e] = True
+        if value is not None:
+            self.v[e] = value
+            self.hasValue[e] = True
+        self.touched.add(dst)
+        for changed in self.watchers:
+            changed.add(dst)
+        self.version += 1
+
+    def unset(self, dst, src, weight=True, value=False):
+        """Removes weight and/or value of the link src -> dst"""
+
+        e = self.index.get((dst, src))
+        if e is None:
+            return
+        if weight:
+            self.w[e] = 0.
+            self.on[e] = False
+        if value:
+            self.v[e] = 0.
+            self.hasValue[e] = False
+        if not self.on[e] and not self.hasValue[e]:
+            del self.index[(dst, src)]
+            targets = self.targetsOf[src]
+            targets.discard(dst)
+            if not targets:
+                del self.targetsOf[src]
+            self.used[e] = False
+            self.free.append(e)
+        self.touched.add(dst)
+        for changed in self.watchers:
+            changed.add(dst)
+        self.version += 1
+
+    def watch(self):
+        """Returns a set the targets of links changed from now on are added to (the reader
+        clears it after it took the changes)"""
+
+        changed = set()
+        self.watchers.append(changed)
+
+        return changed
+
+    def unwatch(self, changed):
+        """Stops collecting changes into the set made by watch"""
+        self.watchers = [w for w in self.watchers if w is not changed]
+
+    def targets(self, src):
+        """Returns a list of FSs with links from src (reverse adjacency)"""
+
+        return list(self.targetsOf.get(src, ()))
+
+    def edges(self, by='dst'):
+        """Returns (indices, dst, src, w, v) of links sorted by target ('dst', CSR
+        order), by source ('src', CSC order) or in the order of the edge pool (None)"""
+
+        key = ('edges', by)
+        if self.cache.get('version') != self.version:
+            self.cache = {'version': self.version}
+        if key not in self.cache:
+            e = np.nonzero(self.on[:self.size])[0]
+            if by is not None:
+                e = e[np.argsort(getattr(self, by)[e], kind='mergesort')]
+            self.cache[key] = (e, self.dst[e], self.src[e], self.w[e], self.v[e])
+
+        return self.cache[key]
+
+
+class LinkView(dict):
+    """Weights (or values) dict of a FS that writes through to the link store"""
+
+    __slots__ = ('matrix', 'owner', 'field')
+
+    def __init__(self, matrix, owner, field, items=()):
+        dict.__init__(self)
+        self.matrix = matrix
+        self.owner = owner  # id of the FS (target of the links)
+        self.field = field  # 'weight' or 'value'
+        self.update(items)
+
+    @classmethod
+    def fromItems(cls, matrix, owner, field, items):
+        """Creates view of links already present in the matrix (nothing is written)"""
+
+        view = cls.__new__(cls)
+        dict.update(view, items)
+        view.matrix = matrix
+        view.owner = owner
+        view.field = field
+
+        return view
+
+    def __setitem__(self, src, value):
+        dict.__setitem__(self, src, value)
+        self.matrix.set(self.owner, src, **{self.field: value})
+
+    def __delitem__(self, src):
+        dict.__delitem__(self, src)
+        self.matrix.unset(self.owner, src, self.field == 'weight', self.field == 'value')
+
+    def update(self, *args, **kwargs):
+        for src, value in dict(*args, **kwargs).iteritems():
+            self[src] = value
+
+    def setdefault(self, src, value=None):
+        if src not in self:
+            self[src] = value
+        return self[src]
+
+    def pop(self, src, *default):
+        if src in self:
+            value = self[src]
+            del self[src]
+            return value
+        return dict.pop(self, src, *default)
+
+    def popitem(self):
+        src, value = dict.popitem(self)
+        dict.__setitem__(self, src, value)
+        del self[src]
+        return src, value
+
+    def clear(self):
+        for src in self.keys():
+            del self[src]
+
+    def assign(self, items):
+        """Replaces content of the dict"""
+        self.clear()
+        self.update(items)
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+    def __deepcopy__(self, memo):
+        from copy import deepcopy
+        return deepcopy(dict(self), memo)
+
+
+class LinkStore(object):
+    """Links of the network: one sparse LinkMatrix per link type"""
+
+    def __init__(self):
+        self.matrices = dict((kind, LinkMatrix()) for kind in linkTypes)
+
+    def __getitem__(self, kind):
+        return self.matrices[kind]
+
+    @property
+    def version(self):
+        return tuple(self.matrices[kind].version for kind in sorted(self.matrices))
+
+    def view(self, ID, name):
+        """Returns a new view for the dict name of AtomFS (see linkFields) of the FS"""
+
+        kind, field = linkFields[name]
+
+        return LinkView(self.matrices[kind], ID, field)
+
+    def attach(self, fs):
+        """Replaces weights dicts of the FS by the views of the store
+        (empty dicts are dropped, the FS creates their views on the first write)"""
+
+        fs.links = self
+        for kind, (wName, vName) in linkTypes.iteritems():
+            matrix = self.matrices[kind]
+            # values first: the weights define presence of the link
+            for name, field in ((vName, 'value'), (wName, 'weight')):
+                if name and getattr(fs, name):
+                    setattr(fs, name, LinkView(matrix, fs.ID, field, getattr(fs, name)))
+                elif name:
+                    fs.drop(name)
+
+    def detach(self, fs):
+        """Removes incoming links of the FS from the store and gives it plain dicts back"""
+
+        for kind, (wName, vName) in linkTypes.iteritems():
+            matrix = self.matrices[kind]
+            for name in (wName, vName):
+                if name and getattr(fs, name):
+                    links = getattr(fs, name)
+                    for src in links.keys():
+                        matrix.unset(fs.ID, src, True, True)
+                    setattr(fs, name, dict(links))
+                elif name:
+                    fs.drop(name)
+        fs.links = None
+
+# end of FSLinks
@@ -8,20 +8,39 @@ Created on Sun Sep 01 14:25:22 2013
 """
 
 from copy import deepcopy
-import random
+import numpy as np
 import AtomFS as FS
+import FSEngine
+import FSEviction
+import FSFlags
+import FSLinks
+import FSHistory
+import FSProfile
+import FSSignature
 
 
-def probSel(out_fs):
-    rnd = random.random() * sum([ofs.activity for ofs in out_fs])
-    for ofs in out_fs:
-        rnd -= ofs.activity
+def probSel(out_fs, rng):
+    return probSelValues([ofs.ID for ofs in out_fs], [ofs.activity for ofs in out_fs], rng)
+
+
+def probSelValues(ids, activities, rng):
+    """selects one of the ids with the probability proportional to its activity"""
+    rnd = rng.random_sample() * sum(activities)
+    for ID, activity in zip(ids, activities):
+        rnd -= activity
         if rnd < 0:
-            return ofs.ID
+            return ID
 
 
 class FSNetwork:
-    """Implements a network of functional systems (FS)"""
+    """Implements a network of functional systems (FS)
+
+    :param histDepth: number of records of activation and mismatch kept in history
+        (FSHistory.HistoryRecorder), None or 0 - no history is recorded
+    :param histEvery: one record of the history is stored per histEvery updates
+    :param seed: seed of the random generator of the network
+    :param rng: random generator of the network (numpy RandomState), overrides seed
+    """
     net = {}  # net is a dictionary {FSID: AtomFS}
     inFS = {}  # a list of input FS
     goalFS = {}  # a list of FS for the representation of goals
@@ -34,14 +53,29 @@ class FSNetwork:
     activatedFS = []  # a list of FSs activated at the current time
     usedFS = []  # a list of FSs used at the current trial
     activation = {}  # dict with {fsID, activation}
-    activationHist = {}
     mismatch = {}
-    mismatchHist = {}
+    history = None  # ring buffers with the last records of activation and mismatch (or None)
+    recorders = []  # objects with record(net, stamp) called by logActivity
     learningFS = []
     prnLg = False
-    reentry = 2
-
-    def __init__(self):
+    reentry = 2  # number of updates per step
+    settleTol = None  # adaptive reentry: updates of a step are repeated until activities change
+    # by at most settleTol and the set of active FSs stays the same (None - reentry updates)
+    maxReentry = 10  # upper bound of the number of updates per step of the adaptive reentry
+    loops = 0  # number of updates of the last step
+    links = None  # sparse store of the links between FSs (FSLinks)
+    engine = None  # optional array-backed engine (FSEngine)
+    domain = None  # FSs of the network in the engine (FSEngine.Domain)
+    hiddenLayer = None  # (key, ids, slots) of the hidden FSs sorted by id in the engine
+    sparseTol = None  # tolerance of the event-driven update of hidden FSs (None - dense update)
+    rng = None  # random generator of the network (numpy RandomState)
+    profile = None  # per-phase profiling stats (FSProfile.PhaseStats) or None
+    flags = None  # sets of active, failed, learning and used FSs (FSFlags.FlagIndex)
+    signatures = None  # hidden and tentative FSs by their experience (FSSignature.SignatureIndex)
+    mergeTentative = False  # createFS reinforces a tentative FS with the same signature
+    usage = None  # capacity and usage of the hidden layer (FSEviction.HiddenUsage) or None
+
+    def __init__(self, histDepth=None, histEvery=1, seed=None, rng=None):
         self.inFS = {}  # a list of input FS
         self.goalFS = {}  # a list of FS for the representation of goals
         self.hiddenFS = {}  # a list of FS for experience storage
@@ -53,6 +87,87 @@ class FSNetwork:
         self.failedFS = []  # list of FSs that failed at the current time
         self.activatedFS = []  # a list of FSs that activated at the current time
         self.matchedFS = []  # a list of FSs that were failed and now have prediction satisfied
+        self.links = FSLinks.LinkStore()
+        self.flags = FSFlags.FlagIndex()
+        self.signatures = FSSignature.SignatureIndex()
+        self.engine = None
+        self.history = FSHistory.HistoryRecorder(histDepth, histEvery) if histDepth else None
+        self.recorders = [self.history] if self.history is not None else []
+        self.rng = rng if rng is not None else np.random.RandomState(seed)
+
+    def useEngine(self, on=True, engine=None, sparseTol=None):
+        """ switches the array-backed engine (FSEngine) for the network update on or off
+        :param on: if True state of all FSs is moved to the engine arrays and the FSs are
+            replaced by their handles (FSEngine.EngineFS), if False back to AtomFS objects
+        :param engine: an engine shared with other networks (a new one by default)
+        :param sparseTol: if not None hidden FSs are updated event-driven with this
+            tolerance (see FSEngine), only FSs with changed inputs are evaluated
+        :return: engine or None
+        """
+
+        self.sparseTol = sparseTol if on else None
+
+        if on and self.engine is None:
+            self.engine = engine or FSEngine.FSEngine(len(self.net))
+            self.domain = self.engine.addDomain(self.links, self.flags)
+            for fs in sorted(self.net.keys()):
+                self.replaceFS(self.engine.bind(self.net[fs], self.domain))
+            self.engine.newEpoch(self.domain, self.flags.epoch)  # slots of stale FSs are reset
+        elif not on and self.engine is not None:
+            for fs in self.net.keys():
+                self.replaceFS(self.engine.release(fs, self.domain))
+            self.engine.domains.remove(self.domain)
+            self.engine.dirty = True
+            self.engine = self.domain = None
+
+        return self.engine
+
+    def setProfiling(self, on=True, callback=None, depth=1000):
+        """ switches per-phase profiling of the network update on or off
+        :param callback: function called with the record of every step
+        :param depth: number of the last per-step records kept
+        :return: FSProfile.PhaseStats or None
+        """
+
+        self.profile = FSProfile.PhaseStats(depth, callback) if on else None
+
+        return self.profile
+
+    def limitHidden(self, capacity, policy='lru'):
+        """ limits the number of hidden FSs, learn evicts FSs beyond the capacity
+        :param capacity: maximal number of hidden FSs (None - unlimited)
+        :param policy: eviction policy, a name in FSEviction.policies ('lru', 'goal',
+            'unmatched') or a function key(usage, ID), the smallest key is evicted first
+        :return: FSEviction.HiddenUsage or None
+        """
+
+        if self.usage:
+            self.recorders.remove(self.usage)
+            self.usage = None
+        if capacity is not None:
+            self.usage = FSEviction.HiddenUsage(capacity, policy)
+            for fs in sorted(self.hiddenFS):  # FSs promoted before count as promoted at 0
+                self.usage.add(fs, 0)
+            self.recorders.append(self.usage)
+
+        return self.usage
+
+    def evict(self):
+        """ removes hidden FSs beyond the capacity chosen by the eviction policy """
+
+        victims = self.usage.victims(self.flags.active)
+        for fs in victims:
+            del self.hiddenFS[fs]
+            self.removeFS(fs)
+            self.activation.pop(fs, None)
+            self.mismatch.pop(fs, None)
+        if victims:
+            evicted = set(victims)
+            for name in ('failedFS', 'activatedFS', 'matchedFS', 'usedFS', 'learningFS'):
+                setattr(self, name, [fs for fs in getattr(self, name) if fs not in evicted])
+            self.usage.evicted += len(victims)
+            if self.profile:
+                self.profile.evicted += len(victims)
 
     def initPredNet(self, nIn, nOut):
         """ creates FS network for the prediction (no goal FS)
@@ -92,72 +207,177 @@ class FSNetwork:
     def updateFSInputs(self, fs):
         """updates input values of the given FS"""
 
+        # flags are read from the index: FSs not refreshed since a reset are not active there
+        active, used = self.flags.active, self.flags.used
         self.net[fs].problemState = {k: self.net[k].oldActivity
                                      for k in self.net[fs].problemWeights.iterkeys()
-                                     if not self.net[k].wasUsed and self.net[k].isActive}
+                                     if k in active and k not in used}
         self.net[fs].goalState = {k: self.net[k].oldActivity
                                   for k in self.net[fs].goalWeights.iterkeys()
-                                  if not self.net[k].wasUsed and self.net[k].isActive}
+                                  if k in active and k not in used}
         self.net[fs].lateralState = {k: self.net[k].oldActivity
                                      for k in self.net[fs].lateralWeights.iterkeys()
-                                     if not self.net[k].wasUsed and self.net[k].isActive}
+                                     if k in active and k not in used}
         self.net[fs].controlState = {k: self.net[k].oldActivity
                                      for k in self.net[fs].controlWeights.iterkeys()
-                                     if not self.net[k].wasUsed and self.net[k].isActive}
+                                     if k in active and k not in used}
 
     def update(self, time, inputStates, t):
         """feedforward update of the network given values of activations for input elements"""
 
+        prof = self.profile
         self.activation = {}  # dict with {fsID, activation}
         self.mismatch = {}
+        if self.engine:
+            self.engine.refresh()  # slots reset since the last update
 
         # activate elements (FSs) corresponding to the inputs with input values
         self.activateFS(inputStates)
-
-        # updating goal FSs
-        for fs in self.goalFS.values():
-            self.updateFSInputs(fs.ID)
-            self.activation[fs.ID], self.mismatch[fs.ID] = fs.update(time)
-            fs.wasUsed = False
-
-        # updating hidden FSs
-        fs_s = sorted(self.hiddenFS.keys())
-        for fs in fs_s:
-            # updating FS inputs
-            self.updateFSInputs(fs)
-            self.activation[fs], self.mismatch[fs] = self.hiddenFS[fs].update(time)
+        if prof:
+            prof.lap('input')
+            prof.evaluated += len(self.goalFS) + len(self.hiddenFS) + len(self.outFS)
+
+        if self.engine:
+            self.engine.syncLinks()
+            # updating goal FSs
+            self.updateLayer(self.goalFS.keys(), time, True)
+            if prof:
+                prof.lap('goal')
+            # updating hidden FSs
+            ids, slots = self.hiddenSlots()
+            self.updateLayer(ids, time, tol=self.sparseTol, slots=slots)
+            if prof and self.sparseTol is not None:
+                prof.evaluated -= len(self.hiddenFS) - self.engine.evaluated
+        else:
+            # updating goal FSs
+            rnd = self.noise(len(self.goalFS)).tolist()
+            for fs, r in zip(self.goalFS.values(), rnd):
+                self.updateFSInputs(fs.ID)
+                self.activation[fs.ID], self.mismatch[fs.ID] = fs.update(time, r)
+                fs.wasUsed = False
+            if prof:
+                prof.lap('goal')
+
+            # updating hidden FSs
+            fs_s = sorted(self.hiddenFS.keys())
+            rnd = self.noise(len(fs_s)).tolist()
+            for fs, r in zip(fs_s, rnd):
+                # updating FS inputs
+                self.updateFSInputs(fs)
+                self.activation[fs], self.mismatch[fs] = self.hiddenFS[fs].update(time, r)
+        if prof:
+            prof.lap('hidden')
 
         # updating action FSs
         self.updOut(time)
+        if prof:
+            prof.lap('updOut')
+
+        self.endUpdate(time, t)
+
+    def endUpdate(self, time, t):
+        """re-checks goals, keeps activities for the next loop and logs activity"""
 
         # re-checking goal FSs
         for fs in self.goalFS.values():
             if fs.mismatch >= fs.pr_threshold:
                 self.resetUsedFS(fs)
 
-        for fs in self.goalFS.values():
-            fs.oldActivity = fs.activity
-        for fs in self.hiddenFS.values():
-            fs.oldActivity = fs.activity
+        if self.engine:
+            slots = np.concatenate((self.domain.slotsOf(self.goalFS.keys()), self.hiddenSlots()[1]))
+            self.engine.oldActivity[slots] = self.engine.activity[slots]
+        else:
+            for fs in self.goalFS.values():
+                fs.oldActivity = fs.activity
+            for fs in self.hiddenFS.values():
+                fs.oldActivity = fs.activity
+        if self.profile:
+            self.profile.lap('endUpdate')
 
         self.logActivity(time, t)
+        if self.profile:
+            self.profile.lap('logActivity')
+
+    def updateLayer(self, ids, time, clearUsed=False, tol=None, slots=None):
+        """updates listed FSs at once with the array engine
+        :param ids: FS ids in the order of update
+        :param clearUsed: if True wasUsed flag of FSs is reset after the update
+        :param tol: tolerance of the event-driven update (None - all FSs are evaluated)
+        :param slots: engine slots of the FSs (looked up by default)
+        """
+
+        if slots is None:
+            slots = self.domain.slotsOf(ids)
+        activation, mismatch = self.engine.updateLayer(slots, time, clearUsed,
+                                                       self.noise(len(ids)), tol)
+        self.activation.update(zip(ids, activation.tolist()))
+        self.mismatch.update(zip(ids, mismatch.tolist()))
+
+    def hiddenSlots(self):
+        """returns ids of hidden FSs sorted and their engine slots, kept until FSs
+        are bound or released or the number of hidden FSs changes"""
+
+        key = (self.domain, self.domain.version, len(self.hiddenFS))
+        if self.hiddenLayer is None or self.hiddenLayer[0] != key:
+            ids = sorted(self.hiddenFS.keys())
+            self.hiddenLayer = (key, ids, self.domain.slotsOf(ids))
+
+        return self.hiddenLayer[1:]
 
+    def noise(self, n):
+        """returns n uniform random values for the noise of a layer of FSs (one draw per layer)"""
+        return self.rng.random_sample(n)
 
     def step(self, time, inputStates):
 
+        prof = self.profile
+        if prof:
+            prof.startStep()
         self.updateWorkingMemory(time)
         self.matchedFS = []
+        if prof:
+            prof.lap('updateWorkingMemory')
+
+        if self.settleTol is None:
+            for t in range(self.reentry):
+                self.update(time, inputStates, t)
+                if self.prnLg:
+                    print '----- loop:', t
+                    self.printLog()
+            self.loops = self.reentry
+        else:
+            self.loops = self.settle(time, inputStates)
+
+        self.learn(time)
+        if prof:
+            prof.lap('learn')
+            prof.endStep(self, time)
+
+        return self.activation
+
+
+    def settle(self, time, inputStates):
+        """ repeats update until the activity of the network converges (adaptive reentry)
+        :return: number of updates done (at most maxReentry)
+        """
 
-        for t in range(self.reentry):
+        for t in range(self.maxReentry):
+            before = self.activation
+            wasActive = set(self.flags.active)
             self.update(time, inputStates, t)
             if self.prnLg:
                 print '----- loop:', t
                 self.printLog()
+            change = [abs(a - before.get(fs, 0.)) for fs, a in self.activation.iteritems()]
+            if self.flags.active == wasActive and max(change or [0.]) <= self.settleTol:
+                return t + 1
 
-        self.learn(time)
-
-        return self.activation
+        return self.maxReentry
 
+    def loopsPerStep(self):
+        """ returns the largest number of updates per step (time stamps of updates are
+        time + t / loopsPerStep, see logActivity) """
+        return self.reentry if self.settleTol is None else self.maxReentry
 
     def learn(self, time):
         """ modifies network structure to save new experience
@@ -166,13 +386,12 @@ class FSNetwork:
 
         activeHiddenFS = []
         activeHiddenUsedFS = []
-        for fs in self.hiddenFS.values():
-            if fs.isActive:
-                if fs.wasUsed:
-                    activeHiddenUsedFS.append(fs)
+        for fs in sorted(self.flags.active):  # only active FSs are visited
+            if fs in self.hiddenFS:
+                if fs in self.flags.used:
+                    activeHiddenUsedFS.append(self.hiddenFS[fs])
                 else:
-                    activeHiddenFS.append(fs)
-        # set(self.activatedFS).intersection(self.hiddenFS.keys())
+                    activeHiddenFS.append(self.hiddenFS[fs])
 
         # checking if existing tentative FSs were effective
         for fs in self.memoryTrace.values():
@@ -191,6 +410,9 @@ class FSNetwork:
                 self.hiddenFS[fs.ID] = fs
                 # self.net[fs.ID] = fs
                 del self.memoryTrace[fs.ID]
+                self.signatures.add(fs.ID, self.signatureOf(fs))
+                if self.usage:
+                    self.usage.add(fs.ID, time)
 
                 print "fs:", fs.ID, "is activated!  <<<<< <<< <<  <  <"
                 print "fs.prob:", fs.problemValues
@@ -198,6 +420,9 @@ class FSNetwork:
                 print "fs.ctrl:", fs.controlWeights
                 print "fs.lat:", fs.lateralWeights
 
+        if self.usage:
+            self.evict()
+
         # generating tentative FSs for unexpected outcomes
         if len(activeHiddenFS) == 0:
             newFS = self.createFS(time)
@@ -214,28 +439,37 @@ class FSNetwork:
 
     def createFS(self, time):
 
+        active = self.flags.active  # flags are read from the index (cheaper for FS handles)
+        problem = dict((ID, fs.activity) for ID, fs in self.inFS.iteritems() if ID in active)
+        signature = self.signatures.signature(problem, {}, [ID for ID in self.outFS if ID in active])
+        if self.mergeTentative:
+            for ID in sorted(self.signatures.find(signature)):
+                if ID in self.memoryTrace:
+                    return self.reinforce(self.memoryTrace[ID], time)
+
         newFS = self.add(FS.AtomFS())
         newFS.startTime = time
+        self.signatures.add(newFS.ID, signature)
 
         # adding links to recognize current state of environment
-        for fs in self.inFS.values():
-            if fs.isActive:
-                newFS.problemValues[fs.ID] = fs.activity
-                newFS.problemWeights[fs.ID] = 1
+        for ID in self.inFS:
+            if ID in active:
+                newFS.problemValues[ID] = problem[ID]
+                newFS.problemWeights[ID] = 1
 
         # adding links to lateral FS
-        for fs in self.hiddenFS.values():
-            if fs.isActive and fs.wasUsed:
-                fs.lateralWeights[newFS.ID] = -1
-                newFS.lateralWeights[fs.ID] = -1
+        for fs in sorted(self.flags.active & self.flags.used):
+            if fs in self.hiddenFS:
+                self.hiddenFS[fs].lateralWeights[newFS.ID] = -1
+                newFS.lateralWeights[fs] = -1
 
         # adding links to actions
-        for fs in self.outFS.values():
-            if fs.isActive:
+        for ID, fs in self.outFS.iteritems():
+            if ID in active:
                 fs.controlWeights[newFS.ID] = 2
 
-        for gFS in self.goalFS.values():
-            if gFS.isActive or gFS.failed:
+        for ID, gFS in self.goalFS.iteritems():
+            if ID in active or ID in self.flags.failed:
                 newFS.goalID.append(gFS.ID)
                 newFS.controlWeights[gFS.ID] = 1
                 gFS.controlWeights[newFS.ID] = -1
@@ -247,6 +481,47 @@ class FSNetwork:
 
         return newFS
 
+    def reinforce(self, tentFS, time):
+        """restarts the memory trace of the tentative FS found by createFS and links it
+        to the current lateral context and goals instead of creating a duplicate"""
+
+        tentFS.startTime = time
+        for fs in sorted(self.flags.active & self.flags.used):
+            if fs in self.hiddenFS:
+                self.hiddenFS[fs].lateralWeights[tentFS.ID] = -1
+                tentFS.lateralWeights[fs] = -1
+        for gFS in self.goalFS.values():
+            if (gFS.isActive or gFS.failed) and gFS.ID not in tentFS.goalID:
+                tentFS.goalID.append(gFS.ID)
+                tentFS.controlWeights[gFS.ID] = 1
+                gFS.controlWeights[tentFS.ID] = -1
+        if self.profile:
+            self.profile.merged += 1
+
+        return tentFS
+
+    def signatureOf(self, fs):
+        """returns the key of the FS in the signature index"""
+
+        outputs = [ID for ID in self.links['control'].targets(fs.ID) if ID in self.outFS]
+
+        return self.signatures.signature(fs.problemValues, fs.goalValues, outputs)
+
+    def findFS(self, problem, goal, outputs):
+        """returns ids of hidden and tentative FSs storing the experience
+        :param problem: {input FS id: value} of the initial state
+        :param goal: {input FS id: value} of the achieved state ({} for tentative FSs)
+        :param outputs: ids of the output FSs activated
+        """
+        return self.signatures.find(self.signatures.signature(problem, goal, outputs))
+
+    def indexSignatures(self):
+        """rebuilds the signature index of hidden and tentative FSs"""
+
+        self.signatures = FSSignature.SignatureIndex(self.signatures.quantum)
+        for fs in self.hiddenFS.values() + self.memoryTrace.values():
+            self.signatures.add(fs.ID, self.signatureOf(fs))
+
     def updateWorkingMemory(self, time):
 
         for fs in self.memoryTrace.values():
@@ -257,22 +532,31 @@ class FSNetwork:
                 self.removeFS(fs.ID)
 
     def updOut(self, time):
+        if self.engine:
+            self.updateLayer(self.outFS.keys(), time, True)
+        else:
+            rnd = self.noise(len(self.outFS)).tolist()
+            for fs, r in zip(self.outFS.values(), rnd):
+                self.updateFSInputs(fs.ID)
+                self.activation[fs.ID], self.mismatch[fs.ID] = fs.update(time, r)
+                fs.wasUsed = False
+        self.selectOut()
+
+    def selectOut(self):
+        """leaves only the most active output FS active or activates one at random"""
         noActiveOut = True
         maxOut = (0, 0)
         for fs in self.outFS.values():
-            self.updateFSInputs(fs.ID)
-            self.activation[fs.ID], self.mismatch[fs.ID] = fs.update(time)
-            fs.wasUsed = False
             if fs.activity > maxOut[1]:
                 maxOut = (fs.ID, fs.activity)
                 if fs.isActive:
                     noActiveOut = False
         if noActiveOut:
             if maxOut[1] == 0:
-                fs = random.sample(self.outFS.keys(), 1)
-                self.outFS[fs[0]].isActive = True
+                fs = self.outFS.keys()
+                self.outFS[fs[self.rng.randint(len(fs))]].isActive = True
             else:
-                self.outFS[probSel(self.outFS.values())].isActive = True
+                self.outFS[probSel(self.outFS.values(), self.rng)].isActive = True
         else:
             for fs in self.outFS.values():
                 if fs.isActive and fs.ID != maxOut[0]:
@@ -285,6 +569,8 @@ class FSNetwork:
         for fs_id in gFS.controlWeights.keys():
             if gFS.controlWeights[fs_id] == -1 and self.net[fs_id].wasUsed:
                 self.net[fs_id].wasUsed = False
+                if self.usage:
+                    self.usage.contributed(fs_id)
                 #  print '# # # reset activity for FS:', fs_id
 
     def activateFS(self, values):
@@ -294,20 +580,36 @@ class FSNetwork:
             fs.wasUsed = False
 
     def resetActivity(self):
-        """resets activity for all FS in the net"""
-        for fs in self.net.keys():
-            self.net[fs].resetActivity()
+        """resets activity for all FS in the net
+
+        A new epoch of the flag index clears the active, failed and used flags. With the
+        engine the reset of the state is lazy: slots of the earlier epoch are reset at once
+        by the next update or read of a handle (FSEngine.refresh), so only tentative FSs are
+        visited. FS objects are reset here (applyReset), their attributes are read directly.
+        """
+        self.flags.newEpoch()
+        if self.engine:
+            self.engine.newEpoch(self.domain, self.flags.epoch)
+        else:
+            self.applyReset()
         self.failedFS = []  # list of FSs that failed at the current time
         self.activatedFS = []  # a list of FSs that activated at the current time
-
-        for fs in self.usedFS:
-            self.net[fs].wasUsed = False
         self.usedFS = []
 
         for fs in self.memoryTrace.values():
             del self.memoryTrace[fs.ID]
             self.removeFS(fs.ID)
 
+    def applyReset(self):
+        """resets state of the FSs not updated since the last resetActivity (reads of FSs
+        apply it as well, see resetActivity)"""
+
+        if self.engine:
+            self.engine.refresh()
+        else:
+            for fs in self.net.itervalues():
+                fs.refresh()
+
     def setOutFS(self, fs_list):
         """marks listed FSs as outputs"""
         for outFS in range(len(fs_list)):
@@ -322,44 +624,71 @@ class FSNetwork:
                 print 'failed weight', inFS, '->', fs
 
     def add(self, fs):
-        """adds FS to the network"""
+        """adds FS to the network, returns it (its handle if the engine is on)"""
 
         fs.ID = self.idCounter
         self.net[fs.ID] = fs
         self.idCounter += 1
+        self.links.attach(fs)
+        fs.flagIndex = self.flags
+        fs.epoch = self.flags.epoch
+        self.flags.add(fs)
+        if self.engine:  # the handle of the FS in the engine takes its place
+            fs = self.engine.bind(fs, self.domain)
+            self.net[fs.ID] = fs
+        if self.profile:
+            self.profile.created += 1
 
         return fs
 
+    def replaceFS(self, fs):
+        """puts fs in place of the FS with the same id in the network and its layers
+        (a FS bound to the engine is replaced by its handle, see FSEngine.bind)"""
+
+        for layer in (self.net, self.inFS, self.goalFS, self.hiddenFS, self.outFS, self.memoryTrace):
+            if fs.ID in layer:
+                layer[fs.ID] = fs
+
     def duplicate(self, ID, outLnkDup=False):  # outLnkDup is optional parameter
         """duplicates FS and returns offspring"""
+        self.net[ID].refresh()  # the state of the last epoch is not copied
         offspring = deepcopy(self.net[ID])
         offspring.parentID = ID
-        self.add(offspring)
-        if outLnkDup:
-            for fs in self.net.keys():
-                if ID in self.net[fs].problemWeights.keys():
+        offspring = self.add(offspring)
+        if outLnkDup:  # only FSs with links from ID are visited (reverse index)
+            for fs in self.links['problem'].targets(ID):
+                if ID in self.net[fs].problemWeights:
                     self.net[fs].problemWeights[offspring.ID] = \
                         self.net[fs].problemWeights[ID]
-                if ID in self.net[fs].lateralWeights.keys():
-                    self.net[fs].lateralWeights[offspring.ID] = \
-                        self.net[fs].lateralWeights[ID]
-                    # if ID in self.net[fs].goalWeights.keys():
-                    # self.net[fs].goalWeights[offspring.ID] = \
-                    # self.net[fs].goalWeights[ID]
+                if ID in self.net[fs].problemValues:
+                    self.net[fs].problemValues[offspring.ID] = \
+                        self.net[fs].problemValues[ID]
+            for fs in self.links['lateral'].targets(ID):
+                self.net[fs].lateralWeights[offspring.ID] = \
+                    self.net[fs].lateralWeights[ID]
+                # if ID in self.net[fs].goalWeights.keys():
+                # self.net[fs].goalWeights[offspring.ID] = \
+                # self.net[fs].goalWeights[ID]
         return offspring
 
     def removeFS(self, ID):
         """removes FS from the network with cleaning up all outgoing links"""
+        if self.profile:
+            self.profile.removed += 1
+        fs = self.engine.release(ID, self.domain, False) if self.engine else self.net[ID]
+        self.links.detach(fs)
+        fs.flagIndex = None
+        self.flags.discard(ID)
+        self.signatures.discard(ID)
+        if self.usage:
+            self.usage.discard(ID)
         del self.net[ID]
-        for fs in self.net.keys():
-            if ID in self.net[fs].problemWeights.keys():
-                del self.net[fs].problemWeights[ID]
-            if ID in self.net[fs].lateralWeights.keys():
-                del self.net[fs].lateralWeights[ID]
-            if ID in self.net[fs].goalWeights.keys():
-                del self.net[fs].goalWeights[ID]
-            if ID in self.net[fs].controlWeights.keys():
-                del self.net[fs].controlWeights[ID]
+        # only FSs with links from ID are visited (reverse index of the link store)
+        for kind, (weights, values) in FSLinks.linkTypes.iteritems():
+            for fs in self.links[kind].targets(ID):
+                getattr(self.net[fs], weights).pop(ID, None)
+                if values:
+                    getattr(self.net[fs], values).pop(ID, None)
 
     def addActionLinks(self, links):
         """creates links between FSs. Input format [[start, end, weight]]"""
@@ -387,36 +716,24 @@ class FSNetwork:
 
     def logActivity(self, time, t):
 
-        self.activatedFS = []
-        wasFailed = self.failedFS[:]
-        self.failedFS = []
-        self.learningFS = []
-
-        for inFS in self.inFS.keys():
-            if self.net[inFS].isActive:  # if FS is active
-                self.activatedFS.append(self.net[inFS].ID)
-
-        for fs in (set(self.net.keys()) - set(self.inFS.keys())):
-
-            # if FS has failed to reach predicted state
-            if self.net[fs].failed and not self.net[fs].isLearning:
-                self.failedFS.append(self.net[fs].ID)  # add FS to the failers list
-                if self.net[fs].ID in wasFailed:
-                    wasFailed.remove(self.net[fs].ID)
-
-            # if FS is active
-            if self.net[fs].isActive:
-                self.activatedFS.append(self.net[fs].ID)
-            if self.net[fs].isLearning:
-                self.learningFS.append(fs)
+        # lists are read from the flag sets, which are kept up to date by FSs
+        flags = self.flags
+        wasFailed = self.failedFS
+        self.activatedFS = sorted(flags.active)
+        # FSs which failed to reach predicted state
+        self.failedFS = sorted(fs for fs in flags.failed
+                               if fs not in flags.learning and fs not in self.inFS)
+        self.learningFS = sorted(fs for fs in flags.learning if fs not in self.inFS)
 
+        failed = set(self.failedFS)
         for fs in wasFailed:
-            self.matchedFS.append(fs)
+            if fs not in failed:
+                self.matchedFS.append(fs)
 
-        self.usedFS = [fs.ID for fs in self.net.values() if fs.wasUsed]
+        self.usedFS = sorted(flags.used)
 
-        self.activationHist[(time+float(t)/float(self.reentry))] = self.activation
-        self.mismatchHist[(time+float(t)/float(self.reentry))] = self.mismatch
+        for recorder in self.recorders:
+            recorder.record(self, time + float(t) / float(self.loopsPerStep()))
 
         # end of logActivity
 
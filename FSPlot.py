@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Lazy access to the plotting libraries
+
+The core of the library (AtomFS, FSNpy, FSEngine, ...) depends on NumPy
+only. Scripts take plt (matplotlib.pyplot) and viz (VizFSN) from here:
+they are imported on the first use, so a run that does not plot never
+loads matplotlib and networkx. Without a display (e.g. on cluster workers)
+pyplot is switched to the Agg backend and figures can only be saved.
+
+    from FSPlot import plt, viz
+
+Created on Sun Oct 18 18:09:10 2026
+"""
+
+import os
+import sys
+
+_modules = {}
+
+
+def headless():
+    """Checks if there is no display to open windows on"""
+
+    if os.environ.get('MPLBACKEND'):
+        return False  # the backend is chosen by the user
+    return sys.platform.startswith('linux') and \
+        not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def pyplot():
+    """Returns matplotlib.pyplot (with the Agg backend if there is no display)"""
+
+    if 'pyplot' not in _modules:
+        import matplotlib
+        if headless() and 'matplotlib.pyplot' not in sys.modules:
+            matplotlib.use('Agg')
+        import matplotlib.pyplot
+        _modules['pyplot'] = matplotlib.pyplot
+
+    return _modules['pyplot']
+
+
+def vizFSN():
+    """Returns VizFSN module"""
+
+    if 'viz' not in _modules:
+        import VizFSN
+        _modules['viz'] = VizFSN
+
+    return _modules['viz']
+
+
+class Lazy(object):
+    """Module proxy which imports the module on the first attribute access"""
+
+    def __init__(self, load):
+        self._load = load
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
+plt = Lazy(pyplot)
+viz = Lazy(vizFSN)
+
+# end of FSPlot
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Index of FSs by the signature of the experience they store
+
+The signature of an FS is (problemValues, goalValues, controlled outputs)
+with the values quantized to the quantum, so FSs storing the same
+problem -> goal transition under the same action share a key and are
+found with one dict lookup. FSNetwork indexes FSs of the hidden layer and
+of the memory trace; createFS uses the index to reinforce an existing
+tentative FS instead of creating its duplicate (FSNetwork.mergeTentative).
+
+Created on Sun Oct 18 18:08:15 2026
+"""
+
+
+class SignatureIndex(object):
+    """{signature: set of FS ids} with the reverse {FS id: signature}
+
+    :param quantum: resolution of the values in the signature
+    """
+
+    def __init__(self, quantum=0.01):
+        self.quantum = quantum
+        self.ids = {}
+        self.signatureOf = {}
+
+    def __len__(self):
+        return len(self.signatureOf)
+
+    def quantize(self, values):
+        """Returns sorted tuple of (FS id, quantized value) of the {FS id: value} dict"""
+        return tuple(sorted((ID, int(round(v / self.quantum))) for ID, v in values.iteritems()))
+
+    def signature(self, problem, goal, outputs):
+        """Returns the key of the problem and goal values ({FS id: value}) and output ids"""
+        return self.quantize(problem), self.quantize(goal), tuple(sorted(outputs))
+
+    def add(self, ID, signature):
+        """Registers (or moves) the FS under the signature"""
+
+        self.discard(ID)
+        self.ids.setdefault(signature, set()).add(ID)
+        self.signatureOf[ID] = signature
+
+    def discard(self, ID):
+        """Forgets the FS"""
+
+        signature = self.signatureOf.pop(ID, None)
+        if signature is not None:
+            ids = self.ids[signature]
+            ids.discard(ID)
+            if not ids:
+                del self.ids[signature]
+
+    def find(self, signature):
+        """Returns ids of FSs with the signature"""
+        return self.ids.get(signature, set())
+
+    def duplicates(self):
+        """Returns lists of ids of FSs sharing a signature"""
+        return [sorted(ids) for ids in self.ids.itervalues() if len(ids) > 1]
+
+# end of FSSignature
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""On-disk traces of the activity of a Functional Systems Network
+
+TraceWriter streams records (activation, mismatch, isActive, failed of
+every updated FS) into a directory of .npy chunks. Every chunk has its own
+map of columns to FS ids, because FSs are created and removed during a
+run. TraceReader opens chunks as memory maps, so a time slice of a long
+run is read without loading the whole trace.
+
+Layout of the trace directory:
+    meta.json                 - fields and list of chunks
+    times_NNNNN.npy           - time stamps of the records of the chunk
+    ids_NNNNN.npy             - FS id of every column of the chunk
+    <field>_NNNNN.npy         - records x columns matrix of the field
+
+Created on Sun Oct 18 17:46:05 2026
+"""
+
+import os
+import json
+import numpy as np
+
+fieldTypes = {'activation': float, 'mismatch': float, 'isActive': bool, 'failed': bool}
+
+
+class TraceWriter(object):
+    """Writes records of FS activity to chunked .npy files
+
+    :param path: directory of the trace (created if needed)
+    :param chunkSize: number of records per chunk
+    :param fields: recorded fields, see fieldTypes
+    """
+
+    def __init__(self, path, chunkSize=4096, fields=('activation', 'mismatch', 'isActive', 'failed')):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self.chunkSize = chunkSize
+        self.fields = fields
+        self.chunks = []  # [{'n': records, 'start': time, 'end': time}]
+        self.closed = False
+        self.newChunk()
+
+    def newChunk(self):
+        """Starts buffering of the next chunk"""
+
+        self.rows = 0
+        self.width = 0
+        self.columns = {}  # {FSID: column}
+        self.ids = []
+        self.times = np.zeros(self.chunkSize)
+        self.buffers = {}
+        self.resize(64)
+
+    def resize(self, width):
+        """Extends chunk buffers to width columns"""
+
+        for field in self.fields:
+            if fieldTypes[field] is bool:
+                buf = np.zeros((self.chunkSize, width), dtype=bool)
+            else:
+                buf = np.empty((self.chunkSize, width))
+                buf.fill(np.nan)
+            if field in self.buffers:
+                buf[:, :self.width] = self.buffers[field]
+            self.buffers[field] = buf
+        self.width = width
+
+    def record(self, net, stamp):
+        """Appends activity of FSs of the network at the time stamp"""
+
+        ids = net.activation.keys()
+        for ID in ids:
+            if ID not in self.columns:
+                self.columns[ID] = len(self.ids)
+                self.ids.append(ID)
+        if len(self.ids) > self.width:
+            self.resize(max(len(self.ids), 2 * self.width))
+        cols = np.fromiter((self.columns[ID] for ID in ids), dtype=int, count=len(ids))
+
+        row = self.rows
+        self.times[row] = stamp
+        for field in self.fields:
+            if field == 'activation':
+                values = [net.activation[ID] for ID in ids]
+            elif field == 'mismatch':
+                values = [net.mismatch.get(ID, np.nan) for ID in ids]
+            elif net.engine:  # flags are read from the engine arrays
+                values = getattr(net.engine, field)[net.domain.slotOf[ids]]
+            else:
+                values = [getattr(net.net[ID], field) for ID in ids]
+            self.buffers[field][row, cols] = values
+        self.rows += 1
+        if self.rows == self.chunkSize:
+            self.flush()
+
+    def flush(self):
+        """Writes buffered records as a chunk"""
+
+        if self.rows == 0:
+            return
+        n = len(self.chunks)
+        np.save(self.fileName('times', n), self.times[:self.rows])
+        np.save(self.fileName('ids', n), np.array(self.ids, dtype=int))
+        for field in self.fields:
+            np.save(self.fileName(field, n), self.buffers[field][:self.rows, :len(self.ids)])
+        self.chunks.append({'n': self.rows, 'start': self.times[0],
+                            'end': self.times[self.rows - 1]})
+        self.writeMeta()
+        self.newChunk()
+
+    def fileName(self, name, n):
+        return os.path.join(self.path, '%s_%05d.npy' % (name, n))
+
+    def writeMeta(self):
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'fields': list(self.fields), 'chunks': self.chunks}, f)
+        os.rename(tmp, os.path.join(self.path, 'meta.json'))
+
+    def close(self):
+        """Writes the last (incomplete) chunk"""
+
+        if not self.closed:
+            self.flush()
+            self.writeMeta()
+            self.closed = True
+
+
+class TraceReader(object):
+    """Lazy reader of a trace written by TraceWriter"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.fields = meta['fields']
+        self.chunks = meta['chunks']
+        self.offsets = np.cumsum([0] + [chunk['n'] for chunk in self.chunks])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def load(self, name, n):
+        """Opens an array of the chunk as a memory map"""
+        return np.load(os.path.join(self.path, '%s_%05d.npy' % (name, n)), mmap_mode='r')
+
+    def times(self):
+        """Returns time stamps of all records"""
+
+        if not self.chunks:
+            return np.zeros(0)
+        return np.concatenate([self.load('times', n) for n in range(len(self.chunks))])
+
+    def slice(self, start=None, end=None, field='activation', fill=None):
+        """Returns records with start <= time < end (None means unbounded)
+        :return: (times, ids, matrix) - time stamps, sorted FS ids, matrix time x FS
+        """
+
+        parts = []
+        for n, chunk in enumerate(self.chunks):
+            if (end is not None and chunk['start'] >= end) or \
+                    (start is not None and chunk['end'] < start):
+                continue  # the chunk is not opened at all
+            times = self.load('times', n)
+            sel = np.ones(len(times), dtype=bool)
+            if start is not None:
+                sel &= times >= start
+            if end is not None:
+                sel &= times < end
+            rows = np.nonzero(sel)[0]
+            if len(rows):
+                parts.append((times[rows], self.load('ids', n), self.load(field, n), rows))
+
+        ids = sorted(set(ID for p in parts for ID in p[1].tolist()))
+        column = dict((ID, col) for col, ID in enumerate(ids))
+        nRows = sum(len(p[3]) for p in parts)
+        boolean = fieldTypes.get(field) is bool
+        data = np.zeros((nRows, len(ids)), dtype=bool) if boolean else np.empty((nRows, len(ids)))
+        if not boolean:
+            data.fill(np.nan if fill is None else fill)
+        row = 0
+        for times, chunkIds, values, rows in parts:
+            cols = np.array([column[ID] for ID in chunkIds.tolist()], dtype=int)
+            block = np.asarray(values[rows[0]:rows[-1] + 1])[rows - rows[0]]
+            if fill is not None and not boolean:
+                block = np.where(np.isnan(block), fill, block)
+            data[row:row + len(rows)][:, cols] = block
+            row += len(rows)
+        times = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0)
+
+        return times, ids, data
+
+# end of FSTrace
@@ -8,9 +8,9 @@ Created on Wed Sep 11 09:01:40 2013
 """
 import FSNpy as FSN
 import AtomFS as fs
-import matplotlib.pyplot as plt
-import scipy as np
-import VizFSN as viz
+import FSEnv
+import numpy as np
+from FSPlot import plt, viz
 # import operator
 
 """inputs for binary string associated with a hypercube nodes
@@ -24,11 +24,6 @@ import VizFSN as viz
 """
 
 
-def st2Ind(st):
-    """Converts list of bits to the decimal index"""
-    return int(''.join(map(str, st)), 2)
-
-
 def inputMap(state=[]):
     """converts binary description of the current state into activations
        of the input layer"""
@@ -46,52 +41,27 @@ def inputMap(state=[]):
     return dict(zip(range(2 * dim), inputs))
 
 
-def outputMap(state, outFSActivity, trans):  # TODO
-    """calculates change of the environmental state caused by activities of FSs """
+def outputMap(state, rng):
+    """calculates change of the environmental state (int, see FSEnv) caused by activities
+    of FSs"""
 
-    winFS = []
-    # for fs in FSNet.net.keys():
-    # if FSNet.net[fs].isActive and (fs in range(2*dim,4*dim)):
-    #            winFS.append(fs)
-    for out in range(len(outFSActivity)):
-        if FSNet.net[outFSActivity[out][1]].isActive:
-            winFS.append(outFSActivity[out][1])
-            #outFSActivity[out] = (0,outFSActivity[out][1])
     # the state is changed if there is at least one active action
-    if (len(winFS) > 0):
-        newState = state[:]
-        #        if (max(outFSActivity)[0]>0):
-        wFS = winFS[int(np.rand() * len(winFS))]
-        newState[wFS % dim] = int(wFS / dim) - 2
-        if trans[st2Ind(state)][st2Ind(newState)]:
-            state = newState[:]
-        print 'act:', wFS, ' ->', state
+    winFS = [fs for fs in range(2 * dim, 4 * dim) if FSNet.net[fs].isActive]
+    if len(winFS) > 0:
+        wFS = winFS[int(rng.random_sample() * len(winFS))]
+        # outputs of the network start at 2 * dim, actions of FSEnv at dim
+        state = int(env.step([state], [wFS - dim])[0])
+        print 'act:', wFS, ' ->', FSEnv.ind2St(state, dim)
     return state
 
 
-def setTransitions(dim):
-    """ setting transitions in the state space """
-    space_size = np.power(2, dim)
-    transition = np.ndarray(shape=(space_size, space_size), dtype=bool)
-    transition.fill(False)
-    state1 = [0 for i in range(dim)]
-    state2 = state1[:]
-    for i in range(dim):
-        state2[i] = 1
-        transition[st2Ind(state1)][st2Ind(state2)] = True  # forward transition
-        transition[st2Ind(state2)][st2Ind(state1)] = True  # backward transition
-        state1 = state2[:]
-    for i in range(space_size):
-        for j in range(space_size):
-            if transition[i][j]:
-                print str(bin(i))[2:], '->', str(bin(j))[2:]
-    return transition
-
-
 dim = 2  # a dimension of a hypercube
-drawFSNet = True  # draw FSNet for every FS addition
-stateTr = setTransitions(dim)
-FSNet = FSN.FSNetwork()
+drawFSNet = True  # show FSNet during the run (live viewer, updated in place)
+seed = None  # seed of the run, seeds of the network and of the environment are derived from it (None for a random one)
+netSeed, envSeed = np.random.RandomState(seed).randint(2 ** 31 - 1, size=2)
+envRng = np.random.RandomState(envSeed)  # choice of the action and restarts of the environment
+env = FSEnv.HypercubeEnv(dim, 'line', False)  # single path 000...000 -> 111...111
+FSNet = FSN.FSNetwork(seed=netSeed)
 # create initial FSs: inputs + effectors + interFS + goalFS
 for i in range(2 * dim + 2 * dim + 2 * dim + 1):
     FSNet.add(fs.AtomFS())
@@ -126,15 +96,22 @@ for i in range(dim):  # create links of the initial network
             FSNet.addLateralLinks([[i + 3 * dim, (j - 2 * dim), (cInh * 1. / (1 * dim))]])
 
 FSNet.setOutFS([i for i in range(2 * dim, 4 * dim)])
-
-start = [0 for i in range(dim)]  # start state
-goal = [1 for i in range(dim)]  # goal state
+# layers of the network: inputs, effectors (outputs), interFS (hidden) and the goal FS
+for i in range(2 * dim):
+    FSNet.net[i].isInput = True
+FSNet.inFS = dict((i, FSNet.net[i]) for i in range(2 * dim))
+FSNet.outFS = dict((i, FSNet.net[i]) for i in range(2 * dim, 4 * dim))
+FSNet.hiddenFS = dict((i, FSNet.net[i]) for i in range(4 * dim, 6 * dim))
+FSNet.goalFS = {6 * dim: FSNet.net[6 * dim]}
+
+start = env.start  # start state
+goal = env.goal  # goal state
 # -------------------------
 convergenceLoops = 5  # a number of FS network updates per world's state update
 period = 50  # a period of simulation
 # ------------------------
-# FSNet.drawNet()
-currState = start[:]
+viewer = viz.LiveViewer(FSNet, fps=2.) if drawFSNet else None
+currState = start
 data = []
 goalFS = []
 goalsReached = 0
@@ -143,12 +120,10 @@ NFSDyn = []
 
 # FSNet.activateFS(dict(zip(range(2*dim),inputMap(currState))))
 for t in range(period):
-    output = FSNet.update(t, inputMap(currState))
-    oldState = currState[:]
+    FSNet.update(t, inputMap(FSEnv.ind2St(currState, dim)), t % convergenceLoops)
+    oldState = currState
     if (t % convergenceLoops) == 0:
-        currState = outputMap(currState,
-                              [(output[x], x) for x in range(2 * dim, 4 * dim)],
-                              stateTr)
+        currState = outputMap(currState, envRng)
     print 't', t
     print 'goals:', goalsReached
     print 'activations:', {k: round(v, 2) for k, v in FSNet.activation.iteritems()}
@@ -167,7 +142,7 @@ for t in range(period):
     print 'mem trace:', FSNet.memoryTrace.keys()
     print 'matched:', FSNet.matchedFS
     #    print 'net:', FSNet.net.keys()
-    print currState
+    print FSEnv.ind2St(currState, dim)
     print '-'
     # data += [[output[6],output[7],output[8],output[9],output[10],output[11]]]
     fs_dyn = []
@@ -182,15 +157,15 @@ for t in range(period):
         if (oldState != goal):
             goalsReached += 1
             # break
-        #        if (len(FSNet.failedFS)==0 and (np.rand() < 0.2)):# and (len(FSNet.activatedFS)==dim):
-        if (np.rand() < 0.2):
-            currState = start[:]
+        #        if (len(FSNet.failedFS)==0 and (np.random.rand() < 0.2)):# and (len(FSNet.activatedFS)==dim):
+        if (envRng.random_sample() < 0.2):
+            currState = start
             FSNet.resetActivity()
-            print currState, start
-    if len(FSNet.matchedFS) > 0 and drawFSNet:
-        plt.figure(num=('t:' + str(t)))
-        plt.subplots_adjust(left=0.02, right=0.98, top=1., bottom=0.0)
-        viz.drawNet(FSNet.net)
+            print FSEnv.ind2St(currState, dim), FSEnv.ind2St(start, dim)
+
+if viewer:
+    viewer.update(period, force=True)
+    viewer.close()
 
 plt.figure()
 plt.subplot(3, 1, 1)
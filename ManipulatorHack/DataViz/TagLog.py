@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Columnar store of the tag logs of the manipulator
+
+A log is a text file with one event per line: comma separated key:value
+fields with keys time, tagName, write and value, e.g.
+    time:1425475064123,tagName:Gripper.Open,write:1,value:1
+
+convert(log, path) parses the log in chunks of lines and appends every
+chunk to typed columns, so memory use does not depend on the size of the
+log. Tag names are dictionary encoded: the tag column holds the index of
+the name in the tags list of meta.json (in the order of first appearance,
+as keyMap of DataViz). load(path) opens the columns as memory maps, so the
+event raster and the histogram of inter-event intervals are computed with
+numpy over the whole log without parsing it again; openLog(log) converts
+the log only if its store is absent or older than the log.
+
+Layout of the store directory:
+    meta.json      - number of events, tags, dtypes of the columns
+    <column>.bin   - raw little-endian values of the column
+
+Columns:
+    time   int64    - time stamp of the event
+    tag    int32    - tag id (index into tags)
+    write  bool     - write:1 (commands) or write:0 (input from the system)
+    value  float64  - value of the event, NaN for non-numeric values
+    zero   bool     - the value is the literal text 0 (events() skips these
+                      only, as the original DataViz script: 0.0 is an event)
+
+Created on Sun Oct 18 18:16:23 2026
+"""
+
+import os
+import csv
+import json
+import numpy as np
+
+columnTypes = (('time', '<i8'), ('tag', '<i4'), ('write', '|b1'), ('value', '<f8'), ('zero', '|b1'))
+
+
+def parseValue(text):
+    """Returns the value as float, NaN for non-numeric text"""
+
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+class TagLogWriter(object):
+    """Appends parsed events to the columns of the store
+
+    :param path: directory of the store (created if needed)
+    :param chunkSize: number of events buffered before they are written
+    """
+
+    def __init__(self, path, chunkSize=1 << 20):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self.chunkSize = chunkSize
+        self.tags = []
+        self.tagID = {}  # {tagName: tag id}
+        self.count = 0
+        self.files = dict((name, open(os.path.join(path, name + '.bin'), 'wb')) for name, dtype in columnTypes)
+        self.newChunk()
+
+    def newChunk(self):
+        self.buffers = dict((name, []) for name, dtype in columnTypes)
+
+    def add(self, fields):
+        """Adds the event given by the list of key:value fields"""
+
+        event = dict(field.split(':', 1) for field in fields)
+        name = event['tagName']
+        tag = self.tagID.get(name)
+        if tag is None:
+            tag = self.tagID[name] = len(self.tags)
+            self.tags.append(name)
+        buffers = self.buffers
+        buffers['time'].append(int(event['time']))
+        buffers['tag'].append(tag)
+        buffers['write'].append(event['write'] == '1')
+        buffers['value'].append(parseValue(event['value']))
+        buffers['zero'].append(event['value'] == '0')
+        if len(buffers['time']) >= self.chunkSize:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered events"""
+
+        for name, dtype in columnTypes:
+            np.array(self.buffers[name], dtype=dtype).tofile(self.files[name])
+        self.count += len(self.buffers['time'])
+        self.newChunk()
+
+    def close(self):
+        """Writes the rest of the events and meta.json"""
+
+        self.flush()
+        for f in self.files.itervalues():
+            f.close()
+        meta = {'count': self.count, 'tags': self.tags, 'columns': columnTypes}
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.rename(tmp, os.path.join(self.path, 'meta.json'))  # the store is complete
+
+
+def convert(log, path, chunkSize=1 << 20):
+    """Converts the text log to the columnar store in the directory path
+    :return: number of events
+    """
+
+    writer = TagLogWriter(path, chunkSize)
+    with open(log, 'rb') as f:
+        for fields in csv.reader(f):
+            if fields:
+                writer.add(fields)
+    writer.close()
+
+    return writer.count
+
+
+class TagLog(object):
+    """Columns of the store opened as memory maps
+
+    :param path: directory of the store
+    :param mmap: open columns as memory maps instead of reading them
+    """
+
+    def __init__(self, path, mmap=True):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.path = path
+        self.count = meta['count']
+        self.tags = meta['tags']
+        self.tagID = dict((name, i) for i, name in enumerate(self.tags))
+        for name, dtype in meta['columns']:
+            fileName = os.path.join(path, name + '.bin')
+            if mmap and self.count:
+                column = np.memmap(fileName, dtype=dtype, mode='r', shape=(self.count,))
+            else:
+                column = np.fromfile(fileName, dtype=dtype, count=self.count)
+            setattr(self, name, column)
+
+    def __len__(self):
+        return self.count
+
+    def events(self, write):
+        """Returns (time, tag) arrays of the events with values other than the text 0
+        :param write: True - commands (write:1), False - input from the system (write:0)
+        """
+
+        mask = (self.write == write) & ~self.zero
+
+        return self.time[mask], self.tag[mask]
+
+    def intervals(self):
+        """Returns positive intervals between the sorted times of all events"""
+
+        time = np.asarray(self.time)
+        dt = np.diff(time)
+        if (dt < 0).any():  # the log is not ordered by time
+            dt = np.diff(np.sort(time))
+
+        return dt[dt > 0]
+
+    def histogram(self, bins=200):
+        """Returns (counts, edges) of the histogram of the intervals between events"""
+        return np.histogram(self.intervals(), bins=bins)
+
+
+def load(path, mmap=True):
+    """Opens the store in the directory path"""
+    return TagLog(path, mmap)
+
+
+def isCurrent(meta):
+    """Returns True if the store of meta.json has the columns of columnTypes (stores
+    written before the zero column are converted again)"""
+
+    with open(meta) as f:
+        columns = json.load(f)['columns']
+
+    return [name for name, dtype in columns] == [name for name, dtype in columnTypes]
+
+
+def openLog(log, path=None, chunkSize=1 << 20):
+    """Opens the store of the text log, converts the log first if the store is absent or older
+    :param path: directory of the store, <log>.cols by default
+    """
+
+    path = path or log + '.cols'
+    meta = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta) or os.path.getmtime(meta) < os.path.getmtime(log) or not isCurrent(meta):
+        convert(log, path, chunkSize)
+
+    return load(path)
+
+# end of TagLog
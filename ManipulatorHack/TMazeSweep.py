@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Seed sweep of the stochastic T-maze experiment on all cores
+(see FSExperiment; rerun to resume an interrupted sweep)
+
+Created on Sun Oct 18 17:49:48 2026
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import FSExperiment as FE
+from FSPlot import plt
+
+if __name__ == '__main__':
+    resultsFile = 'TMazeSweep.jsonl'
+    configs = FE.grid({'task': 'fork', 'period': 500, 'reentry': 2},
+                      dim=[3, 4], seed=range(20))
+    results = FE.runSweep(configs, resultsFile)
+
+    plt.figure()
+    for dim in (3, 4):
+        goalsDyn = np.array([r['goalsDyn'] for r in results if r['config']['dim'] == dim])
+        NFSDyn = np.array([r['NFSDyn'] for r in results if r['config']['dim'] == dim])
+        plt.subplot(2, 1, 1)
+        plt.plot(goalsDyn.mean(0), label='dim %d' % dim)
+        plt.subplot(2, 1, 2)
+        plt.plot(NFSDyn.mean(0), label='dim %d' % dim)
+    plt.subplot(2, 1, 1)
+    plt.title('goals reached (mean over seeds)')
+    plt.legend(loc='upper left')
+    plt.subplot(2, 1, 2)
+    plt.title('number of FS')
+    plt.show()
@@ -1,8 +1,20 @@
 __author__ = 'Burtsev'
 
+import os
+import timeit
 import networkx as nx
-import matplotlib.pyplot as plot
-import scipy as mth
+import numpy as mth
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.path import Path
+import FSPlot
+
+plot = FSPlot.pyplot()
+
+# link types: (weights dict, dict of the drawn values, colormap, alpha, line width)
+linkStyles = [('problem', 'problemWeights', 'problemValues', 'YlOrRd', 0.1, 1.5),
+              ('goal', 'goalWeights', 'goalValues', 'Greens', 0.1, 1.5),
+              ('lateral', 'lateralWeights', 'lateralWeights', 'jet', 0.6, 1.),
+              ('control', 'controlWeights', 'controlWeights', 'RdPu', 0.1, 1.5)]
 
 
 def circular_layout_sorted(G, dim=2, scale=1):
@@ -38,8 +50,429 @@ def circular_layout_sorted(G, dim=2, scale=1):
     sorted_nodes = sorted(G.nodes())
     return {sorted_nodes[i]: pos[i] for i in range(len(pos))}
 
-def drawNet(net):
-    """draws the FS network"""
+
+class NetRenderer(object):
+    """Draws the FS network with one LineCollection per link type
+
+    Node positions (sorted circular layout) are cached for the set of FS
+    ids and reused until FSs are added or removed.
+    :param labels: draw FS ids (None - only for networks of at most 200 FSs)
+    """
+
+    def __init__(self, labels=None):
+        self.labels = labels
+        self.ids = None
+        self.pos = None  # {FS id: (x, y)}
+
+    def layout(self, ids):
+        """Returns {FS id: (x, y)} of the FSs on a circle in the order of ids"""
+
+        ids = sorted(ids)
+        if ids != self.ids:
+            t = 2.0 * mth.pi * mth.arange(len(ids)) / max(len(ids), 1)
+            self.pos = dict(zip(ids, zip(mth.cos(t), mth.sin(t))))
+            self.ids = ids
+
+        return self.pos
+
+    def edges(self, net, weights, values):
+        """Returns (segments, colour values) of the links of one type with nonzero values"""
+
+        pos = self.pos
+        segments = []
+        colours = []
+        for fs in net.itervalues():
+            drawn = getattr(fs, values)
+            for src in getattr(fs, weights):
+                value = drawn.get(src, 0)
+                if value != 0 and src in pos:
+                    segments.append((pos[src], pos[fs.ID]))
+                    colours.append(value)
+
+        return segments, mth.array(colours, dtype=float)
+
+    @staticmethod
+    def colours(kind, cmap, values):
+        """Returns RGBA colours of the links (mapping of drawNet)"""
+
+        if kind == 'problem':
+            return mth.where((values > 0)[:, None], plot.get_cmap(cmap)(values * 255),
+                             plot.cm.Greys(abs(values) * 255))
+        if kind == 'lateral':
+            return plot.get_cmap(cmap)((1 + values) * 128)
+
+        return plot.get_cmap(cmap)(abs(values) * 255)
+
+    def links(self, net):
+        """Returns [(link type, line width, segments, RGBA colours)] of the network"""
+
+        result = []
+        for kind, weights, values, cmap, alpha, width in linkStyles:
+            segments, drawn = self.edges(net, weights, values)
+            colours = self.colours(kind, cmap, drawn).reshape(-1, 4)
+            colours[:, 3] = alpha
+            result.append((kind, width, segments, colours))
+
+        return result
+
+    def nodes(self):
+        """Returns array of positions of FSs in the order of ids and the marker size"""
+        return mth.array([self.pos[ID] for ID in self.ids]).reshape(-1, 2), \
+            800 if len(self.ids) <= 200 else 20
+
+    def showLabels(self):
+        return self.labels or (self.labels is None and len(self.ids) <= 200)
+
+    def draw(self, net, ax=None):
+        """Draws the network (dict {FS id: AtomFS}) on the axes (current ones by default)"""
+
+        ax = ax or plot.gca()
+        ax.cla()
+        self.layout(net.keys())
+        for kind, width, segments, colours in self.links(net):
+            if segments:
+                ax.add_collection(LineCollection(segments, colors=colours, linewidths=width))
+        xy, size = self.nodes()
+        ax.scatter(xy[:, 0], xy[:, 1], s=size, c=[net[ID].activity for ID in self.ids],
+                   cmap=plot.cm.Reds, vmin=0, vmax=1, zorder=2)
+        if self.showLabels():
+            for ID, (x, y) in zip(self.ids, xy):
+                ax.text(x, y, str(ID), ha='center', va='center', zorder=3)
+        ax.set_xlim(-1.1, 1.1)
+        ax.set_ylim(-1.1, 1.1)
+        ax.set_aspect('equal')
+        ax.xaxis.set_visible(False)
+        ax.yaxis.set_visible(False)
+
+        return ax
+
+
+renderer = NetRenderer()  # default renderer of drawNet (keeps the layout between calls)
+
+
+class FrameWriter(object):
+    """Writes frames of the figure to a video or GIF file (matplotlib animation
+    writers: ffmpeg, imagemagick or pillow) or as numbered PNGs to a directory
+
+    :param path: file name with .mp4, .avi, .mov or .gif extension, or a directory
+    """
+
+    movieWriters = {'.gif': ('pillow', 'imagemagick'), '.mp4': ('ffmpeg', 'avconv'),
+                    '.avi': ('ffmpeg', 'avconv'), '.mov': ('ffmpeg', 'avconv')}
+
+    def __init__(self, fig, path, fps=5, dpi=None):
+        from matplotlib import animation
+
+        self.fig = fig
+        self.path = path
+        self.dpi = dpi
+        self.count = 0
+        self.writer = None
+        ext = os.path.splitext(path)[1].lower()
+        if ext in self.movieWriters:
+            for name in self.movieWriters[ext]:
+                if animation.writers.is_available(name):
+                    self.writer = animation.writers[name](fps=fps)
+                    self.writer.setup(fig, path, dpi or fig.dpi)
+                    break
+            else:
+                raise ValueError('no writer of %s files is available (%s), write PNG frames '
+                                 'to a directory instead' % (ext, ', '.join(self.movieWriters[ext])))
+        elif not os.path.isdir(path):
+            os.makedirs(path)
+
+    def grab(self):
+        """Writes the current state of the figure as the next frame"""
+
+        if self.writer:
+            self.writer.grab_frame()
+        else:
+            self.fig.savefig(os.path.join(self.path, 'frame_%06d.png' % self.count), dpi=self.dpi)
+        self.count += 1
+
+    def close(self):
+        if self.writer:
+            self.writer.finish()
+            self.writer = None
+
+
+class EdgeRows(object):
+    """Segments and colour values of the links of one type drawn by a PathCollection
+
+    Every link keeps its row; rows of removed links are emptied (NaN segments
+    are not drawn) and reused by new links. Paths of the collection are made
+    for the changed rows only (LineCollection.set_segments would remake all).
+    """
+
+    empty = ((mth.nan, mth.nan), (mth.nan, mth.nan))
+
+    def __init__(self):
+        self.rows = {}  # {(target, source): row}
+        self.incoming = {}  # {target: set of drawn sources}
+        self.segments = []
+        self.paths = []  # paths of the segments (PathCollection.set_paths)
+        self.values = []
+        self.free = []
+
+    def put(self, dst, src, segment, value):
+        row = self.rows.get((dst, src))
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                row = len(self.values)
+                self.segments.append(None)
+                self.paths.append(None)
+                self.values.append(0.)
+            self.rows[(dst, src)] = row
+            self.incoming.setdefault(dst, set()).add(src)
+        if self.segments[row] != segment:
+            self.segments[row] = segment
+            self.paths[row] = Path(segment)
+        self.values[row] = value
+
+    def drop(self, dst, src):
+        row = self.rows.pop((dst, src))
+        self.incoming[dst].discard(src)
+        self.segments[row] = self.empty
+        self.paths[row] = Path(self.empty)
+        self.values[row] = 0.
+        self.free.append(row)
+
+    def refresh(self, dst, links, xy):
+        """Sets the drawn links of the target to links ({source: value}), the end points are
+        taken from xy ({FS id: (x, y)})"""
+
+        for src in self.incoming.get(dst, set()) - set(links):
+            self.drop(dst, src)
+        for src, value in links.iteritems():
+            self.put(dst, src, (xy[src], xy[dst]), value)
+        if not self.incoming.get(dst, True):
+            del self.incoming[dst]
+
+
+class LiveViewer(object):
+    """Figure of the network updated in place during a run
+
+    The viewer is a recorder of the network (FSNetwork.recorders), so it is
+    updated by every logActivity. Colours of the nodes (activity) are set
+    in place. FSs are laid out on a circle with room for twice the FSs there
+    were at the last layout: new FSs take the next free places and removed
+    ones leave their places empty, and only the links of FSs whose links
+    changed (FSLinks.LinkMatrix.watch) are redrawn. The layout is rebuilt
+    when the circle is full or the network crosses the 200 FSs limit of
+    labels and large markers. Updates are throttled to fps frames per second
+    of the wall time. Without a display frames are only written to the
+    frames file or directory (see FrameWriter).
+    :param net: FSNpy.FSNetwork
+    :param fps: maximal number of redraws per second
+    :param frames: file (.mp4, .gif) or directory to write every drawn frame to
+    :param labels: draw FS ids (None - only for networks of at most 200 FSs)
+    """
+
+    clock = timeit.default_timer
+
+    def __init__(self, net, fps=5., frames=None, labels=None, figsize=(8, 8), dpi=None):
+        self.net = net
+        self.fps = fps
+        self.labels = labels
+        self.fig = plot.figure(figsize=figsize)
+        self.ax = self.fig.add_axes([0., 0., 1., 1.])
+        self.ax.set_xlim(-1.1, 1.1)
+        self.ax.set_ylim(-1.1, 1.1)
+        self.ax.set_aspect('equal')
+        self.ax.set_axis_off()
+        self.collections = {}  # {link type: PathCollection}
+        self.edges = {}  # {link type: EdgeRows}
+        self.changed = dict((kind, net.links[kind].watch()) for kind, _, _, _, _, _ in linkStyles)
+        self.points = None  # scatter of FSs, one point per place of the circle
+        self.texts = {}  # {FS id: label}
+        self.title = self.ax.text(-1.05, 1.05, '', va='top')
+        self.places = {}  # {FS id: place on the circle}
+        self.xy = {}  # {FS id: (x, y)}
+        self.circle = None  # (x, y) of the places
+        self.nextPlace = 0
+        self.nextID = 0  # FSs with smaller ids were laid out
+        self.small = None  # the layout is for at most 200 FSs (labels, large markers)
+        self.lastDraw = None
+        self.drawn = 0  # number of frames drawn
+        self.rebuilt = 0  # number of layouts
+        self.frames = FrameWriter(self.fig, frames, fps, dpi) if frames else None
+        self.interactive = plot.get_backend().lower() != 'agg'
+        if self.interactive:
+            plot.ion()
+            self.fig.show()
+        net.recorders.append(self)
+
+    def record(self, net, stamp):
+        self.update(stamp)
+
+    def update(self, stamp=None, force=False):
+        """Redraws the network if 1 / fps seconds passed since the last redraw
+        :return: True if the figure was redrawn
+        """
+
+        now = self.clock()
+        if not force and self.lastDraw is not None and now - self.lastDraw < 1. / self.fps:
+            return False
+        net = self.net
+        added = [ID for ID in xrange(self.nextID, net.idCounter) if ID in net.net]
+        if self.circle is None or self.nextPlace + len(added) > len(self.circle) or \
+                (len(net.net) <= 200) != self.small:
+            self.rebuild()
+        else:
+            removed = []
+            if len(self.places) + len(added) != len(net.net):
+                removed = [ID for ID in self.places if ID not in net.net]
+            self.dropNodes(removed)
+            self.addNodes(added)
+            self.updateLinks()
+        activity = mth.zeros(len(self.circle))
+        for ID, place in self.places.iteritems():
+            activity[place] = net.net[ID].activity
+        self.points.set_array(activity)
+        if stamp is not None:
+            self.title.set_text('t = %g   FSs: %d' % (stamp, len(net.net)))
+        if self.frames:
+            self.frames.grab()
+        if self.interactive:
+            self.fig.canvas.draw_idle()
+            self.fig.canvas.flush_events()
+        self.lastDraw = now
+        self.drawn += 1
+
+        return True
+
+    def showLabels(self):
+        return self.labels or (self.labels is None and self.small)
+
+    def addNodes(self, ids):
+        """Puts new FSs (in the order of ids) on the next free places of the circle"""
+
+        offsets = self.points.get_offsets() if ids else None
+        for ID in ids:
+            place = self.nextPlace
+            self.nextPlace += 1
+            self.places[ID] = place
+            self.xy[ID] = x, y = tuple(self.circle[place])
+            offsets[place] = x, y
+            if self.showLabels():
+                self.texts[ID] = self.ax.text(x, y, str(ID), ha='center', va='center', zorder=3)
+        if ids:
+            self.points.set_offsets(offsets)
+            self.nextID = max(ids) + 1
+
+    def dropNodes(self, ids):
+        """Empties the places of removed FSs"""
+
+        offsets = self.points.get_offsets() if ids else None
+        for ID in ids:
+            offsets[self.places.pop(ID)] = mth.nan, mth.nan
+            del self.xy[ID]
+            if ID in self.texts:
+                self.texts.pop(ID).remove()
+        if ids:
+            self.points.set_offsets(offsets)
+
+    def incoming(self, ID, weights, values):
+        """Returns {source: drawn value} of the links of one type to the FS"""
+
+        fs = self.net.net.get(ID)
+        if fs is None:
+            return {}
+        drawn = getattr(fs, values)
+        links = {}
+        for src in getattr(fs, weights):
+            value = drawn.get(src, 0)
+            if value != 0 and src in self.xy:
+                links[src] = value
+
+        return links
+
+    def updateLinks(self):
+        """Redraws the links of the FSs whose links changed since the last update"""
+
+        for kind, weights, values, cmap, alpha, width in linkStyles:
+            changed = self.changed[kind]
+            if not changed:
+                continue
+            edges = self.edges[kind]
+            for ID in changed:
+                edges.refresh(ID, self.incoming(ID, weights, values), self.xy)
+            changed.clear()
+            self.setLinks(kind, cmap, alpha, width)
+
+    def setLinks(self, kind, cmap, alpha, width):
+        """Sets segments and colours of the collection of the links of one type"""
+
+        edges = self.edges[kind]
+        colours = NetRenderer.colours(kind, cmap, mth.array(edges.values, dtype=float)).reshape(-1, 4)
+        colours[:, 3] = alpha
+        if kind not in self.collections:
+            # zorder of a LineCollection: links are drawn over the nodes
+            self.collections[kind] = self.ax.add_collection(
+                PathCollection([], facecolors='none', linewidths=width, zorder=2))
+        collection = self.collections[kind]
+        collection.set_paths(edges.paths)  # kept by EdgeRows, only changed rows are remade
+        collection.set_edgecolor(colours)
+
+    def rebuild(self):
+        """Lays out all FSs on a new circle and draws all links (after the circle is full)"""
+
+        net = self.net
+        ids = sorted(net.net)
+        self.small = len(ids) <= 200
+        n = max(16, 2 * len(ids))
+        t = 2.0 * mth.pi * mth.arange(n) / n
+        self.circle = mth.column_stack((mth.cos(t), mth.sin(t)))
+        self.places = dict((ID, i) for i, ID in enumerate(ids))
+        self.xy = dict((ID, tuple(self.circle[i])) for i, ID in enumerate(ids))
+        self.nextPlace = len(ids)
+        self.nextID = net.idCounter
+        offsets = mth.empty((n, 2))
+        offsets.fill(mth.nan)
+        offsets[:len(ids)] = self.circle[:len(ids)]
+        size = 800 if self.small else 20
+        if self.points is None:  # scatter drops empty (NaN) places, they are set below
+            self.points = self.ax.scatter(mth.zeros(n), mth.zeros(n), s=size, c=mth.zeros(n),
+                                          cmap=plot.cm.Reds, vmin=0, vmax=1, zorder=2)
+        self.points.set_offsets(offsets)
+        self.points.set_sizes([size])
+        for text in self.texts.itervalues():
+            text.remove()
+        self.texts = {}
+        if self.showLabels():
+            for ID in ids:
+                x, y = self.xy[ID]
+                self.texts[ID] = self.ax.text(x, y, str(ID), ha='center', va='center', zorder=3)
+        for kind, weights, values, cmap, alpha, width in linkStyles:
+            self.edges[kind] = edges = EdgeRows()
+            for ID in ids:
+                edges.refresh(ID, self.incoming(ID, weights, values), self.xy)
+            self.changed[kind].clear()
+            self.setLinks(kind, cmap, alpha, width)
+        self.rebuilt += 1
+
+    def close(self):
+        """Detaches the viewer from the network and finishes the frames file"""
+
+        if self in self.net.recorders:
+            self.net.recorders.remove(self)
+        for kind, changed in self.changed.iteritems():
+            self.net.links[kind].unwatch(changed)
+        if self.frames:
+            self.frames.close()
+
+
+def drawNet(net, fast=True):
+    """draws the FS network
+    :param fast: draw links as collections (NetRenderer) instead of annotated arrows
+    """
+
+    if fast:
+        renderer.draw(net)
+        plot.subplots_adjust(left=0.0, right=1., top=1., bottom=0.0)
+        return
 
     G = nx.MultiDiGraph()
     G.add_nodes_from(sorted(net.keys()))
@@ -90,7 +523,6 @@ def drawNet(net):
                                 arrowprops=actArrStyle)
                 else:
                     actArrStyle['fc'] = plot.cm.Greys(abs(vertex[3]['weight'])*255)
-                    print '&&& plot:', vertex
                     ar.annotate('', (coords[0], coords[1]), (coords[2], coords[3]),
                                 arrowprops=actArrStyle)
             if vertex[2] == 1:
@@ -157,7 +589,7 @@ def drawStateTransitions(net, dim):
             if vertex[2] == 0:
                 if vertex[3]['weight'] > 0:
                     actArrStyle['connectionstyle'] = 'arc3,rad='\
-                                                     + str(0.4*mth.log(vertex[3]['weight'])/mth.log(max_fs)+mth.rand()*0.01)
+                                                     + str(0.4*mth.log(vertex[3]['weight'])/mth.log(max_fs)+mth.random.rand()*0.01)
                     print "fs:", vertex[3]['weight'], ' ann:', actArrStyle['connectionstyle']
                     ar.annotate('',
                                 (coords[0], coords[1]), (coords[2], coords[3]),
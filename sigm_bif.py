@@ -3,8 +3,39 @@
 Created on Tue Jun 10 14:17:44 2014
 
 @author: Brutsev
+
+bifurcations of the activity map of AtomFS (see FSDynamics)
 """
 
-import FSNpy as FSN
-import matplotlib.pyplot as plt
+import numpy as np
+import FSDynamics as FSD
+from FSPlot import plt
+
+x0 = 0.5
+noise = 0.001
+k = np.linspace(1, 60, 119)
+d = np.linspace(-1, 1.5, 501)
+
+# bistable region over (drive, k), saddle-node bifurcations in closed form
+res = FSD.analyze(k, [x0], d, noise=noise)
+dLow, dHigh = FSD.bifurcation(k, x0)
+plt.figure()
+plt.pcolormesh(d, k, res['bistable'][:, 0, :], cmap='Greys')
+plt.plot(dLow, k, 'b', dHigh, k, 'r')
+plt.xlabel('drive')
+plt.ylabel('k')
+plt.title('bistable region, x0 = %g' % x0)
+
+# fixed points over the drive for a bistable k
+kk = 40
+points, stable = FSD.fixedPoints(kk, x0, d)
+plt.figure()
+for i in range(3):
+    plt.plot(d[stable[:, i]], points[stable[:, i], i], 'b.', ms=2)
+    unstable = ~stable[:, i] & ~np.isnan(points[:, i])
+    plt.plot(d[unstable], points[unstable, i], 'r.', ms=2)
+plt.xlabel('drive')
+plt.ylabel('fixed point')
+plt.title('k = %g, x0 = %g' % (kk, x0))
 
+plt.show()
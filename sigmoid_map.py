@@ -8,14 +8,15 @@ visualize sigmoid mapping
 """
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
-import scipy as np
+import numpy as np
+import FSDynamics as FSD
 from matplotlib import cm
 
 
 def sigm(x): # sigmoid activation function
     return 1/(1+np.exp(10*(x-0.5)))
 def sigmoid(x, ex=0, inh=0, n=0, k=10, x0 = 0.5): # sigmoid activation function
-    nz = 2*(0.5-np.rand())*n
+    nz = 2*(0.5-np.random.rand())*n
     return 1/(1+np.exp(-k*(((ex+x)+nz-inh)-x0)))
 
 res = 1
@@ -40,24 +41,15 @@ for st in range(res):
 #plt.figure()
 #plt.plot(pltDataX,pltDataXX)
 
-res =300
-bifSetk = []
-bifSetx0 = []
-bifSetx = []
-for ki in range(1):
-    kk = 10
-    for x0i in range(res):
-        xx0 = (x0i+0.)/res
-        #print 'k:',kk,' x0:',xx0
-        for xi in range(res):
-            x = (xi+0.)/res
-#            if (kk==10):
-#                print 'x=',x,'y=',sigmoid(x, k=kk, x0=xx0)
-            if (np.absolute(x-sigmoid(x, k=kk, x0=xx0))<(1./res)):
-                bifSetk.append(kk)
-                bifSetx0.append(xx0)
-                bifSetx.append(x)
-                print '!!! x=',x
+res = 300
+kk = 10
+# fixed points of x -> sigmoid(x, k, x0) by bracketing (self-feedback 1, no drive)
+xx0 = np.arange(res) / float(res)
+points, stable = FSD.fixedPoints(kk, xx0, 0., a=1.)
+found = ~np.isnan(points)
+bifSetx0 = np.repeat(xx0[:, None], 3, axis=1)[found]
+bifSetx = points[found]
+bifSetk = np.repeat(kk, len(bifSetx))
 #fig = plt.figure()
 #ax = fig.gca(projection='3d')
 #ax.scatter(bifSetk,bifSetx0,bifSetx)